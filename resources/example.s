@@ -1,13 +1,34 @@
 // example.s
 
-.bss // declared variables
-
-.comm _a, 8
-.comm _b, 4
-
-.data // constants
-
-_nc0: .int 2
+.bss // 7 symbols, 56 bytes (4 of padding), see 'parser/layout.py'
+.balign 64
+// stored to by the program
+.globl _a
+.balign 8
+_a: .zero 8
+.globl __tv0
+.balign 8
+__tv0: .zero 8
+.globl __tv1
+.balign 8
+__tv1: .zero 8
+.globl __tv2
+.balign 8
+__tv2: .zero 8
+.globl _b
+.balign 4
+_b: .zero 4
+.globl __tv3
+.balign 8
+__tv3: .zero 8
+.globl __tv4
+.balign 8
+__tv4: .zero 8
+
+.section .rodata // constants, deduplicated by bit pattern
+
+.balign 16
+__ncd4000000000000000: .quad 0x4000000000000000 // 2.0
 
 .text // assembly instructions
 
@@ -17,11 +38,9 @@ _example:
 
 xor %rax, %rax
 
-movl _nc0(%rip), %eax
+movq __ncd4000000000000000(%rip), %rax
 
 pushq %rax
-fildl (%rsp)
-fstpl (%rsp)
 
 popq %rax
 
@@ -29,11 +48,7 @@ movq %rax, _a(%rip)
 
 xor %rax, %rax
 
-movl _nc0(%rip), %eax
-pushq %rax
-fildl (%rsp)
-fstpl (%rsp)
-movq _a(%rip), %rax
+movq __ncd4000000000000000(%rip), %rax
 
 pushq %rax
 fldl (%rsp)
@@ -45,27 +60,9 @@ movq %rax, __tv0(%rip)
 
 xor %rax, %rax
 
-movq __tv0(%rip), %rax
-pushq %rax
-
-popq %rdx
-popq %rax
-
-pushq %rdx
-fldl (%rsp)
-popq %rdx
-pushq %rax
-fldl (%rsp)
-
-fmulp
-
-fstpl (%rsp)
-popq %rax
-
-movq %rax, __tv1(%rip)
-
-xor %rdx, %rdx
-xor %rax, %rax
+fldl __ncd4000000000000000(%rip)
+fmull __tv0(%rip)
+fstpl __tv1(%rip)
 
 movq __tv1(%rip), %rax
 
@@ -81,9 +78,9 @@ xor %rax, %rax
 
 movq __tv2(%rip), %rax
 
+movq %rax, %xmm0
+cvtsd2si %xmm0, %eax
 pushq %rax
-fldl (%rsp)
-fistpl (%rsp)
 
 popq %rax
 
@@ -91,11 +88,7 @@ movl %eax, _b(%rip)
 
 xor %rax, %rax
 
-movl _nc0(%rip), %eax
-pushq %rax
-fildl (%rsp)
-fstpl (%rsp)
-movq _a(%rip), %rax
+movq __ncd4000000000000000(%rip), %rax
 
 pushq %rax
 fldl (%rsp)
@@ -107,33 +100,15 @@ movq %rax, __tv3(%rip)
 
 xor %rax, %rax
 
-movq __tv3(%rip), %rax
-pushq %rax
-
-popq %rdx
-popq %rax
-
-pushq %rdx
-fldl (%rsp)
-popq %rdx
-pushq %rax
-fldl (%rsp)
-
-fmulp
-
-fstpl (%rsp)
-popq %rax
-
-movq %rax, __tv4(%rip)
-
-xor %rdx, %rdx
-xor %rax, %rax
+fldl __ncd4000000000000000(%rip)
+fmull __tv3(%rip)
+fstpl __tv4(%rip)
 
 movq __tv4(%rip), %rax
 
+movq %rax, %xmm0
+cvtsd2si %xmm0, %eax
 pushq %rax
-fldl (%rsp)
-fistpl (%rsp)
 
 popq %rax
 
@@ -146,11 +121,4 @@ xor %rax, %rax /* exit code 0, no runtime errors */
 
 retq
 
-// temporary variables
-.comm __tv0, 8
-.comm __tv1, 8
-.comm __tv2, 8
-.comm __tv3, 8
-.comm __tv4, 8
-
 .end
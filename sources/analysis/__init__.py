@@ -0,0 +1 @@
+from .analysis import *
@@ -0,0 +1,42 @@
+import argparse
+import json
+import sys
+
+from compiler import *
+from analysis import *
+from parser.layout import report as layout_report
+
+
+if __name__ == '__main__':
+    arguments = argparse.ArgumentParser(prog='analysis', description="estimates the cost of the code of every statement")
+    arguments.add_argument('path', help="'.cmmm' file")
+    arguments.add_argument('--top', type=int, default=10, metavar='N', help="statements in the report, 0 for all")
+    arguments.add_argument('--json', metavar='FILE', help="every statement in source order, '-' for stdout")
+    arguments.add_argument('--layout', action='store_true', help="'.bss' layout against the symbol table order")
+    add_code_generation_arguments(arguments)
+    add_cache_arguments(arguments)
+    options = arguments.parse_args()
+
+    with open(options.path, 'r') as c:
+        code = c.read()
+
+    diagnostics = Diagnostics()
+    program = compile_program(code, diagnostics, cache=options.ast_cache, **code_generation_options(options))
+    if program is None:
+        diagnostics.write(sys.stderr)
+        exit(1)
+
+    if options.layout:
+        codes = [repr(statement) for statement in program.statements]
+        print(layout_report(program.layout(codes), program.layout(codes, ordered=False)))
+        exit(0)
+
+    rows = statement_costs(program, code)
+    print(report(rows, options.top or None), file=sys.stderr if options.json == '-' else sys.stdout)
+
+    results = {'source': options.path, 'options': code_generation_options(options), 'statements': rows}
+    if options.json == '-':
+        json.dump(results, sys.stdout, indent=2)
+    elif options.json:
+        with open(options.json, 'w') as j:
+            json.dump(results, j, indent=2)
@@ -0,0 +1,192 @@
+# static cost model of the generated code: every instruction gets a latency and a reciprocal throughput (cycles,
+# roughly skylake, from agner fog's tables), memory operands add the load latency, loads from an address the same
+# statement stored to add store-to-load forwarding instead. sums are per source statement, as if its instructions
+# formed one dependency chain (they mostly do, through %rax and the temporaries)
+
+import re
+
+from parser import *
+from parser.trigonometry import routines
+
+costs = {  # mnemonic (without the size suffix where it doesn't matter) -> latency, reciprocal throughput
+    'mov': (1, 0.25), 'movabs': (1, 0.25), 'movswl': (1, 0.25), 'movzwl': (1, 0.25), 'movslq': (1, 0.25),
+    'add': (1, 0.25), 'sub': (1, 0.25), 'and': (1, 0.25), 'or': (1, 0.25), 'xor': (1, 0.25),
+    'neg': (1, 0.25), 'not': (1, 0.25), 'inc': (1, 0.25), 'dec': (1, 0.25), 'cmp': (1, 0.25), 'test': (1, 0.25),
+    'lea': (1, 0.5), 'shl': (1, 0.5), 'sal': (1, 0.5), 'shr': (1, 0.5), 'sar': (1, 0.5),
+    'imul': (3, 1), 'mul': (3, 1),
+    'cwd': (2, 1), 'cwtl': (1, 0.5), 'cdq': (1, 1), 'cltd': (1, 1), 'cqo': (1, 1), 'cltq': (1, 0.5),
+    'idivw': (25, 6), 'idivl': (26, 6), 'idivq': (42, 24), 'divw': (23, 6), 'divl': (26, 6), 'divq': (35, 21),
+    'push': (1, 1), 'pop': (1, 0.5),
+    'call': (2, 2), 'ret': (2, 1), 'jmp': (0, 1), 'jcc': (1, 0.5),
+
+    # x87
+    'fld': (3, 0.5), 'fild': (6, 1), 'fst': (4, 1), 'fstp': (4, 1), 'fist': (7, 2), 'fistp': (7, 2),
+    'fadd': (3, 1), 'faddp': (3, 1), 'fsub': (3, 1), 'fsubp': (3, 1), 'fsubr': (3, 1), 'fsubrp': (3, 1),
+    'fiadd': (6, 2), 'fisub': (6, 2), 'fimul': (8, 2), 'fidiv': (18, 5),
+    'fmul': (5, 1), 'fmulp': (5, 1), 'fdiv': (15, 5), 'fdivp': (15, 5), 'fdivr': (15, 5), 'fdivrp': (15, 5),
+    'fchs': (1, 1), 'fabs': (1, 1), 'fxch': (0, 0.5), 'fldz': (1, 2), 'fld1': (1, 2),
+    'fucomip': (3, 1), 'fcomip': (3, 1), 'fucomi': (3, 1), 'fcmovbe': (3, 2), 'fcmovnbe': (3, 2),
+    'fsqrt': (18, 6), 'frndint': (16, 4), 'fprem1': (26, 20), 'fnstcw': (3, 1), 'fldcw': (7, 7),
+    'fsin': (90, 90), 'fcos': (90, 90), 'fsincos': (110, 110),
+
+    # sse
+    'movsd': (1, 0.33), 'movss': (1, 0.33), 'movapd': (1, 0.25), 'movaps': (1, 0.25), 'movd': (2, 1), 'movq': (2, 1),
+    'addsd': (4, 0.5), 'subsd': (4, 0.5), 'mulsd': (4, 0.5), 'divsd': (14, 4), 'sqrtsd': (16, 6),
+    'addss': (4, 0.5), 'subss': (4, 0.5), 'mulss': (4, 0.5), 'divss': (11, 3), 'sqrtss': (12, 3),
+    'andpd': (1, 0.33), 'andnpd': (1, 0.33), 'orpd': (1, 0.33), 'xorpd': (1, 0.33), 'pxor': (1, 0.33),
+    'ucomisd': (3, 1), 'comisd': (3, 1), 'roundsd': (8, 1), 'minsd': (4, 0.5), 'cmpltsd': (4, 0.5),
+    'cvtsi2sd': (4, 1), 'cvtsi2ss': (4, 1), 'cvtss2sd': (5, 1), 'cvtsd2ss': (5, 1),
+    'cvtsd2si': (6, 1), 'cvttsd2si': (6, 1), 'cvtss2si': (6, 1), 'cvttss2si': (6, 1),
+
+    # fma ('--fma')
+    'vfmadd213sd': (4, 0.5), 'vfmsub213sd': (4, 0.5), 'vfnmadd213sd': (4, 0.5), 'vfnmsub213sd': (4, 0.5),
+    'vfmadd213ss': (4, 0.5), 'vfmsub213ss': (4, 0.5), 'vfnmadd213ss': (4, 0.5), 'vfnmsub213ss': (4, 0.5),
+
+    # packed sse2 and avx2 (the 'v' forms cost the same, 256-bit division aside)
+    'addpd': (4, 0.5), 'subpd': (4, 0.5), 'mulpd': (4, 0.5), 'divpd': (14, 4), 'maxpd': (4, 0.5), 'maxsd': (4, 0.5),
+    'addps': (4, 0.5), 'subps': (4, 0.5), 'mulps': (4, 0.5), 'divps': (11, 3), 'maxps': (4, 0.5), 'maxss': (4, 0.5),
+    'xorps': (1, 0.33), 'pcmpeqd': (1, 0.5), 'psllq': (1, 0.5), 'pslld': (1, 0.5), 'psrlq': (1, 0.5),
+    'unpcklpd': (1, 1), 'unpckhpd': (1, 1), 'shufps': (1, 1), 'movhlps': (1, 1),
+    'vdivpd': (13, 8), 'vdivps': (11, 5), 'vbroadcastsd': (3, 1), 'vbroadcastss': (3, 0.5),
+    'vextractf128': (3, 1), 'vzeroupper': (0, 1)
+}
+
+load_latency = 4  # on top of the instruction's own latency, l1 hit
+forwarding_latency = 5  # store-to-load forwarding, a memory round-trip
+unknown_cost = (1, 1)
+
+label = re.compile(r'^[\w.$]+:\s*')
+operand_separator = re.compile(r',\s*(?![^()]*\))')  # commas outside parentheses
+
+
+def parse(line: str) -> (str, [str]) or None:
+    """ mnemonic and operands of an instruction line, None for labels, directives, comments and empty lines """
+
+    line = label.sub('', re.sub(r'/\*.*?\*/', '', line.split('//')[0]).strip()).strip()
+    if not line or line.startswith('.'):
+        return None
+    mnemonic, _, operands = line.partition(' ')
+    return mnemonic, [operand for operand in operand_separator.split(operands.strip()) if operand]
+
+
+def cost(mnemonic: str) -> (float, float) or None:
+    if mnemonic in costs:
+        return costs[mnemonic]
+    elif mnemonic.startswith('v') and (mnemonic[1:] in costs):  # vex encoded
+        return costs[mnemonic[1:]]
+    elif mnemonic[:-1] in costs and mnemonic[-1] in 'bwlqs':
+        return costs[mnemonic[:-1]]
+    elif mnemonic.startswith('j'):
+        return costs['jcc']
+    return None
+
+
+def in_memory(operand: str) -> bool:
+    return ('(' in operand) and not operand.startswith('%st')  # '%st(1)' is a register
+
+
+def accesses(mnemonic: str, operands: [str]) -> ([str], [str]):
+    """ memory operands read and written """
+
+    memory = [operand for operand in operands if in_memory(operand)]
+    if mnemonic.startswith('push'):
+        return [], ['(%rsp)']
+    elif mnemonic.startswith('pop'):
+        return ['(%rsp)'], []
+    elif mnemonic.startswith('lea') or not memory:
+        return [], []
+    elif len(operands) == 1:
+        return ([], memory) if mnemonic.startswith(('fst', 'fist')) else (memory, [])
+
+    reads, writes = [o for o in operands[:-1] if in_memory(o)], [o for o in operands[-1:] if in_memory(o)]
+    if writes and not mnemonic.startswith(('mov', 'vmov')):
+        reads += writes  # read-modify-write
+    return reads, writes
+
+
+def fall_through(assembly: str) -> str:
+    """ the path through a routine taking no conditional branch, to its first 'ret' """
+
+    path, skipping = [], None
+    for line in assembly.split('\n'):
+        stripped = line.strip()
+        if skipping is not None:
+            if stripped == f"{skipping}:":
+                skipping = None
+            continue
+        instruction = parse(stripped)
+        if instruction is None:
+            continue
+        path.append(stripped)
+        if instruction[0] == 'jmp':
+            skipping = instruction[1][0].rstrip('fb')
+        elif instruction[0].startswith('ret'):
+            break
+    return '\n'.join(path)
+
+
+routine_costs = {}  # routine -> estimate of its fall-through path, filled in on first use
+
+
+def estimate(assembly: str) -> dict:
+    """ instructions, summed latency and reciprocal throughput, loads, stores and round-trips of 'assembly' """
+
+    result = {'instructions': 0, 'latency': 0.0, 'throughput': 0.0, 'loads': 0, 'stores': 0, 'round_trips': 0,
+              'unknown': []}
+    stored = set()
+
+    for line in assembly.split('\n'):
+        instruction = parse(line)
+        if instruction is None:
+            continue
+        mnemonic, operands = instruction
+
+        latency, throughput = cost(mnemonic) or unknown_cost
+        if cost(mnemonic) is None and mnemonic not in result['unknown']:
+            result['unknown'].append(mnemonic)
+
+        reads, writes = accesses(mnemonic, operands)
+        for operand in reads:
+            if operand in stored:
+                latency += forwarding_latency
+                result['round_trips'] += 1
+            else:
+                latency += load_latency
+        stored.update(writes)
+
+        if mnemonic.startswith('call') and operands and operands[0] in routines:
+            if operands[0] not in routine_costs:
+                routine_costs[operands[0]] = estimate(fall_through(routines[operands[0]]))
+            latency += routine_costs[operands[0]]['latency']
+            throughput += routine_costs[operands[0]]['throughput']
+
+        result['instructions'] += 1
+        result['latency'] += latency
+        result['throughput'] += throughput
+        result['loads'] += len(reads)
+        result['stores'] += len(writes)
+
+    result['latency'], result['throughput'] = round(result['latency'], 2), round(result['throughput'], 2)
+    return result
+
+
+def statement_costs(program: ProgramStatements, code: str) -> [dict]:
+    """ estimate of the code of every statement, in source order """
+
+    return [{**statement.location(code), **estimate(repr(statement))} for statement in program.statements]
+
+
+def report(rows: [dict], top: int = None) -> str:
+    """ statements ranked by latency, then by throughput """
+
+    ranked = sorted(rows, key=lambda row: (-row['latency'], -row['throughput'], row['line'], row['column']))
+    total = {key: sum(row[key] for row in rows) for key in ('instructions', 'latency', 'throughput', 'round_trips')}
+
+    lines = [f"{'rank':>4} {'at':>9} {'latency':>8} {'thruput':>8} {'instrs':>6} {'trips':>5}  statement"]
+    for rank, row in enumerate(ranked[:top], start=1):
+        share = 100.0 * row['latency'] / max(total['latency'], 1)
+        lines.append(f"{rank:>4} {row['line']:>5}:{row['column']:<3} {row['latency']:>8.1f} {row['throughput']:>8.2f} "
+                     f"{row['instructions']:>6} {row['round_trips']:>5}  {row['source']}  ({share:.1f}%)")
+    lines.append(f"{'':>4} {'total':>9} {total['latency']:>8.1f} {total['throughput']:>8.2f} "
+                 f"{total['instructions']:>6} {total['round_trips']:>5}  {len(rows)} statements")
+    return '\n'.join(lines)
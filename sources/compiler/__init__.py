@@ -1 +1,8 @@
-from .compiler import (lexer, parser)
+from .compiler import (
+    lexer, parser,
+    Diagnostics,
+    compile_program,
+    add_code_generation_arguments, code_generation_options,
+    add_cache_arguments,
+    add_diagnostics_arguments, diagnostics_options
+)
@@ -1 +1,109 @@
+import sys
+
+from dataclasses import fields
+
+from diagnostics import (
+    Diagnostics, TooManyErrors,
+    styles
+)
 from parser import *
+from parser import cache as parsed
+from parser import lines
+
+
+def compile_program(code: str, diagnostics: Diagnostics = None, streaming: bool = False, cache: str = None,
+                    **options) -> ProgramStatements or None:
+    """ parses 'code' starting from the clean lexer and parser state, with code generation 'options';
+        errors, warnings and infos go to 'diagnostics' (nowhere if None). 'streaming' generates the code of every
+        statement as soon as it is parsed, into a spool, and drops the statement (the program has none then).
+        'cache' is a directory of parsed programs ('parser/cache.py'), loaded instead of parsing if there is one of
+        'code' and stored after parsing if not (not when streaming) """
+
+    code_generation.configure(**options)
+    lines.configure(code if code_generation.debug else None)
+
+    diagnostics = diagnostics if diagnostics is not None else Diagnostics()
+    diagnostics.source = code
+
+    if (cache is not None) and not streaming:
+        loaded = parsed.load(cache, code)
+        if loaded is not None:
+            program, records = loaded
+            for record in records:  # warnings, a cached program has no errors
+                diagnostics.report(record.level, record.message, record.span).notes = record.notes
+            return program
+
+    lexer.diagnostics = parser.diagnostics = diagnostics
+    lexer.lineno = 1
+
+    parser.symbols_table = SymbolsTable()
+    parser.spool = Spool(code) if streaming else None
+    parser.propagation = Propagation()
+
+    try:
+        result = parser.parse(code, lexer=lexer, tracking=True)
+    except TooManyErrors:
+        return None
+
+    if diagnostics.errors:
+        return None
+    elif (cache is not None) and not streaming:
+        parsed.store(cache, code, result, diagnostics.records)
+    return result
+
+
+def add_code_generation_arguments(arguments) -> None:
+    group = arguments.add_argument_group('code generation')
+    group.add_argument('--no-strength-reduction', dest='strength_reduction', action='store_false',
+                       help="keeps 'imul'/'idiv' for multiplication and division by constants")
+    group.add_argument('--no-instruction-selection', dest='instruction_selection', action='store_false',
+                       help="loads, pushes and pops both operands of every binary operation")
+    group.add_argument('--fast-math', choices=('sse', 'x87'),
+                       help="polynomial sin and cos routines instead of 'fsin'/'fcos' (at most 1 ulp off)")
+    group.add_argument('--simd', choices=('sse', 'avx2'), default='sse',
+                       help="packed instructions of the loops whole-array statements compile to (default: %(default)s)")
+    group.add_argument('--no-layout', dest='layout', action='store_false',
+                       help="'.comm' storage in symbol table order instead of the cache-aware '.bss' layout")
+    group.add_argument('--no-propagation', dest='propagation', action='store_false',
+                       help="reloads copied variables and constants instead of reading them from their sources, "
+                            "and what the previous statement just stored")
+    group.add_argument('--narrow-shorts', dest='widened_shorts', action='store_false',
+                       help="16-bit 'movw'/'addw'/'imulw'/'idivw' on '%%ax' for 'short' arithmetic instead of "
+                            "sign-extended 32-bit registers ('short' operands of other types are still sign-extended)")
+    group.add_argument('--no-conversion-planning', dest='conversion_planning', action='store_false',
+                       help="converts every integral operand of a fractional operation where it is used, on the "
+                            "FPU through the stack")
+    group.add_argument('--fma', action='store_true',
+                       help="contracts 'float'/'double' multiplications into the additions and subtractions they "
+                            "feed ('vfmadd' and such, rounding once), guarded by cpuid")
+    group.add_argument('--jobs', type=int, default=1, metavar='N',
+                       help="worker processes generating the code of statement chunks, 0 for one per cpu "
+                            "(default: %(default)s)")
+    group.add_argument('--entry', metavar='NAME',
+                       help="compiles a unit with the entry point '_NAME' for 'python3 -m linker', only it and "
+                            "'export' variables global (default: '_example', everything global)")
+    group.add_argument('--instrument', action='store_true',
+                       help="counts cycles ('rdtsc'/'rdtscp') and hits of every statement into '__cmmm_profile'")
+
+
+def add_cache_arguments(arguments) -> None:
+    arguments.add_argument('--ast-cache', metavar='DIR',
+                           help="directory of parsed programs, loaded instead of parsing sources parsed before with "
+                                "the same options")
+
+
+def add_diagnostics_arguments(arguments) -> None:
+    group = arguments.add_argument_group('diagnostics')
+    group.add_argument('--diagnostics', choices=styles, default='colored' if sys.stderr.isatty() else 'plain',
+                       help="how errors and warnings are written to stderr (colored on a terminal by default)")
+    group.add_argument('--max-errors', type=int, default=20, metavar='N',
+                       help="stops at the N-th error, 0 for no limit (default: %(default)s)")
+
+
+def diagnostics_options(namespace) -> dict:
+    return {'max_errors': namespace.max_errors or None}
+
+
+def code_generation_options(namespace) -> dict:
+    return {option.name: getattr(namespace, option.name)
+            for option in fields(CodeGeneration) if hasattr(namespace, option.name)}
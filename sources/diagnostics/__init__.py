@@ -0,0 +1 @@
+from .diagnostics import *
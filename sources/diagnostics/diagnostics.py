@@ -0,0 +1,147 @@
+import json
+
+from dataclasses import *
+
+
+def colorize(color: str, s: str):
+    if color == 'crimson':
+        return f"\033[1;31m{s}\033[0m"
+    elif color == 'red':
+        return f"\33[31m{s}\33[0m"
+    elif color == 'yellow':
+        return f"\33[33m{s}\33[0m"
+    elif color == 'blue':
+        return f"\33[34m{s}\33[0m"
+    elif color == 'violet':
+        return f"\33[35m{s}\33[0m"
+    else:  # invalid color
+        return f"{s}"
+
+
+levels = {  # level -> color
+    'error': 'red',
+    'warning': 'yellow',
+    'info': 'blue',
+    'hint': 'violet'
+}
+
+
+@dataclass
+class Span:
+    """ ~ where in the source a diagnostic points at ~ """
+
+    line: int
+    start: int  # offset in the source
+    end: int = None  # exclusive, one character if None
+
+    def column(self, source: str) -> int:
+        return self.start - source.rfind('\n', 0, self.start)
+
+
+@dataclass
+class Diagnostic:
+    """ ~ error, warning or info, with hints or infos attached ~ """
+
+    level: str
+    message: str
+    span: Span = None
+    notes: list = field(default_factory=list)  # [Diagnostic]
+
+
+class TooManyErrors(Exception):
+    pass
+
+
+@dataclass
+class Diagnostics:
+    """ ~ diagnostics collector, written out all at once after compilation ~ """
+
+    source: str = ''
+    max_errors: int = None  # raises TooManyErrors at that many errors, None for no limit
+
+    records: [Diagnostic] = \
+        field(default_factory=list)
+    errors: int = 0
+    warnings: int = 0
+
+    def report(self, level: str, message: str, span: Span = None, *notes: (str, str)) -> Diagnostic:
+        """ records a diagnostic with ('hint' or 'info', text) 'notes' """
+
+        record = Diagnostic(level, message, span, [Diagnostic(*note) for note in notes])
+        self.records.append(record)
+
+        if level == 'error':
+            self.errors += 1
+            if (self.max_errors is not None) and (self.errors >= self.max_errors):
+                self.records.append(Diagnostic('info', f"stopped after {self.errors} errors (--max-errors)"))
+                raise TooManyErrors(self.errors)
+        elif level == 'warning':
+            self.warnings += 1
+        return record
+
+    def error(self, message: str, span: Span = None, *notes: (str, str)) -> Diagnostic:
+        return self.report('error', message, span, *notes)
+
+    def warning(self, message: str, span: Span = None, *notes: (str, str)) -> Diagnostic:
+        return self.report('warning', message, span, *notes)
+
+    def info(self, message: str, span: Span = None, *notes: (str, str)) -> Diagnostic:
+        return self.report('info', message, span, *notes)
+
+    def line(self, span: Span) -> str:
+        """ the source line 'span' is on, found around it rather than by splitting the whole source """
+
+        start = self.source.rfind('\n', 0, span.start) + 1
+        end = self.source.find('\n', span.start)
+        return self.source[start:end if end != -1 else len(self.source)]
+
+    def location(self, span: Span) -> str:
+        return f"{span.line}:{span.column(self.source)}"
+
+    def excerpt(self, span: Span) -> (str, str):
+        """ source line and the '^~~' marker under the span """
+
+        column = span.column(self.source)
+        width = max(1, min((span.end or span.start + 1) - span.start, len(self.line(span)) - column + 1))
+        return self.line(span), ' ' * (column - 1) + '^' + '~' * (width - 1)
+
+    def text(self, record: Diagnostic, color: bool) -> str:
+        paint = (lambda c, s: colorize(c, s)) if color else (lambda c, s: s)
+
+        lines = [paint(levels[record.level], f"{record.level}: {record.message}" +
+                       (f", at {self.location(record.span)}" if record.span else ''))]
+        if record.span and (record.level in ('error', 'warning')):
+            source, marker = self.excerpt(record.span)
+            lines += [source, paint('crimson' if record.level == 'error' else levels[record.level], marker)]
+        lines += [paint(levels[note.level], f"{note.level}: {note.message}" +
+                        (f", at {self.location(note.span)}" if note.span else ''))
+                  for note in record.notes]
+        return '\n'.join(lines)
+
+    def as_dict(self, record: Diagnostic) -> dict:
+        return {
+            'level': record.level,
+            'message': record.message,
+            **({
+                'line': record.span.line,
+                'column': record.span.column(self.source),
+                'start': record.span.start,
+                'end': record.span.end or record.span.start + 1
+            } if record.span else {}),
+            'notes': [self.as_dict(note) for note in record.notes]
+        }
+
+    def render(self, style: str = 'plain') -> str:
+        if style == 'json':
+            return json.dumps({'errors': self.errors, 'warnings': self.warnings,
+                               'diagnostics': [self.as_dict(record) for record in self.records]}, indent=2) + '\n'
+        return ''.join(f"{self.text(record, style == 'colored')}\n\n" for record in self.records)
+
+    def write(self, stream, style: str = 'plain') -> None:
+        """ everything in one write """
+        if self.records or (style == 'json'):
+            stream.write(self.render(style))
+            stream.flush()
+
+
+styles = ['plain', 'colored', 'json']
@@ -0,0 +1,2 @@
+from .harness import *
+from .corpus import (generate, write_corpus)
@@ -0,0 +1,40 @@
+import argparse
+import json
+import sys
+
+from compiler import *
+from harness import *
+
+
+if __name__ == '__main__':
+    arguments = argparse.ArgumentParser(prog='harness', description="times generated code natively")
+    arguments.add_argument('paths', nargs='*', help="'.cmmm' files or directories of them")
+    arguments.add_argument('--warmup', type=int, default=1000)
+    arguments.add_argument('--repeat', type=int, default=7)
+    arguments.add_argument('--number', type=int, default=10000)
+    arguments.add_argument('--corpus', metavar='DIRECTORY', help="writes the synthetic corpus there first")
+    arguments.add_argument('--json', metavar='FILE', help="'-' for stdout")
+    add_code_generation_arguments(arguments)
+    options = arguments.parse_args()
+
+    paths = list(options.paths)
+    if options.corpus:
+        write_corpus(options.corpus)
+        paths.append(options.corpus)
+
+    results = []
+    for path in sources(paths):
+        with open(path, 'r') as c:
+            results.append(
+                run(c.read(), path, options=code_generation_options(options),
+                    warmup=options.warmup, repeat=options.repeat, number=options.number)
+            )
+        print(f"{path}: {results[-1]['ns_per_call']:.1f} ns per call "
+              f"(median {results[-1]['ns_per_call_median']:.1f}, "
+              f"loop overhead {results[-1]['loop_overhead_ns']:.1f})", file=sys.stderr)
+
+    if options.json == '-':
+        json.dump(results, sys.stdout, indent=2)
+    elif options.json:
+        with open(options.json, 'w') as j:
+            json.dump(results, j, indent=2)
@@ -0,0 +1,78 @@
+# loading parsed programs from the cache ('parser/cache.py') against lexing and parsing them, on the synthetic
+# corpus: 'python3 -m harness.cache --corpus 8 --statements 2000'. pickling the same object graph is timed too, and
+# every loaded program is checked to generate the code the parsed one does
+
+import argparse
+import gc
+import json
+import pickle
+import sys
+import time
+
+from compiler import *
+from parser import cache
+
+from .corpus import generate
+
+
+def best(function, repeat: int) -> (float, object):
+    """ fastest of 'repeat' calls of 'function' in seconds, and what it returned """
+
+    timings, result = [], None
+    for _ in range(repeat):
+        result = None  # freeing the last one is no part of the next call
+        start = time.perf_counter()
+        result = function()
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+
+def measure(code: str, options: dict, repeat: int) -> dict:
+    parsing, program = best(lambda: compile_program(code, **options), repeat)
+    if program is None:
+        raise SyntaxError("synthetic program has errors")
+
+    dumping, data = best(lambda: cache.dumps(program, code), repeat)
+    loading, (loaded, _) = best(lambda: cache.loads(data, code), repeat)
+    pickled = pickle.dumps(program, pickle.HIGHEST_PROTOCOL)
+    unpickling, _ = best(lambda: pickle.loads(pickled), repeat)
+
+    if repr(loaded) != repr(program):
+        raise AssertionError("loaded program generates other code")
+    return {'source_bytes': len(code), 'cache_bytes': len(data), 'pickle_bytes': len(pickled),
+            'parse_ms': 1000 * parsing, 'dump_ms': 1000 * dumping, 'load_ms': 1000 * loading,
+            'unpickle_ms': 1000 * unpickling}
+
+
+if __name__ == '__main__':
+    arguments = argparse.ArgumentParser(prog='harness.cache', description="cached programs loaded against parsing")
+    arguments.add_argument('--corpus', type=int, default=8, metavar='FILES', help="synthetic programs")
+    arguments.add_argument('--statements', type=int, default=2000, help="of every program")
+    arguments.add_argument('--seed', type=int, default=0)
+    arguments.add_argument('--repeat', type=int, default=3, help="of every measurement, the best one counts")
+    arguments.add_argument('--json', metavar='FILE', help="'-' for stdout")
+    add_code_generation_arguments(arguments)
+    options = arguments.parse_args()
+
+    rows = []
+    for i in range(options.corpus):
+        gc.collect()
+        rows.append(measure(generate(options.seed + i, options.statements), code_generation_options(options),
+                            options.repeat))
+        print(f"synthetic{i:03}: parsed in {rows[-1]['parse_ms']:.1f} ms, loaded in {rows[-1]['load_ms']:.1f} ms "
+              f"({rows[-1]['parse_ms'] / rows[-1]['load_ms']:.1f}x), unpickled in {rows[-1]['unpickle_ms']:.1f} ms, "
+              f"{rows[-1]['cache_bytes']} bytes cached", file=sys.stderr)
+
+    totals = {key: sum(row[key] for row in rows) for key in rows[0]}
+    print(f"total: parsing {totals['parse_ms']:.0f} ms, loading {totals['load_ms']:.0f} ms "
+          f"({totals['parse_ms'] / totals['load_ms']:.1f}x faster, dumping {totals['dump_ms']:.0f} ms), "
+          f"unpickling {totals['unpickle_ms']:.0f} ms; {totals['cache_bytes']} bytes cached "
+          f"({totals['cache_bytes'] / totals['source_bytes']:.1f}x the sources, pickles "
+          f"{totals['pickle_bytes'] / totals['source_bytes']:.1f}x)", file=sys.stderr)
+
+    results = {'options': code_generation_options(options), 'programs': rows, 'totals': totals}
+    if options.json == '-':
+        json.dump(results, sys.stdout, indent=2)
+    elif options.json:
+        with open(options.json, 'w') as j:
+            json.dump(results, j, indent=2)
@@ -0,0 +1,101 @@
+# synthetic corpus of valid, trap-free programs
+
+import os
+import random
+
+scalars = {
+    'short':  ['s0', 's1', 's2'],
+    'int':    ['i0', 'i1', 'i2'],
+    'float':  ['f0', 'f1', 'f2'],
+    'double': ['d0', 'd1', 'd2']
+}
+
+arrays = {
+    'short':  ('sa', 8),
+    'int':    ('ia', 16),
+    'float':  ('fa', 8),
+    'double': ('da', 32)
+}
+
+index = 'k'  # only ever assigned constants, so it is always a valid index of the current target
+
+
+def declarations() -> str:
+    return '\n'.join(
+        f"{data_type} {', '.join(scalars[data_type])}, {arrays[data_type][0]}[{arrays[data_type][1]}];"
+        for data_type in scalars
+    ) + f"\nint {index};\n"
+
+
+class Generator:
+
+    def __init__(self, seed: int, depth: int = 3):
+        self.random = random.Random(seed)
+        self.depth = depth
+        self.index = 0  # current value of 'k'
+
+    def constant(self) -> str:
+        if self.random.random() < 0.5:
+            return str(self.random.randint(0, 100))
+        else:
+            return f"{self.random.uniform(0, 10):.3f}"
+
+    def array_usage(self) -> str:
+        identifier, size = arrays[self.random.choice(list(arrays))]
+        if self.index < size and self.random.random() < 0.3:
+            return f"{identifier}[{index}]"
+        else:
+            return f"{identifier}[{self.random.randrange(size)}]"
+
+    def leaf(self) -> str:
+        kind = self.random.random()
+        if kind < 0.45:
+            return self.random.choice(scalars[self.random.choice(list(scalars))])
+        elif kind < 0.7:
+            return self.array_usage()
+        else:
+            return self.constant()
+
+    def expression(self, depth: int) -> str:
+        if depth == 0 or self.random.random() < 0.25:
+            return self.leaf()
+
+        kind = self.random.random()
+        if kind < 0.08:
+            return f"{self.random.choice(['sin', 'cos'])}({self.expression(depth - 1)})"
+        elif kind < 0.16:
+            return f"-{self.leaf()}"
+        elif kind < 0.3:
+            # divisors are nonzero constants, integral division never traps
+            return f"({self.expression(depth - 1)}) / {self.random.randint(1, 100)}"
+        else:
+            operator = self.random.choice('+-*')
+            return f"({self.expression(depth - 1)}) {operator} ({self.expression(depth - 1)})"
+
+    def statement(self) -> str:
+        if self.random.random() < 0.05:
+            self.index = self.random.randrange(8)
+            return f"{index} = {self.index};"
+        elif self.random.random() < 0.3:
+            return f"{self.array_usage()} = {self.expression(self.depth)};"
+        else:
+            return f"{self.random.choice(scalars[self.random.choice(list(scalars))])} = " \
+                   f"{self.expression(self.depth)};"
+
+
+def generate(seed: int, statements: int = 50, depth: int = 3) -> str:
+    """ deterministic program with 'statements' assignments """
+
+    generator = Generator(seed, depth)
+    return declarations() + '\n'.join(generator.statement() for _ in range(statements)) + '\n'
+
+
+def write_corpus(directory: str, files: int = 16, statements: int = 50, seed: int = 0) -> [str]:
+    os.makedirs(directory, exist_ok=True)
+
+    paths = []
+    for i in range(files):
+        paths.append(os.path.join(directory, f"synthetic{i:03}.cmmm"))
+        with open(paths[-1], 'w') as f:
+            f.write(generate(seed + i, statements))
+    return paths
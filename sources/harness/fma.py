@@ -0,0 +1,130 @@
+# fma contraction ('--fma') against separate multiplications and additions, on generated dot-product-style kernels
+# run through the execution harness: 'python3 -m harness.fma --length 32'. every kernel is timed without '--fma',
+# with it, and with it as on a cpu without fma (the flag of the cpuid check set to 'no fma' before the first call);
+# the fallback has to give the same bits as no contraction, the fused results are compared in units in the last place
+
+import argparse
+import ctypes
+import random
+import struct
+import sys
+import tempfile
+
+from compiler import *
+from parser.contraction import flag
+
+from .harness import build
+
+formats = {'float': 'f', 'double': 'd'}
+
+
+def declarations(data_type: str, length: int) -> str:
+    return f"{data_type} x[{length}], y[{length}], z[{length}], s, k;\n"
+
+
+def dot(length: int) -> str:
+    """ one statement, the products summed left to right """
+
+    products = '(x[0] * y[0])'
+    for i in range(1, length):
+        products = f"({products} + (x[{i}] * y[{i}]))"
+    return f"s = {products};\n"
+
+
+def accumulation(length: int) -> str:
+    """ a statement per element, adding its product to 's' """
+    return "s = 0;\n" + ''.join(f"s = s + (x[{i}] * y[{i}]);\n" for i in range(length))
+
+
+def axpy(length: int) -> str:
+    return ''.join(f"z[{i}] = (k * x[{i}]) + y[{i}];\n" for i in range(length))
+
+
+def horner(length: int) -> str:
+    """ the polynomial with the coefficients 'x' at 'k' """
+
+    polynomial = f"x[{length - 1}]"
+    for i in reversed(range(length - 1)):
+        polynomial = f"(({polynomial}) * k) + x[{i}]"
+    return f"s = {polynomial};\n"
+
+
+kernels = {'dot': dot, 'accumulation': accumulation, 'axpy': axpy, 'horner': horner}
+
+
+def inputs(seed: int, length: int) -> dict:
+    """ positive values, sums of them cancel nowhere """
+
+    generator = random.Random(seed)
+    return {'x': [generator.uniform(0.5, 2) for _ in range(length)],
+            'y': [generator.uniform(0.5, 2) for _ in range(length)],
+            'k': generator.uniform(0.5, 1)}
+
+
+def ulps(one: float, two: float, data_type: str) -> int:
+    """ units in the last place between two values of the same sign """
+
+    integer = {'f': 'i', 'd': 'q'}[formats[data_type]]
+    bits = [struct.unpack(integer, struct.pack(formats[data_type], value))[0] for value in (one, two)]
+    return abs(bits[0] - bits[1])
+
+
+def benchmark(length: int, seed: int, rounds: int = 3, **measure) -> [dict]:
+    """ ns per call of every kernel unfused, fused and falling back (the best of 'rounds' taking turns, a machine
+        busy for a moment slows one of them down less), the variables the fallback gets wrong and the largest
+        difference of the fused results """
+
+    results = []
+    with tempfile.TemporaryDirectory(prefix='cmmm-') as directory:
+        for data_type in formats:
+            for name, kernel in kernels.items():
+                code, values = declarations(data_type, length) + kernel(length), inputs(seed, length)
+
+                row, compiled, variables = {'kernel': f"{name} ({data_type})"}, {}, {}
+                for mode, fma, fallback in (('unfused', False, False), ('fused', True, False),
+                                            ('fallback', True, True)):
+                    program = compile_program(code, fma=fma)
+                    compiled[mode] = build(program, directory, f"fma_{data_type}_{name}_{mode}")
+                    if fallback:  # checked already, no fma
+                        ctypes.c_uint8.in_dll(compiled[mode].library, flag).value = 1
+
+                    compiled[mode].write(values)
+                    compiled[mode]()
+                    variables[mode] = compiled[mode].read()
+
+                for mode in compiled:
+                    row[mode] = min(compiled[mode].measure(values=values, **measure)['ns_per_call']
+                                    for _ in range(rounds))
+
+                row['mismatches'] = [variable for variable, value in variables['unfused'].items()
+                                     if variables['fallback'][variable] != value]
+                unfused, fused = variables['unfused'], variables['fused']
+                row['ulps'] = max(ulps(one, two, data_type)
+                                  for one, two in zip([unfused['s'], *unfused['z']], [fused['s'], *fused['z']]))
+                results.append(row)
+    return results
+
+
+if __name__ == '__main__':
+    arguments = argparse.ArgumentParser(prog='harness.fma',
+                                        description="fma contraction against separate multiplications and additions")
+    arguments.add_argument('--length', type=int, default=32, help="elements of the vectors of every kernel")
+    arguments.add_argument('--seed', type=int, default=0)
+    arguments.add_argument('--repeat', type=int, default=7)
+    arguments.add_argument('--number', type=int, default=10000)
+    arguments.add_argument('--rounds', type=int, default=3,
+                           help="of timing the three versions in turn, the best counts")
+    options = arguments.parse_args()
+
+    rows = benchmark(options.length, options.seed, options.rounds, repeat=options.repeat, number=options.number)
+    for row in rows:
+        print(f"{row['kernel']}: unfused {row['unfused']:.1f} ns, fused {row['fused']:.1f} ns "
+              f"({row['unfused'] / row['fused']:.2f}x{', slower' if row['fused'] > row['unfused'] else ''}), "
+              f"fallback {row['fallback']:.1f} ns; fused results at most {row['ulps']} ulp off"
+              f"{', fallback wrong: ' + ' '.join(row['mismatches']) if row['mismatches'] else ''}")
+
+    unfused, fused = sum(row['unfused'] for row in rows), sum(row['fused'] for row in rows)
+    slower = [row['kernel'] for row in rows if row['fused'] > row['unfused']]
+    print(f"total: {unfused:.1f} -> {fused:.1f} ns ({unfused / fused:.2f}x)"
+          f"{', fused slower for ' + ', '.join(slower) if slower else ''}", file=sys.stderr)
+    sys.exit(1 if any(row['mismatches'] for row in rows) else 0)
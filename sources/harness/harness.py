@@ -0,0 +1,195 @@
+# native execution and timing harness for generated code
+
+import ctypes
+import os
+import subprocess
+import tempfile
+import time
+
+from compiler import *
+from parser import *
+
+ctypes_types = {
+    'short':  ctypes.c_short,
+    'int':    ctypes.c_int,
+    'float':  ctypes.c_float,
+    'double': ctypes.c_double
+}
+
+# calls the entry point 'n' times (%rdi), so python-side call overhead is paid once per measurement
+loop_stub = """
+.text
+
+.globl _harness_loop
+_harness_loop:
+pushq %rbx
+movq %rdi, %rbx
+testq %rbx, %rbx
+jz 2f
+1:
+call *_harness_entry(%rip)
+decq %rbx
+jnz 1b
+2:
+popq %rbx
+retq
+
+.globl _harness_empty
+_harness_empty:
+retq
+
+.data
+.balign 8
+.globl _harness_entry
+_harness_entry: .quad _harness_empty
+"""
+
+
+def assemble(assembly: str, directory: str, name: str) -> str:
+    """ assembles 'assembly' with the local toolchain, returns path of the object file """
+
+    source, target = os.path.join(directory, f"{name}.s"), os.path.join(directory, f"{name}.o")
+    with open(source, 'w') as s:
+        s.write(assembly)
+
+    # generated code uses '//' comments, so it goes through the c preprocessor first
+    subprocess.run(
+        [os.environ.get('CC', 'cc'), '-c', '-x', 'assembler-with-cpp', source, '-o', target],
+        check=True, capture_output=True, text=True
+    )
+    return target
+
+
+def link(objects: [str], directory: str, name: str) -> str:
+    """ links 'objects' into a shared object, returns its path """
+
+    target = os.path.join(directory, f"lib{name}.so")
+    subprocess.run(
+        # '.comm' symbols are addressed %rip-relative, so they must bind locally
+        [os.environ.get('CC', 'cc'), '-shared', '-Wl,-Bsymbolic', '-Wl,-z,noexecstack', *objects, '-o', target],
+        check=True, capture_output=True, text=True
+    )
+    return target
+
+
+class Kernel:
+    """ ~ compiled program loaded into the process ~ """
+
+    def __init__(self, library: ctypes.CDLL, symbols_table: SymbolsTable, entry: str = '_example'):
+        self.library = library
+        self.symbols_table = symbols_table
+        self.entry = entry
+
+        self.function = getattr(library, entry)
+        self.function.restype, self.function.argtypes = None, []
+
+        self.loop = library._harness_loop
+        self.loop.restype, self.loop.argtypes = None, [ctypes.c_uint64]
+
+        self.loop_entry = ctypes.c_void_p.in_dll(library, '_harness_entry')
+        self.empty = ctypes.cast(library._harness_empty, ctypes.c_void_p).value
+
+    def storage(self, declaration: Declaration):
+        data_type = ctypes_types[declaration.data_type]
+        if type(declaration) == ArrayDeclaration:
+            return (data_type * declaration.size).in_dll(self.library, declaration.identifier)
+        else:  # elif type(declaration) == VariableDeclaration:
+            return data_type.in_dll(self.library, declaration.identifier)
+
+    def read(self) -> dict:
+        """ values of all declared variables and arrays, by source name """
+
+        values = {}
+        for declaration in self.symbols_table.declarations:
+            storage = self.storage(declaration)
+            values[declaration.identifier[1:]] = \
+                list(storage) if type(declaration) == ArrayDeclaration else storage.value
+        return values
+
+    def write(self, values: dict = None) -> None:
+        """ resets '.bss' to zeros (like at load time), then stores 'values' given by source name """
+
+        values = values or {}
+        for declaration in self.symbols_table.declarations:
+            storage = self.storage(declaration)
+            value = values.get(declaration.identifier[1:], 0)
+            if type(declaration) == ArrayDeclaration:
+                value = value if isinstance(value, (list, tuple)) else [value] * declaration.size
+                for i in range(declaration.size):
+                    storage[i] = value[i]
+            else:
+                storage.value = value
+
+    def __call__(self) -> None:
+        self.function()
+
+    def timed_loop(self, function: int, number: int) -> int:
+        self.loop_entry.value = function
+        start = time.perf_counter_ns()
+        self.loop(number)
+        return time.perf_counter_ns() - start
+
+    def measure(self, warmup: int = 1000, repeat: int = 7, number: int = 10000, values: dict = None) -> dict:
+        """ ns per call of the entry point, best and median over 'repeat' runs of 'number' calls """
+
+        function = ctypes.cast(self.function, ctypes.c_void_p).value
+
+        self.write(values)
+        self.timed_loop(function, warmup)
+
+        timings, overheads = [], []
+        for _ in range(repeat):
+            self.write(values)  # every run starts from the same state
+            timings.append(self.timed_loop(function, number) / number)
+            overheads.append(self.timed_loop(self.empty, number) / number)
+
+        timings.sort()
+        return {
+            'ns_per_call': timings[0],
+            'ns_per_call_median': timings[len(timings) // 2],
+            'loop_overhead_ns': min(overheads),
+            'warmup': warmup, 'repeat': repeat, 'number': number
+        }
+
+
+def sources(paths: [str]) -> [str]:
+    """ '.cmmm' files of 'paths', directories expanded """
+
+    for path in paths:
+        if os.path.isdir(path):
+            yield from sorted(os.path.join(path, f) for f in os.listdir(path) if f.endswith('.cmmm'))
+        else:
+            yield path
+
+
+def build(program: ProgramStatements, directory: str, name: str = 'example') -> Kernel:
+    """ assembles and links 'program' together with the loop stub, then loads it """
+
+    objects = [
+        assemble("// example.s\n" + repr(program), directory, name),
+        assemble(loop_stub, directory, f"{name}_loop")
+    ]
+    return Kernel(ctypes.CDLL(link(objects, directory, name)), program.symbols_table)
+
+
+def run(code: str, source: str = '<string>', values: dict = None, options: dict = None, **measure) -> dict:
+    """ compiles with code generation 'options', runs once to read back the results, then times the entry point """
+
+    diagnostics = Diagnostics()
+    program = compile_program(code, diagnostics, **(options or {}))
+    if program is None:
+        raise SyntaxError(f"'{source}' has errors\n{diagnostics.render()}")
+
+    with tempfile.TemporaryDirectory(prefix='cmmm-') as directory:
+        kernel = build(program, directory)
+
+        kernel.write(values)
+        kernel()
+        variables = kernel.read()
+
+        return {
+            'source': source,
+            'options': options or {},
+            **kernel.measure(values=values, **measure),
+            'variables': variables
+        }
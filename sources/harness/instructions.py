@@ -0,0 +1,66 @@
+# static instruction counts of the generated code, with some code generation options against the defaults:
+# 'python3 -m harness.instructions --corpus 16 --no-instruction-selection' shows what instruction selection saves
+
+import argparse
+import re
+import sys
+
+from compiler import *
+
+from .corpus import generate
+from .harness import sources
+
+label = re.compile(r'^[\w.$]+:\s*')
+
+
+def count(assembly: str) -> int:
+    """ instructions in 'assembly', without labels, directives, comments and empty lines """
+
+    instructions = 0
+    for line in assembly.split('\n'):
+        line = re.sub(r'/\*.*?\*/', '', line.split('//')[0])
+        line = label.sub('', line.strip()).strip()
+        if line and not line.startswith('.'):
+            instructions += 1
+    return instructions
+
+
+def compiled(code: str, source: str, options: dict) -> str:
+    diagnostics = Diagnostics()
+    program = compile_program(code, diagnostics, **options)
+    if program is None:
+        raise SyntaxError(f"'{source}' has errors\n{diagnostics.render()}")
+    return repr(program)
+
+
+def compare(programs: {str: str}, options: dict) -> [dict]:
+    return [{
+        'source': source,
+        'options': count(compiled(code, source, options)),
+        'defaults': count(compiled(code, source, {}))
+    } for source, code in programs.items()]
+
+
+if __name__ == '__main__':
+    arguments = argparse.ArgumentParser(prog='harness.instructions',
+                                        description="counts instructions with the given options and with the defaults")
+    arguments.add_argument('paths', nargs='*', help="'.cmmm' files or directories of them")
+    arguments.add_argument('--corpus', type=int, default=0, metavar='FILES', help="synthetic programs to count too")
+    arguments.add_argument('--seed', type=int, default=0)
+    add_code_generation_arguments(arguments)
+    options = arguments.parse_args()
+
+    programs = {}
+    for path in sources(options.paths):
+        with open(path, 'r') as c:
+            programs[path] = c.read()
+    for i in range(options.corpus):
+        programs[f"synthetic{i:03}"] = generate(options.seed + i)
+
+    rows = compare(programs, code_generation_options(options))
+    for row in rows:
+        print(f"{row['source']}: {row['options']} -> {row['defaults']} ({row['defaults'] - row['options']:+})")
+
+    total, defaults = sum(row['options'] for row in rows), sum(row['defaults'] for row in rows)
+    print(f"total: {total} -> {defaults} ({defaults - total:+}, {100.0 * (defaults - total) / max(total, 1):+.1f}%)",
+          file=sys.stderr)
@@ -0,0 +1,118 @@
+# native check of strength reduced multiplication and division against 'imul'/'idiv':
+# exhaustive over all 16-bit operands, sampled over 32-bit ones, and 'int' ones of 'short' operands
+# (all 16-bit values, with garbage above them like '--narrow-shorts' loads leave)
+
+import ctypes
+import random
+import sys
+import tempfile
+
+from parser.lowering import *
+
+from .harness import (assemble, link)
+
+# runs the sequence over 'n' (%rdx) int32 operands from (%rdi), stores results to (%rsi)
+checker = """
+.globl {name}
+{name}:
+pushq %rbx
+movq %rdx, %rbx
+1:
+testq %rbx, %rbx
+jz 2f
+movl (%rdi), %eax
+{sequence}
+movl %eax, (%rsi)
+addq $4, %rdi
+addq $4, %rsi
+decq %rbx
+jmp 1b
+2:
+popq %rbx
+retq
+"""
+
+
+def constants(bits: int, count: int, seed: int) -> [int]:
+    generator = random.Random(seed)
+    values = set(range(0, 1025))
+    for shift in range(bits + 1):
+        values.update({(1 << shift) - 1, 1 << shift, (1 << shift) + 1})
+    values.update(generator.randrange(1 << bits) for _ in range(count))
+    return sorted(values)
+
+
+def operands(bits: int, seed: int) -> [int]:
+    generator = random.Random(seed)
+    if bits == 16:
+        # every 16-bit value, with garbage above it, like 'movw' leaves in %eax
+        return [signed((value & 0xFFFF) | (generator.randrange(1 << 16) << 16), 32) for value in range(1 << 16)]
+    values = [-2 ** 31, 2 ** 31 - 1, -1, 0, 1]
+    values += [signed(generator.getrandbits(32), 32) for _ in range(20000)]
+    values += [generator.randrange(-2 ** 15, 2 ** 15) for _ in range(5000)]
+    return values
+
+
+def reference(operation: str, operand: int, constant: int, bits: int) -> int:
+    operand, constant = signed(operand, bits), signed(constant, bits)
+    if operation == 'multiplication':
+        return signed(operand * constant, bits)
+    quotient = abs(operand) // abs(constant)
+    return signed(quotient if (operand < 0) == (constant < 0) else -quotient, bits)
+
+
+def original(operation: str, constant: int, bits: int) -> str:
+    """ what the compiler emits without strength reduction, the reference for 'operation' """
+
+    constant = signed(constant, bits)
+    if operation == 'multiplication':
+        return f"imull ${constant}, %eax, %eax\n"
+    return ("movswl %ax, %eax\n" if bits == 16 else "") + f"movl ${constant}, %ecx\ncltd\nidivl %ecx\n"
+
+
+def check(bits: int, seed: int = 0, operand_bits: int = None) -> int:
+    """ failed sequences of 'bits' operations, of 'operand_bits' operands (the same by default) """
+
+    operand_bits = operand_bits or bits
+    data_type, operand_type = ({16: 'short', 32: 'int'}[size] for size in (bits, operand_bits))
+    truncation = "movzwl %ax, %eax\n" if bits == 16 else ""  # only the low 16 bits are meaningful
+    extension = widened(operand_type, data_type)  # what the compiler does in front of the sequence
+
+    cases = []
+    for constant in constants(bits, 100 if bits == 16 else 2000, seed):
+        cases.append(('multiplication', constant, multiplication(data_type, constant)))
+        if division(data_type, constant) is not None:
+            cases.append(('division', constant, division(data_type, constant)))
+
+    assembly = ".text\n" + ''.join(
+        checker.format(name=f"_check{i}", sequence=extension + sequence + truncation) +
+        checker.format(name=f"_original{i}", sequence=extension + original(operation, constant, bits) + truncation)
+        for i, (operation, constant, sequence) in enumerate(cases)
+    )
+
+    values = operands(operand_bits, seed)
+    inputs = (ctypes.c_int32 * len(values))(*values)
+    outputs, expected = (ctypes.c_int32 * len(values))(), (ctypes.c_int32 * len(values))()
+
+    failures = 0
+    with tempfile.TemporaryDirectory(prefix='cmmm-') as directory:
+        library = ctypes.CDLL(link([assemble(assembly, directory, 'lowering')], directory, 'lowering'))
+        for i, (operation, constant, _) in enumerate(cases):
+            getattr(library, f"_check{i}")(inputs, outputs, ctypes.c_uint64(len(values)))
+            getattr(library, f"_original{i}")(inputs, expected, ctypes.c_uint64(len(values)))
+            if bytes(outputs) == bytes(expected):
+                continue
+
+            failures += 1
+            operand, result = next((o, r) for o, r, e in zip(values, outputs, expected) if r != e)
+            operand = signed(operand, operand_bits)
+            print(f"{data_type} {operation} by {signed(constant, bits)} of {operand_type} {operand} gives "
+                  f"{signed(result, bits)}, not {reference(operation, operand, constant, bits)}", file=sys.stderr)
+
+    print(f"{data_type} of {operand_type}: {len(cases)} sequences checked over {len(values)} operands, "
+          f"{failures} failed", file=sys.stderr)
+    return failures
+
+
+if __name__ == '__main__':
+    exit(1 if (check(16) + check(32) + check(32, operand_bits=16)) else 0)
@@ -0,0 +1,203 @@
+# quality of the generated code for a fixed corpus ('resources/example.cmmm' and the synthetic programs), against a
+# checked-in baseline: instructions, memory loads and stores, push/pop pairs (values moved through the stack), x87
+# and sse instructions, bytes of '.bss' and of initialized data, temporaries. 'python3 -m harness.metrics' compares
+# with 'harness/metrics.json' and fails when a metric of a file or of the whole corpus grew more than its threshold
+# allows; '--update' writes the baseline again once a change is meant to be there. counts are static, of every line
+# of the assembly (the routines of fast math too)
+#
+# the compiler writes no '.data': its initialized data is the constant pool and the tables of the routines, in
+# '.rodata', which is what 'data_bytes' counts
+
+import argparse
+import json
+import math
+import os
+import re
+import sys
+
+from analysis import (
+    parse, accesses
+)
+from compiler import *
+
+from .corpus import generate
+from .harness import sources
+from .instructions import compiled
+
+baseline_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'metrics.json')
+example_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'resources', 'example.cmmm')
+
+# every metric is better the lower it is; sse instructions replacing x87 ones are no regression, so they are only
+# compared when given a threshold
+names = ['instructions', 'loads', 'stores', 'push_pop_pairs', 'x87_instructions', 'sse_instructions', 'bss_bytes',
+         'data_bytes', 'temporaries']
+ungated = {'sse_instructions'}
+
+sizes = {'.byte': 1, '.short': 2, '.word': 2, '.long': 4, '.int': 4, '.float': 4, '.quad': 8, '.double': 8}
+
+definition = re.compile(r'^\s*([\w.$]+):')
+temporary = re.compile(r'(^|\.)_?_tv\d+$')  # '__tv3', '_k1._tv3' once linked
+
+
+def aligned(offset: int, alignment: int) -> int:
+    return -(-offset // alignment) * alignment
+
+
+def metrics(assembly: str) -> dict:
+    """ metrics of 'assembly' """
+
+    counts = dict.fromkeys(names, 0)
+    pushes = pops = 0
+    offsets, section, symbols = {'.bss': 0, '.data': 0, '.rodata': 0}, '.text', set()
+
+    for line in assembly.split('\n'):
+        instruction = parse(line)
+        if instruction is not None:
+            mnemonic, operands = instruction
+            counts['instructions'] += 1
+            if mnemonic.startswith('push'):
+                pushes += 1
+            elif mnemonic.startswith('pop'):
+                pops += 1
+            else:
+                reads, writes = accesses(mnemonic, operands)
+                counts['loads'] += len(reads)
+                counts['stores'] += len(writes)
+            if mnemonic.startswith('f'):
+                counts['x87_instructions'] += 1
+            elif mnemonic.startswith('v') or any('%xmm' in operand or '%ymm' in operand for operand in operands):
+                counts['sse_instructions'] += 1
+            continue
+
+        code = re.sub(r'/\*.*?\*/', '', line.split('//')[0]).strip()
+        if (labelled := definition.match(code)) is not None:
+            symbols.add(labelled.group(1))
+            code = code[labelled.end():].strip()
+        directive, _, arguments = code.partition(' ')
+        arguments = [argument.strip() for argument in arguments.split(',') if argument.strip()]
+
+        if directive in ('.bss', '.data', '.text'):
+            section = directive
+        elif directive == '.section':
+            section = arguments[0]
+        elif directive == '.comm':  # '.comm symbol, size[, alignment]', in '.bss' wherever it is
+            symbols.add(arguments[0])
+            offsets['.bss'] = aligned(offsets['.bss'], int(arguments[2]) if len(arguments) > 2 else 1) + \
+                int(arguments[1])
+        elif section in offsets:
+            if directive == '.balign':
+                offsets[section] = aligned(offsets[section], int(arguments[0]))
+            elif directive in ('.zero', '.skip', '.space'):
+                offsets[section] += int(arguments[0])
+            elif directive in sizes:
+                offsets[section] += sizes[directive] * len(arguments)
+
+    counts['push_pop_pairs'] = min(pushes, pops)
+    counts['bss_bytes'], counts['data_bytes'] = offsets['.bss'], offsets['.data'] + offsets['.rodata']
+    counts['temporaries'] = sum(1 for symbol in symbols if temporary.search(symbol))
+    return counts
+
+
+def corpus(paths: [str], files: int, seed: int, statements: int) -> {str: str}:
+    """ source name -> code: the example, the '.cmmm' files of 'paths', then 'files' synthetic programs """
+
+    with open(example_path, 'r') as c:
+        programs = {'example': c.read()}
+    for path in sources(paths):
+        with open(path, 'r') as c:
+            programs[path] = c.read()
+    for i in range(files):
+        programs[f"synthetic{i:03}"] = generate(seed + i, statements)
+    return programs
+
+
+def measured(programs: {str: str}, options: dict) -> dict:
+    """ metrics of every program and of all of them """
+
+    files = {source: metrics(compiled(code, source, options)) for source, code in programs.items()}
+    return {'options': options, 'files': files,
+            'total': {name: sum(counts[name] for counts in files.values()) for name in names}}
+
+
+def regressions(current: dict, baseline: dict, thresholds: {str: float}) -> [str]:
+    """ metrics of files (and of the total) that grew more than 'thresholds' percent over the baseline """
+
+    found = []
+    compared = [(source, counts, baseline['files'][source]) for source, counts in current['files'].items()
+                if source in baseline['files']]
+    for source, counts, before in compared + [('total', current['total'], baseline['total'])]:
+        for name in names:
+            if (name in thresholds) and (name in before) and \
+                    (counts[name] > before[name] * (1 + thresholds[name] / 100)):
+                found.append(f"{source}: {name} {before[name]} -> {counts[name]} "
+                             f"({100.0 * (counts[name] - before[name]) / max(before[name], 1):+.1f}%, "
+                             f"{thresholds[name]:g}% allowed)")
+    return found
+
+
+def threshold(text: str) -> (str, float):
+    """ 'metric=percent' """
+
+    name, _, percent = text.partition('=')
+    if name not in names:
+        raise argparse.ArgumentTypeError(f"unknown metric '{name}', one of {', '.join(names)}")
+    try:
+        return name, float(percent)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"'{percent}' is no percentage")
+
+
+if __name__ == '__main__':
+    arguments = argparse.ArgumentParser(prog='harness.metrics',
+                                        description="generated code quality against a checked-in baseline")
+    arguments.add_argument('paths', nargs='*', help="'.cmmm' files or directories of them, on top of the corpus")
+    arguments.add_argument('--corpus', type=int, default=16, metavar='FILES', help="synthetic programs")
+    arguments.add_argument('--statements', type=int, default=50, help="of every synthetic program")
+    arguments.add_argument('--seed', type=int, default=0)
+    arguments.add_argument('--baseline', default=baseline_path, metavar='FILE')
+    arguments.add_argument('--update', action='store_true', help="write the baseline instead of comparing with it")
+    arguments.add_argument('--threshold', type=float, default=0.0, metavar='PERCENT',
+                           help="growth allowed for every metric but the sse instructions")
+    arguments.add_argument('--threshold-for', type=threshold, action='append', default=[], metavar='METRIC=PERCENT',
+                           help="growth allowed for one metric, 'inf' to not compare it")
+    add_code_generation_arguments(arguments)
+    options = arguments.parse_args()
+
+    current = measured(corpus(options.paths, options.corpus, options.seed, options.statements),
+                       code_generation_options(options))
+    for source, counts in list(current['files'].items()) + [('total', current['total'])]:
+        print(f"{source}: {', '.join(f'{name} {counts[name]}' for name in names)}")
+
+    if options.update:
+        with open(options.baseline, 'w') as j:
+            json.dump(current, j, indent=2)
+            j.write('\n')
+        print(f"baseline written to '{options.baseline}'", file=sys.stderr)
+        sys.exit(0)
+
+    try:
+        with open(options.baseline, 'r') as j:
+            baseline = json.load(j)
+    except FileNotFoundError:
+        print(f"no baseline '{options.baseline}', write one with '--update'", file=sys.stderr)
+        sys.exit(2)
+
+    if {**baseline['options'], 'jobs': None} != {**current['options'], 'jobs': None}:  # jobs change no code
+        print(f"the baseline was measured with other options ({baseline['options']})", file=sys.stderr)
+        sys.exit(2)
+    unknown = [source for source in current['files'] if source not in baseline['files']]
+    if unknown or (len(current['files']) != len(baseline['files'])):  # the totals would be of other programs
+        print(f"the baseline was measured on other programs ({', '.join(unknown) or 'fewer'})", file=sys.stderr)
+        sys.exit(2)
+
+    thresholds = {name: options.threshold for name in names if name not in ungated}
+    thresholds.update(options.threshold_for)
+    thresholds = {name: percent for name, percent in thresholds.items() if not math.isinf(percent)}
+
+    found = regressions(current, baseline, thresholds)
+    for regression in found:
+        print(f"regression: {regression}", file=sys.stderr)
+    improved = [name for name in names if current['total'][name] < baseline['total'][name]]
+    print(f"{len(found)} regression{'s' if len(found) != 1 else ''} against '{options.baseline}'"
+          f"{', improved: ' + ', '.join(improved) if improved else ''}", file=sys.stderr)
+    sys.exit(1 if found else 0)
@@ -0,0 +1,95 @@
+# per-line profile of instrumented code ('--instrument'): runs the kernel through the execution harness, then reads
+# the cycle and hit counters of every statement out of '__cmmm_profile' and sums them by source line
+
+import argparse
+import ctypes
+import json
+import sys
+import tempfile
+
+from compiler import *
+
+from .harness import build
+
+
+def counters(kernel, statements: int) -> [(int, int)]:
+    """ cycles and hits of every counter """
+
+    table = (ctypes.c_uint64 * (2 * statements)).in_dll(kernel.library, '__cmmm_profile')
+    return [(table[2 * i], table[2 * i + 1]) for i in range(statements)]
+
+
+def reset(kernel, statements: int) -> None:
+    ctypes.memset(ctypes.addressof(ctypes.c_uint64.in_dll(kernel.library, '__cmmm_profile')), 0, 16 * statements)
+
+
+def lines(profile_map: [dict], counted: [(int, int)]) -> [dict]:
+    """ cycles and hits summed by source line, hottest first """
+
+    by_line = {}
+    for symbol, (cycles, hits) in zip(profile_map, counted):
+        line = by_line.setdefault(symbol['line'], {'line': symbol['line'], 'cycles': 0, 'hits': 0, 'statements': []})
+        line['cycles'] += cycles
+        line['hits'] += hits
+        line['statements'].append(symbol['source'])
+    return sorted(by_line.values(), key=lambda line: (-line['cycles'], line['line']))
+
+
+def profile(code: str, source: str = '<string>', values: dict = None, options: dict = None, number: int = 10000,
+            **measure) -> dict:
+    """ compiles 'code' instrumented, runs it 'number' times (after the harness warmup) and reads the counters """
+
+    diagnostics = Diagnostics()
+    program = compile_program(code, diagnostics, **{**(options or {}), 'instrument': True})
+    if program is None:
+        raise SyntaxError(f"'{source}' has errors\n{diagnostics.render()}")
+    profile_map = program.profile_map(code)
+
+    with tempfile.TemporaryDirectory(prefix='cmmm-') as directory:
+        kernel = build(program, directory)
+        function = ctypes.cast(kernel.function, ctypes.c_void_p).value
+
+        kernel.write(values)
+        kernel.timed_loop(function, measure.get('warmup', 1000))
+        reset(kernel, len(profile_map))
+
+        kernel.write(values)
+        kernel.timed_loop(function, number)
+        counted = counters(kernel, len(profile_map))
+
+    return {
+        'source': source,
+        'options': options or {},
+        'number': number,
+        'statements': [{**symbol, 'cycles': cycles, 'hits': hits}
+                       for symbol, (cycles, hits) in zip(profile_map, counted)],
+        'lines': lines(profile_map, counted)
+    }
+
+
+if __name__ == '__main__':
+    arguments = argparse.ArgumentParser(prog='harness.profile', description="per-line cycles of instrumented code")
+    arguments.add_argument('path', help="'.cmmm' file")
+    arguments.add_argument('--warmup', type=int, default=1000)
+    arguments.add_argument('--number', type=int, default=10000, help="calls of the entry point counted")
+    arguments.add_argument('--json', metavar='FILE', help="'-' for stdout")
+    add_code_generation_arguments(arguments)
+    options = arguments.parse_args()
+
+    with open(options.path, 'r') as c:
+        result = profile(c.read(), options.path, options=code_generation_options(options),
+                         number=options.number, warmup=options.warmup)
+
+    total = max(sum(line['cycles'] for line in result['lines']), 1)
+    print(f"{'line':>6} {'cycles/call':>12} {'hits/call':>9} {'share':>6}  statements",
+          file=sys.stderr if options.json == '-' else sys.stdout)
+    for line in result['lines']:
+        print(f"{line['line']:>6} {line['cycles'] / options.number:>12.1f} {line['hits'] / options.number:>9.1f} "
+              f"{100.0 * line['cycles'] / total:>5.1f}%  {' '.join(line['statements'])}",
+              file=sys.stderr if options.json == '-' else sys.stdout)
+
+    if options.json == '-':
+        json.dump(result, sys.stdout, indent=2)
+    elif options.json:
+        with open(options.json, 'w') as j:
+            json.dump(result, j, indent=2)
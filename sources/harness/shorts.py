@@ -0,0 +1,122 @@
+# 'short' arithmetic in 16-bit registers ('--narrow-shorts') against sign-extended 32-bit ones (the default):
+# time per call of synthetic short-heavy programs through the execution harness, the results of both checked
+# against the interpreter (mixed 'short' and 'int' expressions, and stores into 'int' variables, included)
+
+import argparse
+import random
+import sys
+import tempfile
+
+from compiler import *
+from interpreter import interpret
+
+from .harness import build
+
+scalars = ['s0', 's1', 's2', 's3']
+array = ('sa', 8)
+others = ['i0']  # an 'int' now and then, mixed expressions widen the 'short' operands
+
+
+def declarations() -> str:
+    return f"short {', '.join(scalars)}, {array[0]}[{array[1]}];\nint {', '.join(others)};\n"
+
+
+class Generator:
+
+    def __init__(self, seed: int, depth: int = 3):
+        self.random = random.Random(seed)
+        self.depth = depth
+
+    def leaf(self) -> str:
+        kind = self.random.random()
+        if kind < 0.55:
+            return self.random.choice(scalars)
+        elif kind < 0.75:
+            return f"{array[0]}[{self.random.randrange(array[1])}]"
+        elif kind < 0.85:
+            return self.random.choice(others)
+        return str(self.random.randint(0, 300))
+
+    def expression(self, depth: int) -> str:
+        if depth == 0 or self.random.random() < 0.2:
+            return self.leaf()
+
+        kind = self.random.random()
+        if kind < 0.1:
+            return f"-{self.leaf()}"
+        elif kind < 0.3:
+            # divisors are constants 'idiv' would not trap on, even in 16 bits
+            return f"({self.expression(depth - 1)}) / {self.random.randint(2, 100)}"
+        operator = self.random.choice('+-*')
+        return f"({self.expression(depth - 1)}) {operator} ({self.expression(depth - 1)})"
+
+    def statement(self) -> str:
+        kind = self.random.random()
+        if kind < 0.3:
+            destination = f"{array[0]}[{self.random.randrange(array[1])}]"
+        elif kind < 0.45:  # 'short' values stored wider, sign-extended first
+            destination = self.random.choice(others)
+        else:
+            destination = self.random.choice(scalars)
+        return f"{destination} = {self.expression(self.depth)};"
+
+
+def generate(seed: int, statements: int = 50, depth: int = 3) -> str:
+    """ deterministic 'short'-heavy program with 'statements' assignments """
+
+    generator = Generator(seed, depth)
+    return declarations() + '\n'.join(generator.statement() for _ in range(statements)) + '\n'
+
+
+def inputs(seed: int) -> dict:
+    """ negative values too, the ones zero-extension gets wrong """
+
+    generator = random.Random(seed)
+    values = {name: generator.randint(-2 ** 15, 2 ** 15 - 1) for name in scalars}
+    values[array[0]] = [generator.randint(-2 ** 15, 2 ** 15 - 1) for _ in range(array[1])]
+    values.update({name: generator.randint(-2 ** 20, 2 ** 20) for name in others})
+    return values
+
+
+def benchmark(programs: int, statements: int, seed: int, **measure) -> [dict]:
+    """ ns per call of every program, narrow and widened, and the variables either gets wrong """
+
+    results = []
+    with tempfile.TemporaryDirectory(prefix='cmmm-') as directory:
+        for i in range(programs):
+            code, values = generate(seed + i, statements), inputs(seed + i)
+
+            row = {'program': i, 'mismatches': []}
+            for mode, widened in (('narrow', False), ('widened', True)):
+                program = compile_program(code, widened_shorts=widened)
+                kernel = build(program, directory, f"shorts{i}_{mode}")
+                row[mode] = kernel.measure(values=values, **measure)['ns_per_call']
+
+                kernel.write(values)
+                kernel()
+                native, expected = kernel.read(), interpret(program, values)  # configured for this mode
+                row['mismatches'] += [f"{name} ({mode})" for name, value in expected.items() if native[name] != value]
+            results.append(row)
+    return results
+
+
+if __name__ == '__main__':
+    arguments = argparse.ArgumentParser(prog='harness.shorts',
+                                        description="'short' arithmetic in 16-bit registers against widened one")
+    arguments.add_argument('--programs', type=int, default=8)
+    arguments.add_argument('--statements', type=int, default=50)
+    arguments.add_argument('--seed', type=int, default=0)
+    arguments.add_argument('--repeat', type=int, default=7)
+    arguments.add_argument('--number', type=int, default=10000)
+    options = arguments.parse_args()
+
+    rows = benchmark(options.programs, options.statements, options.seed,
+                     repeat=options.repeat, number=options.number)
+    for row in rows:
+        print(f"program {row['program']}: narrow {row['narrow']:.1f} ns, widened {row['widened']:.1f} ns per call "
+              f"({100.0 * (row['widened'] - row['narrow']) / row['narrow']:+.1f}%)"
+              f"{', wrong: ' + ' '.join(row['mismatches']) if row['mismatches'] else ''}")
+
+    narrow, widened = sum(row['narrow'] for row in rows), sum(row['widened'] for row in rows)
+    print(f"total: {narrow:.1f} -> {widened:.1f} ns ({100.0 * (widened - narrow) / narrow:+.1f}%)", file=sys.stderr)
+    sys.exit(1 if any(row['mismatches'] for row in rows) else 0)
@@ -0,0 +1,145 @@
+# accuracy and speed of the fast-math sin and cos routines against 'fsin'/'fcos':
+# errors in ulps against a high precision reference, time per call through the execution harness
+
+import argparse
+import ctypes
+import decimal
+import math
+import random
+import sys
+import tempfile
+
+from compiler import *
+
+from .harness import build
+
+decimal.getcontext().prec = 90
+
+
+def pi() -> decimal.Decimal:
+    """ the 'decimal' documentation recipe """
+
+    decimal.getcontext().prec += 2
+    three = decimal.Decimal(3)
+    lasts, t, s, n, na, d, da = 0, three, 3, 1, 0, 0, 24
+    while s != lasts:
+        lasts = s
+        n, na = n + na, na + 8
+        d, da = d + da, da + 32
+        t = (t * n) / d
+        s += t
+    decimal.getcontext().prec -= 2
+    return +s
+
+
+half_pi = pi() / 2
+
+
+def reference(function: str, x: float) -> decimal.Decimal:
+    """ sin or cos of the double 'x', far more precise than a double """
+
+    x = decimal.Decimal(x)
+    k = int((x / half_pi).to_integral_value())
+    r = x - k * half_pi
+    quadrant = (k + (function == 'cos')) % 4
+
+    # taylor series of sin r in even quadrants, cos r in odd ones
+    n = 1 - quadrant % 2
+    series, term = decimal.Decimal(0), r ** n
+    while abs(term) > decimal.Decimal(10) ** -80:
+        series += term
+        term = -term * r * r / ((n + 1) * (n + 2))
+        n += 2
+    return -series if quadrant >= 2 else series
+
+
+def ulps(result: float, exact: decimal.Decimal) -> float:
+    if math.isnan(result):
+        return math.inf
+    unit = math.ulp(float(exact)) if exact else math.ulp(0.0)
+    return float(abs(decimal.Decimal(result) - exact)) / unit
+
+
+def sample(kind: str, count: int, seed: int) -> [float]:
+    generator = random.Random(seed)
+    if kind == 'near multiples of pi/2':  # the hardest ones for the reduction
+        return [float(k * half_pi) for k in (generator.randrange(1, 500000) for _ in range(count))]
+    limit = {'|x| < pi/4': math.pi / 4, '|x| < 10': 10.0, '|x| < 1e3': 1e3, '|x| < 8e5': 8e5}[kind]
+    return [generator.uniform(-limit, limit) for _ in range(count)]
+
+
+kinds = ['|x| < pi/4', '|x| < 10', '|x| < 1e3', '|x| < 8e5', 'near multiples of pi/2']
+
+modes = [None, 'sse', 'x87']
+
+
+def accuracy(count: int, seed: int) -> [dict]:
+    """ maximum and mean error of sin and cos, both separate and fused, in every mode """
+
+    results = []
+    with tempfile.TemporaryDirectory(prefix='cmmm-') as directory:
+        for mode in modes:
+            program = compile_program("double x, s, c, p;\ns = sin(x);\nc = cos(x);\np = sin(x) * cos(x);\n",
+                                      fast_math=mode)
+            kernel = build(program, directory, f"accuracy_{mode}")
+            x = ctypes.c_double.in_dll(kernel.library, '_x')
+            outputs = {
+                'sin': ctypes.c_double.in_dll(kernel.library, '_s'),
+                'cos': ctypes.c_double.in_dll(kernel.library, '_c'),
+                'fused sin': ctypes.c_double.in_dll(kernel.library, '__tv2'),
+                'fused cos': ctypes.c_double.in_dll(kernel.library, '__tv3')
+            }
+
+            for kind in kinds:
+                errors = {name: [] for name in outputs.keys()}
+                for value in sample(kind, count, seed):
+                    x.value = value
+                    kernel()
+                    exact = {'sin': reference('sin', value), 'cos': reference('cos', value)}
+                    for name, output in outputs.items():
+                        errors[name].append(ulps(output.value, exact[name.split()[-1]]))
+
+                for name, values in errors.items():
+                    results.append({'mode': mode or 'fsin/fcos', 'arguments': kind, 'function': name,
+                                    'max_ulps': max(values), 'mean_ulps': sum(values) / len(values)})
+    return results
+
+
+def speed(seed: int, **measure) -> [dict]:
+    """ time per call of 16 sin and 16 cos, separate and fused (one 'sincos' call, on x87), in every mode: the same
+        statements, the separate ones take the cosine of a copy of the argument, so the calls are not fused """
+
+    generator = random.Random(seed)
+    values = {'a': [generator.uniform(-10.0, 10.0) for _ in range(16)]}
+    values['b'] = list(values['a'])
+    programs = {
+        'separate': "double a[16], b[16], p[16];\n" +
+                    ''.join(f"p[{i}] = sin(a[{i}]) * cos(b[{i}]);\n" for i in range(16)),
+        'fused':    "double a[16], b[16], p[16];\n" +
+                    ''.join(f"p[{i}] = sin(a[{i}]) * cos(a[{i}]);\n" for i in range(16))
+    }
+
+    results = []
+    with tempfile.TemporaryDirectory(prefix='cmmm-') as directory:
+        for name, code in programs.items():
+            for mode in modes:
+                kernel = build(compile_program(code, fast_math=mode), directory, f"speed_{name}_{mode}")
+                results.append({'mode': mode or 'fsin/fcos', 'program': name,
+                                **kernel.measure(values=values, **measure)})
+    return results
+
+
+if __name__ == '__main__':
+    arguments = argparse.ArgumentParser(description="fast-math sin and cos against 'fsin'/'fcos'")
+    arguments.add_argument('--count', type=int, default=2000, help="arguments per range")
+    arguments.add_argument('--seed', type=int, default=0)
+    options = arguments.parse_args()
+
+    for row in accuracy(options.count, options.seed):
+        print(f"{row['mode']:>10} {row['arguments']:>24} {row['function']:>10}: "
+              f"max {row['max_ulps']:.3f} ulp, mean {row['mean_ulps']:.3f} ulp")
+    for row in speed(options.seed):
+        print(f"{row['mode']:>10} {row['program']:>10}: {row['ns_per_call']:.1f} ns per call "
+              f"(32 functions)")
+
+    sys.exit(0)
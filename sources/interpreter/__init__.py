@@ -0,0 +1,2 @@
+from .interpreter import *
+from .batch import (BatchInterpreter, evaluate_batch)
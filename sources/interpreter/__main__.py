@@ -0,0 +1,50 @@
+import argparse
+import json
+import math
+import sys
+
+from compiler import *
+from interpreter import *
+
+
+def same(one, two) -> bool:
+    if isinstance(one, list):
+        return len(one) == len(two) and all(same(o, t) for o, t in zip(one, two))
+    return (one == two) or (isinstance(one, float) and math.isnan(one) and math.isnan(two))
+
+
+if __name__ == '__main__':
+    arguments = argparse.ArgumentParser(prog='interpreter', description="runs programs without assembling them")
+    arguments.add_argument('paths', nargs='+', help="'.cmmm' files")
+    arguments.add_argument('--compare', action='store_true', help="runs the native code too, reports differences")
+    add_code_generation_arguments(arguments)
+    add_cache_arguments(arguments)
+    options = arguments.parse_args()
+    generation = code_generation_options(options)  # the semantics of 'short' and of reductions depend on them
+
+    results, failed = {}, False
+    for path in options.paths:
+        with open(path, 'r') as c:
+            code = c.read()
+
+        diagnostics = Diagnostics()
+        program = compile_program(code, diagnostics, cache=options.ast_cache, **generation)
+        if program is None:
+            print(f"{path}: has errors", file=sys.stderr)
+            diagnostics.write(sys.stderr)
+            failed = True
+            continue
+
+        results[path] = interpret(program)
+
+        if options.compare:
+            from harness import run
+
+            native = run(code, path, options=generation, warmup=0, repeat=1, number=1)['variables']
+            for name, value in results[path].items():
+                if not same(value, native[name]):
+                    print(f"{path}: '{name}' is {value}, native code gives {native[name]}", file=sys.stderr)
+                    failed = True
+
+    json.dump(results, sys.stdout, indent=2)
+    exit(1 if failed else 0)
@@ -0,0 +1,267 @@
+# batch evaluation: every statement runs as one array operation across all runs (rows) at once,
+# with the same semantics as the reference interpreter
+
+try:
+    import numpy as np
+except ImportError:  # optional, only batch evaluation needs it
+    np = None
+
+from parser import *
+from parser.simd import (lanes, reduced)
+
+from .interpreter import (fused_multiply_add, wraparound)
+
+dtypes = {
+    'short':  'int16',
+    'int':    'int32',
+    'float':  'float32',
+    'double': 'float64'
+}
+
+_integer_indefinite = -2 ** 31
+
+vectorized = {  # intrinsic -> the same as 'parser/intrinsics.py' evaluates, across runs
+    'sin':   lambda x: np.sin(x),
+    'cos':   lambda x: np.cos(x),
+    'sqrt':  lambda x: np.sqrt(x),
+    'fabs':  lambda x: np.fabs(x),
+    'min':   lambda x, y: np.where(x < y, x, y),  # like 'minsd', not 'np.minimum'
+    'max':   lambda x, y: np.where(x > y, x, y),
+    'floor': lambda x: np.floor(x)
+}
+
+
+def conversion(data_type: str, target_type: str):
+    """ converter of 'data_type' arrays to 'target_type' ones, None if nothing is to be done """
+
+    if data_type == target_type:
+        return None
+    elif (target_type in integral_types) and (data_type in fractional_types):
+        def convert(values):
+            values = np.rint(values)  # half to even, like 'fistpl'
+            values = np.where(np.abs(values) < 2.0 ** 31, values, _integer_indefinite)
+            return values.astype('int32').astype(dtypes[target_type])  # 'int32' wraps into 'int16'
+        return convert
+    else:
+        return lambda values: np.asarray(values).astype(dtypes[target_type])
+
+
+def integral_division(data_type: str):
+
+    def divide(left, right):
+        left, right = np.asarray(left, dtype='int64'), np.asarray(right, dtype='int64')
+        if np.any(right == 0):
+            raise ZeroDivisionError("integral division by zero")
+        quotient = (np.abs(left) // np.abs(right)) * np.sign(left) * np.sign(right)
+        if np.any(quotient != quotient.astype(dtypes[data_type])) and \
+                (Statement.register_type(data_type) == data_type):  # widened 'short' division wraps around
+            raise OverflowError("integral division overflow")
+        return quotient.astype(dtypes[data_type])
+
+    return divide
+
+
+class BatchInterpreter:
+    """ ~ vectorized form of the program ~ """
+
+    def __init__(self, program: ProgramStatements):
+        if np is None:
+            raise ImportError("batch evaluation needs numpy")
+
+        self.declarations = program.symbols_table.declarations
+
+        self.runs = 0
+        self.variables = {}
+        self.arrays = {}
+
+        self.statements = [self.compile_statement(statement) for statement in program.statements]
+
+    def compile_expression(self, expression: Expression, data_type: str = None):
+        """ closure evaluating 'expression' for all runs, converted to 'data_type' if given """
+
+        if isinstance(expression, NumericConstant):
+            target_type = data_type or expression.data_type
+            if target_type in integral_types and expression.data_type in integral_types:
+                value = np.array(wraparound(target_type)(expression.value), dtype=dtypes[target_type])
+            else:
+                value = (conversion(expression.data_type, target_type) or np.asarray)(
+                    np.array(expression.value, dtype=dtypes[expression.data_type])
+                )
+            return lambda: value
+
+        evaluate = self.compile_node(expression)
+        convert = conversion(expression.data_type, data_type) if data_type is not None else None
+        if convert is None:
+            return evaluate
+        else:
+            return lambda: convert(evaluate())
+
+    def compile_node(self, expression: Expression):
+        if type(expression) == VariableUsage:
+            variables, identifier = self.variables, expression.identifier
+            return lambda: variables[identifier]
+
+        elif type(expression) == Conversion:
+            return self.compile_expression(expression.expression, expression.data_type)
+
+        elif type(expression) == ArrayUsage:
+            arrays, identifier, index = self.arrays, expression.identifier, self.compile_index(expression)
+
+            def element():
+                i = index()
+                if isinstance(i, int):
+                    return arrays[identifier][:, i]
+                return arrays[identifier][np.arange(self.runs), i]  # fancy indexing, one index per run
+
+            return element
+
+        elif isinstance(expression, Reduction):
+            values = self.compile_whole(expression.argument, expression.data_type, expression.argument.shape)
+            operation, identity = {
+                'sum': (np.add, 0.0),
+                'max': (lambda left, right: np.where(left > right, left, right), -np.inf)  # like 'maxpd'
+            }[expression.function]
+            identity = np.array(identity, dtype=dtypes[expression.data_type])
+            width = lanes(code_generation.simd, expression.data_type)
+            return lambda: reduced(operation, identity, values().T, width)  # element by element, across runs
+
+        elif isinstance(expression, FunctionCall):
+            function = vectorized[expression.function]
+            arguments = [self.compile_expression(argument, 'double') for argument in expression.arguments]
+            return lambda: function(*(argument() for argument in arguments))
+
+        elif isinstance(expression, Minus):
+            operand = self.compile_expression(expression.expression)
+            return lambda: np.negative(operand())
+
+        elif (type(expression) in (Add, Sub)) and ((contracted := expression.contraction()) is not None):
+            product, _, addend, negative, subtracted = contracted
+            left, right, addend = (self.compile_expression(operand, expression.data_type)
+                                   for operand in (product.left, product.right, addend))
+            fma = fused_multiply_add(expression.data_type)  # numpy has none, run by run
+            fused = np.vectorize(lambda a, b, c: fma(float(a), float(b), float(c)),
+                                 otypes=[dtypes[expression.data_type]])
+            product_sign, addend_sign = (1, -1)[negative], (1, -1)[subtracted]
+            return lambda: fused(product_sign * left(), right(), addend_sign * addend())
+
+        else:  # elif isinstance(expression, Binary):
+            left = self.compile_expression(expression.left, expression.data_type)
+            right = self.compile_expression(expression.right, expression.data_type)
+
+            if type(expression) == Div:
+                operation = integral_division(expression.data_type) \
+                    if expression.data_type in integral_types else np.divide
+            else:
+                operation = {Add: np.add, Sub: np.subtract, Mul: np.multiply}[type(expression)]
+
+            return lambda: operation(left(), right())
+
+    def compile_whole(self, expression: Expression, data_type: str, size: int):
+        """ closure evaluating every element of 'expression' (broadcast if scalar) for all runs, as a
+            (runs, size) array """
+
+        def element(node: Expression):
+            if node.shape is None:
+                value = self.compile_expression(node, data_type)
+                return lambda: np.reshape(value(), (-1, 1))  # one per run, across all elements
+            elif type(node) == WholeArrayUsage:
+                arrays, identifier = self.arrays, node.identifier
+                return lambda: arrays[identifier]
+            elif isinstance(node, Minus):
+                operand = element(node.expression)
+                return lambda: np.negative(operand())
+
+            left, right = element(node.left), element(node.right)
+            operation = np.divide if type(node) == Div else \
+                {Add: np.add, Sub: np.subtract, Mul: np.multiply}[type(node)]
+            return lambda: operation(left(), right())
+
+        evaluate = element(expression)
+        return lambda: np.broadcast_to(evaluate(), (self.runs, size))
+
+    def compile_index(self, usage: ArrayUsage):
+        if isinstance(usage.index, IntegralConstant):
+            index = usage.index.value
+            return lambda: index
+
+        evaluate, size, identifier = self.compile_expression(usage.index), usage.size, usage.identifier
+
+        def index():
+            values = np.broadcast_to(evaluate(), (self.runs,)).astype('int64')
+            if np.any((values < 0) | (values >= size)):
+                raise IndexError(f"array '{identifier}' indexed out of bounds")
+            return values
+
+        return index
+
+    def compile_statement(self, statement: AssignmentStatement):
+        if type(statement.destination) == WholeArrayUsage:
+            arrays, identifier = self.arrays, statement.destination.identifier
+            values = self.compile_whole(statement.value, statement.destination.data_type, statement.destination.size)
+
+            def assign():
+                arrays[identifier][:] = values()
+
+            return assign
+
+        value = self.compile_expression(statement.value, statement.destination.data_type)
+        data_type = dtypes[statement.destination.data_type]
+
+        if type(statement.destination) == VariableUsage:
+            variables, identifier = self.variables, statement.destination.identifier
+
+            def assign():
+                variables[identifier] = np.broadcast_to(value(), (self.runs,)).astype(data_type)
+        else:  # elif type(statement.destination) == ArrayUsage:
+            arrays, identifier = self.arrays, statement.destination.identifier
+            index = self.compile_index(statement.destination)
+
+            def assign():
+                result, i = value(), index()
+                if isinstance(i, int):
+                    arrays[identifier][:, i] = result
+                else:
+                    arrays[identifier][np.arange(self.runs), i] = result
+
+        return assign
+
+    def reset(self, values: dict, runs: int = None) -> None:
+        """ allocates zeroed storage for 'runs' runs, then stores 'values' given by source name """
+
+        if runs is None:
+            runs = max((len(np.atleast_1d(value)) for value in values.values()), default=1)
+        self.runs = runs
+
+        for declaration in self.declarations:
+            data_type = dtypes[declaration.data_type]
+            value = values.get(declaration.identifier[1:], 0)
+            if type(declaration) == ArrayDeclaration:
+                storage = np.zeros((runs, declaration.size), dtype=data_type)
+                storage[:] = np.asarray(value).reshape((-1, declaration.size) if np.ndim(value) else ())
+                self.arrays[declaration.identifier] = storage
+            else:
+                self.variables[declaration.identifier] = \
+                    np.broadcast_to(np.asarray(value), (runs,)).astype(data_type)
+
+    def read(self) -> dict:
+        """ final values by source name, one row per run """
+
+        return {
+            declaration.identifier[1:]: (
+                self.arrays[declaration.identifier]
+                if type(declaration) == ArrayDeclaration else
+                self.variables[declaration.identifier]
+            )
+            for declaration in self.declarations
+        }
+
+    def __call__(self, values: dict = None, runs: int = None) -> dict:
+        with np.errstate(all='ignore'):  # wraparound and IEEE infinities are the expected semantics
+            self.reset(values or {}, runs)
+            for statement in self.statements:
+                statement()
+        return self.read()
+
+
+def evaluate_batch(program: ProgramStatements, values: dict = None, runs: int = None) -> dict:
+    return BatchInterpreter(program)(values, runs)
@@ -0,0 +1,339 @@
+# reference interpreter: statements are compiled into closures once, then run as many times as needed
+#
+# semantics follow the generated code where it is deliberate, and C where it is not:
+#  - 'short'/'int' arithmetic wraps around (two's complement), integral division truncates toward zero,
+#    division by zero and overflowing division (MIN / -1) raise, like the 'idiv' trap does ('short' division,
+#    computed in 32-bit registers unless '--narrow-shorts' is given, wraps around instead),
+#  - narrower integral operands are sign-extended,
+#  - 'float' results are rounded to single precision after every operation, 'double' ones are not rounded
+#    (x87 rounds its 64-bit significand once more when storing, which may differ by an ulp in rare cases),
+#  - fractional to integral conversion rounds to nearest even (like 'fistpl' does with the default
+#    control word), NaN and out of range values become the 'integer indefinite' (-2**31),
+#  - intrinsic functions are evaluated in double precision as 'parser/intrinsics.py' says ('fsin'/'fcos' may differ
+#    by a few ulps),
+#  - whole-array statements compute their scalar parts once, before any element, and round every element
+#    operation to the array type; 'sum' and 'max' combine elements in the order of the vector loop generated
+#    for the current '--simd' ('max' keeps what it has unless the element is greater or NaN, like 'maxpd'),
+#  - with '--fma', the multiplications the compiler contracts into additions and subtractions round once with them,
+#    like on a cpu with fma (the exact product and sum rounded to the type of the operation).
+
+import math
+import struct
+
+from ctypes import c_float
+from fractions import Fraction
+
+from parser import *
+from parser.simd import (lanes, reduced)
+
+_float = struct.Struct('f')
+_double, _bits = struct.Struct('d'), struct.Struct('q')
+
+_integral_bits = {'short': 16, 'int': 32}
+
+
+def wraparound(data_type: str):
+    bits = _integral_bits[data_type]
+    sign, mask = 1 << (bits - 1), (1 << bits) - 1
+
+    def wrap(value: int) -> int:
+        return ((value + sign) & mask) - sign
+
+    return wrap
+
+
+def single_precision(value: float) -> float:
+    try:
+        return _float.unpack(_float.pack(value))[0]
+    except OverflowError:  # rounds to infinity or to the largest float, like the hardware does
+        return c_float(value).value
+
+
+def integer_indefinite(value: float) -> int:
+    if math.isfinite(value):
+        value = round(value)  # half to even
+        if -2 ** 31 <= value < 2 ** 31:
+            return value
+    return -2 ** 31
+
+
+def conversion(data_type: str, target_type: str):
+    """ converter of 'data_type' values to 'target_type', None if nothing is to be done """
+
+    if data_type == target_type:
+        return None
+    elif target_type in integral_types:
+        wrap = wraparound(target_type)
+        if data_type in integral_types:
+            return wrap
+        else:  # elif data_type in fractional_types:
+            return lambda value: wrap(integer_indefinite(value))
+    elif target_type == 'float':
+        return lambda value: single_precision(float(value))
+    else:  # elif target_type == 'double':
+        return float
+
+
+def fractional_division(left: float, right: float) -> float:
+    try:
+        return left / right
+    except ZeroDivisionError:
+        if math.isnan(left) or left == 0:
+            return math.nan
+        return math.copysign(math.inf, left) * math.copysign(1.0, right)
+
+
+def integral_division(data_type: str):
+    wrap = wraparound(data_type)
+
+    def divide(left: int, right: int) -> int:
+        if right == 0:
+            raise ZeroDivisionError("integral division by zero")
+        quotient = abs(left) // abs(right)
+        quotient = quotient if (left < 0) == (right < 0) else -quotient
+        if wrap(quotient) != quotient:
+            if Statement.register_type(data_type) != data_type:  # 32-bit 'idiv', the store truncates
+                return wrap(quotient)
+            raise OverflowError("integral division overflow")
+        return quotient
+
+    return divide
+
+
+def fused_multiply_add(data_type: str):
+    """ a * b + c of 'data_type' values, rounded once """
+
+    def fma(a: float, b: float, c: float) -> float:
+        if not (math.isfinite(a) and math.isfinite(b) and math.isfinite(c)):
+            value = a * b + c  # infinite or NaN either way
+        elif (exact := Fraction(a) * Fraction(b) + Fraction(c)) == 0:
+            value = a * b + c if c == 0 else 0.0  # the sign of zeros added, +0 if they cancel
+        else:
+            try:
+                value = float(exact)
+            except OverflowError:
+                return math.copysign(math.inf, exact)
+            inexact = Fraction(value) != exact
+            if (data_type == 'float') and inexact and not (_bits.unpack(_double.pack(value))[0] & 1):
+                # rounded to odd, so that rounding to single precision is right too
+                value = math.nextafter(value, math.inf if exact > value else -math.inf)
+        return single_precision(value) if data_type == 'float' else value
+
+    return fma
+
+
+operations = {
+    Add: lambda left, right: left + right,
+    Sub: lambda left, right: left - right,
+    Mul: lambda left, right: left * right
+}
+
+reductions = {  # function -> operation, identity
+    'sum': (lambda left, right: left + right, 0.0),
+    'max': (lambda left, right: left if left > right else right, -math.inf)
+}
+
+
+class Interpreter:
+    """ ~ compiled form of the program ~ """
+
+    def __init__(self, program: ProgramStatements):
+        self.declarations = program.symbols_table.declarations
+
+        self.variables = {}
+        self.arrays = {}
+
+        self.statements = [self.compile_statement(statement) for statement in program.statements]
+
+    def compile_expression(self, expression: Expression, data_type: str = None):
+        """ closure evaluating 'expression', converted to 'data_type' if given """
+
+        if isinstance(expression, NumericConstant):
+            value, target_type = expression.value, data_type or expression.data_type
+            if (target_type in integral_types) and (expression.data_type in integral_types):
+                value = wraparound(target_type)(value)  # the immediate is as wide as its register, even unconverted
+            elif conversion(expression.data_type, target_type):
+                value = conversion(expression.data_type, target_type)(value)
+            return lambda: value
+
+        evaluate = self.compile_node(expression)
+        convert = conversion(expression.data_type, data_type) if data_type is not None else None
+        if convert is None:
+            return evaluate
+        else:
+            return lambda: convert(evaluate())
+
+    def compile_node(self, expression: Expression):
+        if type(expression) == VariableUsage:
+            variables, identifier = self.variables, expression.identifier
+            return lambda: variables[identifier]
+
+        elif type(expression) == Conversion:
+            return self.compile_expression(expression.expression, expression.data_type)
+
+        elif type(expression) == ArrayUsage:
+            array, index = self.array(expression), self.compile_index(expression)
+            return lambda: array[index()]
+
+        elif isinstance(expression, Reduction):
+            values = self.compile_whole(expression.argument, expression.data_type, expression.argument.shape)
+            operation, identity = reductions[expression.function]
+            if expression.data_type == 'float':
+                combine = operation
+                operation = lambda left, right: single_precision(combine(left, right))
+            width = lanes(code_generation.simd, expression.data_type)
+            return lambda: reduced(operation, identity, values(), width)
+
+        elif isinstance(expression, FunctionCall):
+            function = intrinsics[expression.function].evaluate
+            arguments = [self.compile_expression(argument, 'double') for argument in expression.arguments]
+            if len(arguments) == 1:
+                argument, = arguments
+                return lambda: function(argument())
+            return lambda: function(*(argument() for argument in arguments))
+
+        elif isinstance(expression, Minus):
+            operand = self.compile_expression(expression.expression)
+            if expression.data_type in integral_types:
+                wrap = wraparound(expression.data_type)
+                return lambda: wrap(-operand())
+            else:
+                return lambda: -operand()
+
+        elif (type(expression) in (Add, Sub)) and ((contracted := expression.contraction()) is not None):
+            product, _, addend, negative, subtracted = contracted
+            left, right, addend = (self.compile_expression(operand, expression.data_type)
+                                   for operand in (product.left, product.right, addend))
+            fma = fused_multiply_add(expression.data_type)
+            product_sign, addend_sign = (1, -1)[negative], (1, -1)[subtracted]
+            return lambda: fma(product_sign * left(), right(), addend_sign * addend())
+
+        else:  # elif isinstance(expression, Binary):
+            left = self.compile_expression(expression.left, expression.data_type)
+            right = self.compile_expression(expression.right, expression.data_type)
+
+            if expression.data_type in integral_types:
+                if type(expression) == Div:
+                    operation = integral_division(expression.data_type)
+                else:
+                    operation, wrap = operations[type(expression)], wraparound(expression.data_type)
+                    return lambda: wrap(operation(left(), right()))
+            else:
+                operation = fractional_division if type(expression) == Div else operations[type(expression)]
+                if expression.data_type == 'float':
+                    return lambda: single_precision(operation(left(), right()))
+
+            return lambda: operation(left(), right())
+
+    def compile_whole(self, expression: Expression, data_type: str, size: int):
+        """ closure evaluating every element of 'expression' (broadcast if scalar) as 'data_type', its scalar
+            parts first, once, like the generated code computes them before the loop """
+
+        scalars = []  # (closure, cell holding its value)
+
+        def element(node: Expression):
+            if node.shape is None:
+                value, cell = self.compile_expression(node, data_type), [None]
+                scalars.append((value, cell))
+                return lambda i: cell[0]
+            elif type(node) == WholeArrayUsage:
+                array = self.array(node)
+                return lambda i: array[i]
+            elif isinstance(node, Minus):
+                operand = element(node.expression)
+                return lambda i: -operand(i)
+
+            left, right = element(node.left), element(node.right)
+            operation = fractional_division if type(node) == Div else operations[type(node)]
+            if data_type == 'float':
+                return lambda i: single_precision(operation(left(i), right(i)))
+            return lambda i: operation(left(i), right(i))
+
+        evaluate = element(expression)
+
+        def whole() -> list:
+            for value, cell in scalars:
+                cell[0] = value()
+            return [evaluate(i) for i in range(size)]
+
+        return whole
+
+    def array(self, usage: ArrayUsage or WholeArrayUsage) -> list:
+        return self.arrays.setdefault(usage.identifier, [0] * usage.size)
+
+    def compile_index(self, usage: ArrayUsage):
+        if isinstance(usage.index, IntegralConstant):
+            index = usage.index.value
+            return lambda: index
+
+        evaluate, size, identifier = self.compile_expression(usage.index), usage.size, usage.identifier
+
+        def index() -> int:
+            value = evaluate()
+            if 0 <= value < size:
+                return value
+            raise IndexError(f"array '{identifier}' indexed out of bounds ({value})")
+
+        return index
+
+    def compile_statement(self, statement: AssignmentStatement):
+        if type(statement.destination) == WholeArrayUsage:
+            array = self.array(statement.destination)
+            values = self.compile_whole(statement.value, statement.destination.data_type, statement.destination.size)
+
+            def assign():
+                array[:] = values()
+
+            return assign
+
+        value = self.compile_expression(statement.value, statement.destination.data_type)
+
+        if type(statement.destination) == VariableUsage:
+            variables, identifier = self.variables, statement.destination.identifier
+
+            def assign():
+                variables[identifier] = value()
+        else:  # elif type(statement.destination) == ArrayUsage:
+            array, index = self.array(statement.destination), self.compile_index(statement.destination)
+
+            def assign():
+                result = value()  # value before index, like the generated code does
+                array[index()] = result
+
+        return assign
+
+    def reset(self, values: dict = None) -> None:
+        """ zeroes all declared storage (like '.bss' at load time), then stores 'values' given by source name """
+
+        values = values or {}
+        for declaration in self.declarations:
+            convert = conversion('double', declaration.data_type) or float
+            value = values.get(declaration.identifier[1:], 0)
+            if type(declaration) == ArrayDeclaration:
+                value = value if isinstance(value, (list, tuple)) else [value] * declaration.size
+                array = self.arrays.setdefault(declaration.identifier, [])
+                array[:] = [convert(v) for v in value]
+            else:
+                self.variables[declaration.identifier] = convert(value)
+
+    def read(self) -> dict:
+        """ values of all declared variables and arrays, by source name """
+
+        return {
+            declaration.identifier[1:]: (
+                list(self.arrays[declaration.identifier])
+                if type(declaration) == ArrayDeclaration else
+                self.variables[declaration.identifier]
+            )
+            for declaration in self.declarations
+        }
+
+    def __call__(self, values: dict = None) -> dict:
+        self.reset(values)
+        for statement in self.statements:
+            statement()
+        return self.read()
+
+
+def interpret(program: ProgramStatements, values: dict = None) -> dict:
+    return Interpreter(program)(values)
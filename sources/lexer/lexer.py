@@ -2,26 +2,17 @@ from ply import lex
 
 import re
 
-
-def colorize(color: str, s: str):
-    if color == 'crimson':
-        return f"\033[1;31m{s}\033[0m"
-    elif color == 'red':
-        return f"\33[31m{s}\33[0m"
-    elif color == 'yellow':
-        return f"\33[33m{s}\33[0m"
-    elif color == 'blue':
-        return f"\33[34m{s}\33[0m"
-    elif color == 'violet':
-        return f"\33[35m{s}\33[0m"
-    else:  # invalid color
-        return f"{s}"
+from diagnostics import (
+    colorize,
+    Diagnostics, Span
+)
 
 
 _token_types = {
     'identifier': ['IDENTIFIER_TOKEN'],
     'numeric constant': ['DECIMAL_CONSTANT', 'INTEGRAL_CONSTANT'],
     'data type': ['DOUBLE_TYPE', 'FLOAT_TYPE', 'INT_TYPE', 'SHORT_TYPE'],
+    'linkage': ['EXTERN_KEYWORD', 'EXPORT_KEYWORD'],
     'function': ['SIN_FUNCTION', 'COS_FUNCTION'],
     '(': ['('], ')': [')'], '[': ['['], ']': [']'],
     'arithmetic operator': ['+', '-', '*', '/'],
@@ -29,10 +20,11 @@ _token_types = {
 }
 
 
+token_type = {token: key for key, value in _token_types.items() for token in value}
+
+
 def get_token_type(t):
-    for key, value in _token_types.items():
-        if t in value:
-            return key
+    return token_type.get(t)
 
 
 NEWLINE = '\n'
@@ -72,15 +64,21 @@ types = {
     **w_types
 }
 
-trigonometric_functions = {
+trigonometric_functions = {  # the other scalar functions are in 'parser/intrinsics.py'
     'sin': 'SIN_FUNCTION', 'cos': 'COS_FUNCTION'
 }
 
-functions = {**trigonometric_functions}
+reduction_functions = {  # over whole arrays
+    'sum': 'SUM_FUNCTION', 'max': 'MAX_FUNCTION'
+}
+
+linkages = {  # of declarations in units compiled apart and linked together ('linker/')
+    'extern': 'EXTERN_KEYWORD', 'export': 'EXPORT_KEYWORD'
+}
 
-reserved = {**types}
+reserved = {**types, **linkages}
 
-tokens = tokens + constants + list(types.values())  # without functions.
+tokens = tokens + constants + list(types.values()) + list(linkages.values())  # without functions.
 
 literals = [
     '(', ')', '[', ']',
@@ -119,14 +117,7 @@ def t_newline(t):
 
 
 def t_error(t):
-    print(
-        colorize('red', f"error: illegal character: '{t.value[0]}', at "
-                        f"{t.lineno}:{t.lexpos - t.lexer.lexdata.rfind(NEWLINE, 0, t.lexpos)}\n"
-                        f"{lexer.lexdata.split(NEWLINE)[t.lineno - 1]}\n"
-                        f"{' ' * (t.lexpos - lexer.lexdata.rfind(NEWLINE, 0, t.lexpos) - 1) + '^'}"
-                 )
-    )
-    lexer.errors = True
+    t.lexer.diagnostics.error(f"illegal character: '{t.value[0]}'", Span(t.lineno, t.lexpos))
     t.lexer.skip(1)
 
 
@@ -137,4 +128,4 @@ lexer = lex.lex(
     lextab="lextab"
 )
 
-lexer.errors = False
+lexer.diagnostics = Diagnostics()
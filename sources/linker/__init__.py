@@ -0,0 +1 @@
+from .linker import *
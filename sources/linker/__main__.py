@@ -0,0 +1,36 @@
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+
+from harness import assemble
+from linker import *
+
+
+if __name__ == '__main__':
+    arguments = argparse.ArgumentParser(prog='linker', description="links units compiled with '--entry' into one file")
+    arguments.add_argument('units', nargs='+', help="'.s' files of the compiler")
+    arguments.add_argument('-o', '--output', default='program.s', help="'.o' assembles it, anything else is assembly")
+    arguments.add_argument('--entry', metavar='NAME',
+                           help="entry point '_NAME' calling the ones of the units in order, none by default")
+    options = arguments.parse_args()
+
+    try:
+        units = []
+        for path in options.units:
+            with open(path, 'r') as s:
+                units.append(unit(s.read(), path))
+        assembly = f"// {os.path.basename(options.output)}, linked from {', '.join(options.units)}\n" \
+                   f"{link(units, options.entry)}"
+    except (ValueError, LookupError) as e:
+        print(f"linker: error: {e.args[0]}", file=sys.stderr)
+        exit(1)
+
+    if os.path.splitext(options.output)[1] != '.o':
+        with open(options.output, 'w') as a:
+            a.write(assembly)
+        exit(0)
+
+    with tempfile.TemporaryDirectory(prefix='cmmm-') as directory:
+        shutil.move(assemble(assembly, directory, 'program'), options.output)
@@ -0,0 +1,119 @@
+# link step of units compiled apart ('--entry'): one assembly file of all of them, every unit's '.bss' and
+# code as it was, its private symbols renamed after it ('_c' of unit 'k1' is '_k1.c', '__tv3' is '_k1._tv3',
+# which no identifier can be), one pool of the constants all of them use and one copy of the fast-math routines.
+# global symbols (entry points, 'export' variables, everything of whole programs) are defined once, 'extern'
+# ones by some unit
+
+import re
+
+from dataclasses import *
+
+from parser.constants import constant_pool
+from parser.layout import reference
+from parser.trigonometry import trigonometric_routines
+
+NEWLINE = '\n'
+
+defined = re.compile(r'^(?:\.globl (_\w+)$|\.comm (_\w+),)', re.MULTILINE)
+local = re.compile(r'^(?:\.local (_\w+)$|(_\w+): \.zero)', re.MULTILINE)
+extern = re.compile(r'^\.extern (_\w+)$', re.MULTILINE)
+externs = re.compile(r'\n// defined by other units\n(?:\.extern _\w+\n)+')  # of a unit's storage
+entry = re.compile(r'^\.globl (_\w+)\n\n\1:$', re.MULTILINE)
+numbered = re.compile(r'^\.(file|loc) 1 ', re.MULTILINE)  # line info ('-g'), every unit names its source as file 1
+
+markers = {  # where the parts of a unit start, in order
+    'rodata': "\n.section .rodata // constants, deduplicated by bit pattern\n",
+    'text': "\n.text // assembly instructions\n",
+    'routines': "\n// fast-math trigonometric routines\n",
+    'temporaries': "\n// temporary variables",
+    'end': "\n.end\n"
+}
+
+
+@dataclass
+class Unit:
+    """ ~ assembly of a compiled unit, in parts ~ """
+
+    name: str  # where it came from, for errors
+    entry: str
+    storage: str  # '.bss', 'extern' and profile counters
+    code: str  # the entry point and its code
+    temporaries: str  # '.comm' temporaries without '--layout'
+
+    globals: [str] = field(default_factory=list)
+    externs: [str] = field(default_factory=list)
+
+    def __post_init__(self):
+        private = {a or b for a, b in local.findall(self.storage + self.temporaries)}
+        private -= {a for a, _ in defined.findall(self.storage)}
+
+        def renamed(symbol: re.Match) -> str:
+            return f"{self.entry}.{symbol.group(0)[1:]}" if symbol.group(0) in private else symbol.group(0)
+
+        self.storage, self.code, self.temporaries = \
+            (reference.sub(renamed, part) for part in (self.storage, self.code, self.temporaries))
+
+        self.globals = [self.entry] + sorted({a or b for a, b in defined.findall(self.storage + self.temporaries)} -
+                                             private - {self.entry})
+        self.externs = extern.findall(self.storage)
+
+
+def unit(assembly: str, name: str = '<unit>') -> Unit:
+    """ 'assembly' the compiler wrote split into its parts """
+
+    positions = {part: assembly.find(marker) for part, marker in markers.items()}
+    if any(positions[part] < 0 for part in ('rodata', 'text', 'end')):
+        raise ValueError(f"'{name}' is not assembly of a compiled unit")
+
+    found = entry.search(assembly, positions['text'])
+    if found is None:
+        raise ValueError(f"'{name}' has no entry point")
+
+    ends = sorted(position for position in positions.values() if position > positions['text'])
+    storage = assembly[assembly.find('\n'):positions['rodata']]  # without the '// name.s' line
+    code = assembly[positions['text'] + len(markers['text']):ends[0]]
+    temporaries = assembly[positions['temporaries']:positions['end']] if positions['temporaries'] >= 0 else ''
+    return Unit(name, found.group(1), storage, code, temporaries)
+
+
+def link(units: [Unit], entry_point: str = None) -> str:
+    """ one assembly file of 'units', 'entry_point' (if any) calling their entry points in order """
+
+    definitions = {}
+    for linked in units:
+        for symbol in linked.globals:
+            if symbol in definitions:
+                raise LookupError(f"'{symbol[1:]}' is defined by both '{definitions[symbol].name}' and "
+                                  f"'{linked.name}' (compile units with '--entry', share variables as 'export' and "
+                                  f"'extern')")
+            definitions[symbol] = linked
+
+    for linked in units:
+        for symbol in linked.externs:
+            if symbol not in definitions:
+                raise LookupError(f"'{symbol[1:]}' is 'extern' in '{linked.name}', but no unit defines it")
+
+    if entry_point is not None:
+        if f"_{entry_point}" in definitions:
+            raise LookupError(f"'{entry_point}' is defined by '{definitions[f'_{entry_point}'].name}' already")
+        entry_point = f"\n.globl _{entry_point}\n" \
+                      f"\n_{entry_point}:\n" \
+                      f"{''.join(f'call {linked.entry}{NEWLINE}' for linked in units)}" \
+                      f"retq\n"
+
+    code, files = '', 0
+    for linked in units:
+        if numbered.search(linked.code):  # compiled with line info, file numbers from 1 are given out in order
+            files += 1
+        code += numbered.sub(rf'.\1 {files} ', linked.code)
+    # every 'extern' symbol is defined by one of the units now, no '.extern' is left to the assembler
+    return f"{''.join(externs.sub('', linked.storage) for linked in units)}" \
+           f"{markers['rodata']}" \
+           f"\n.balign 16\n" \
+           f"{NEWLINE.join(constant_pool(code))}\n" \
+           f"{markers['text']}" \
+           f"{entry_point or ''}" \
+           f"{code}" \
+           f"{trigonometric_routines(code)}" \
+           f"{''.join(linked.temporaries for linked in units)}" \
+           f"{markers['end']}"
@@ -1,19 +1,95 @@
+import argparse
+import json
+import os
+import sys
+
 from compiler import *
+from watch import watch
 
 
-def main(code: str):
-    result = parser.parse(
-        code, tracking=True,
-        # debug=True
-    )
+def main(code: str, output, diagnostics: Diagnostics = None, profile_map: str = None, streaming: bool = False,
+         **options) -> bool:
+    result = compile_program(code, diagnostics, streaming, **options)
 
-    if not parser.errors and not lexer.errors:
-        return repr(result)
-    else:
-        exit(1)
+    if result is not None:
+        if profile_map:  # counter index -> source line and column, for instrumented code
+            with open(profile_map, 'w') as m:
+                json.dump(result.profile_map(code), m, indent=2)
+        result.write(output)
+    return result is not None
+
+
+def build(source: str, output: str, options, keep_going: bool = False) -> bool:
+    """ compiles 'source' into 'output' with the command line 'options', diagnostics to stderr. 'output' is written
+        to a file of this process first and replaces the old one only once the compilation succeeded (files that are
+        no regular ones, like '/dev/stdout', are written to directly); 'keep_going' reports exceptions of the
+        compiler as errors instead of raising them """
+
+    diagnostics = Diagnostics(**diagnostics_options(options))
+    regular = not os.path.exists(output) or os.path.isfile(output)
+    written, replaced = f"{output}.{os.getpid()}.tmp" if regular else output, False
+    try:
+        with open(source, 'r') as c:
+            code = c.read()
+        with open(written, 'w') as a:
+            a.write(f"// {os.path.basename(output)}\n")
+            succeeded = main(code, a, diagnostics,
+                             f"{os.path.splitext(output)[0]}.profile.json" if options.instrument else None,
+                             options.stream, cache=options.ast_cache, debug=source if options.debug_info else None,
+                             **code_generation_options(options))
+        if succeeded and regular:
+            os.replace(written, output)
+            replaced = True
+        return succeeded
+    except UnicodeDecodeError as e:
+        diagnostics.error(f"'{source}' is no {e.encoding} text ({e.reason} at byte {e.start})")
+        return False
+    except OSError:
+        raise
+    except Exception as e:
+        if not keep_going:
+            raise
+        diagnostics.error(f"internal compiler error: {e!r}")  # a bug of the compiler, the watcher keeps going
+        return False
+    finally:
+        if regular and not replaced and os.path.exists(written):
+            os.remove(written)
+        diagnostics.write(sys.stderr, options.diagnostics)
 
 
 if __name__ == '__main__':
-    with open('example.cmmm', 'r') as c:
-        with open('example.s', 'w') as a:
-            a.write("// example.s\n" + main(c.read()))
+    arguments = argparse.ArgumentParser(description="c-minus-minus-minus compiler")
+    arguments.add_argument('source', nargs='?', default='example.cmmm')
+    arguments.add_argument('-o', '--output', default='example.s')
+    arguments.add_argument('--stream', action='store_true',
+                           help="code of every statement written out as soon as it is parsed, memory in proportion to "
+                                "the symbols instead of the program")
+    arguments.add_argument('-g', '--debug-info', action='store_true',
+                           help="'.file' and '.loc' line info of every statement and operation, for a dwarf line table "
+                                "('perf annotate', 'objdump -dl'); the instructions stay the same")
+    arguments.add_argument('--watch', metavar='DIR', action='append',
+                           help="keeps compiling every '.cmmm' file below DIR written to, into the '.s' file next to "
+                                "it, until interrupted (repeatable, 'source' and '--output' are not used)")
+    arguments.add_argument('--debounce', type=float, default=100, metavar='MS',
+                           help="with '--watch', how long the files have to be quiet before a burst of writes is "
+                                "compiled (default: %(default)s)")
+    arguments.add_argument('--poll', action='store_true',
+                           help="with '--watch', scans the directories for changes instead of using inotify")
+    add_code_generation_arguments(arguments)
+    add_cache_arguments(arguments)
+    add_diagnostics_arguments(arguments)
+    options = arguments.parse_args()
+
+    if options.watch:
+        for directory in options.watch:
+            if not os.path.isdir(directory):
+                arguments.error(f"'{directory}' is no directory")
+        try:
+            watch(options.watch, lambda path: build(path, f"{os.path.splitext(path)[0]}.s", options, keep_going=True),
+                  options.debounce / 1000, options.poll)
+        except KeyboardInterrupt:
+            pass
+        exit(0)
+
+    if not build(options.source, options.output, options):
+        exit(1)
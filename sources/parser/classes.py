@@ -1,16 +1,72 @@
 # intermediate representation classes
 
+import io
+import math
+
 from dataclasses import *
 
 from lexer import (
     NEWLINE,
-    colorize,
+    Span,
     w_types, dw_types, qw_types,
     integral_types, fractional_types,
     types,
     trigonometric_functions
 )
 
+from . import simd
+from . import contraction
+
+from .lowering import (
+    multiplication, division, widened
+)
+from .trigonometry import (
+    routine, trigonometric_routines
+)
+from .constants import (
+    converted, label, constant_pool
+)
+from .layout import (
+    layout, arranged, baseline, assembly
+)
+from .conversions import (
+    suffixes, in_register, from_memory
+)
+from .intrinsics import (
+    intrinsics, backend
+)
+from . import parallel
+from .forwarding import forwarding
+from . import lines
+from .lines import located
+
+
+@dataclass
+class CodeGeneration:
+    """ ~ code generation options ~ """
+
+    strength_reduction: bool = True  # integral multiplication and division by constants
+    fast_math: str = None  # 'sse' or 'x87' polynomial sin and cos routines instead of 'fsin'/'fcos'
+    instruction_selection: bool = True  # memory operands instead of loading, pushing and popping both operands
+    instrument: bool = False  # cycles and hits of every statement counted into '__cmmm_profile'
+    simd: str = 'sse'  # 'sse' (sse2) or 'avx2' packed loops of whole-array statements
+    layout: bool = True  # '.bss' laid out by 'parser/layout.py' instead of '.comm' in symbol table order
+    propagation: bool = True  # copies and constants propagated ('parser/propagation.py'), stores forwarded to loads
+    jobs: int = 1  # worker processes generating the code of statements ('parser/parallel.py'), 1 for none
+    widened_shorts: bool = True  # 'short' values sign-extended into 32-bit registers, truncated only by stores
+    conversion_planning: bool = True  # operands converted once per statement ('parser/planning.py'), by sse2
+    fma: bool = False  # 'float'/'double' products contracted into the sums they feed ('parser/contraction.py')
+    entry: str = None  # entry point '_entry' of a unit ('linker/'), global with its 'export' variables only;
+    # None for '_example' and every symbol global
+    debug: str = None  # source file of the '.file'/'.loc' line info ('parser/lines.py'), None for none
+
+    def configure(self, **options) -> None:
+        for option in fields(self):
+            setattr(self, option.name, options.get(option.name, option.default))
+
+
+code_generation = CodeGeneration()
+
 
 class Statement:
 
@@ -57,6 +113,20 @@ class Statement:
         else:
             raise TypeError("unknown suffix?")
 
+    @staticmethod
+    def register_type(data_type: str) -> str:
+        """ type 'data_type' values are computed in: 'short' ones as sign-extended 'int' but with '--narrow-shorts' """
+        return 'int' if (data_type == 'short') and code_generation.widened_shorts else data_type
+
+    @staticmethod
+    def load_instruction(data_type: str, extension: str = 's') -> str:
+        """ loads a 'data_type' value from memory into a register of its register type, widened 'short' ones
+            sign-extended ('s') or zero-extended ('z', indexes) """
+
+        if Statement.register_type(data_type) != data_type:
+            return f"mov{extension}wl"
+        return f"mov{Statement.instruction_data_suffix(data_type)}"
+
     @staticmethod
     def register_name_prefix(data_type: str):
         data_type_size = Statement.data_type_size(data_type)
@@ -75,6 +145,7 @@ class Declaration:
     def __init__(self, identifier: str, position=None, data_type: str = None):
         self.identifier = f"_{identifier}"
         self.data_type = data_type
+        self.linkage = None  # 'extern' (storage in another unit), 'export' or None
 
         self.position = position
 
@@ -87,8 +158,14 @@ class VariableDeclaration(Declaration):
     def __init__(self, identifier: str, position=None, data_type: str = None):
         super().__init__(identifier, position, data_type)
 
+    def bytes(self) -> int:
+        return Statement.data_type_size(self.data_type)
+
+    def alignment(self) -> int:
+        return self.bytes()
+
     def __repr__(self):
-        return f".comm {self.identifier}, {Statement.data_type_size(self.data_type)}"
+        return f".comm {self.identifier}, {self.bytes()}"
 
     def __str__(self):
         return f"{self.__class__.__name__} -> " \
@@ -104,8 +181,18 @@ class ArrayDeclaration(Declaration):
         else:
             self.size = size
 
+    def bytes(self) -> int:
+        return self.size * Statement.data_type_size(self.data_type)
+
+    def alignment(self) -> int:
+        """ 16 or 32 bytes for the packed loops of whole-array statements, a cache line from 64 bytes on """
+
+        size = self.bytes()
+        return 64 if size >= 64 else 32 if size >= 32 else 16 if size >= 16 else \
+            Statement.data_type_size(self.data_type)
+
     def __repr__(self):
-        return f".comm {self.identifier}, {self.size * Statement.data_type_size(self.data_type)}"
+        return f".comm {self.identifier}, {self.bytes()}, {self.alignment()}"
 
     def __str__(self):
         return f"{self.__class__.__name__} -> " \
@@ -114,13 +201,14 @@ class ArrayDeclaration(Declaration):
 
 class DeclarationStatement(Statement):
 
-    def __init__(self, declaration_list: [Declaration], data_type: str, position=None):
+    def __init__(self, declaration_list: [Declaration], data_type: str, position=None, linkage: str = None):
         super().__init__(position)
 
         self.declaration_list = declaration_list
 
         for declaration in self.declaration_list:
             declaration.data_type = data_type
+            declaration.linkage = linkage
 
     def __getitem__(self, index):
         return self.declaration_list[index]
@@ -135,10 +223,51 @@ class Expression:
 
     data_type: str
 
+    shape: int = None  # size of the whole arrays the expression is made of, None for scalars
+
     def create_temp_var(self, symbols_table):
-        self.identifier = symbols_table.add_temporary_variable(self.data_type).identifier
+        if self.shape is None:  # whole-array expressions live in vector registers
+            self.identifier = symbols_table.add_temporary_variable(self.data_type).identifier
         return self
 
+    @staticmethod
+    def common_shape(operands: list) -> int or None:
+        """ shape of an operation on 'operands', scalars among whole arrays are broadcast """
+
+        arrays = [operand for operand in operands if operand.shape is not None]
+        if len({operand.shape for operand in arrays}) > 1:
+            raise ValueError(f"whole arrays of different sizes "
+                             f"({' and '.join(str(operand.shape) for operand in arrays)})")
+        elif len({operand.data_type for operand in arrays}) > 1:
+            raise TypeError(f"whole arrays of different types "
+                            f"({' and '.join(operand.data_type for operand in arrays)})")
+        return arrays[0].shape if arrays else None
+
+    def children(self) -> list:
+        """ subexpressions, in the order their code is generated """
+        return []
+
+    @staticmethod
+    def load(operand) -> str:
+        """ loads 'operand' into %rax """
+
+        arithmetic = ''
+
+        register_type = Statement.register_type(operand.data_type)
+        if not isinstance(operand, (Unary, Binary, FunctionCall)):  # const, var or array usage
+            if isinstance(operand, NumericConstant):
+                arithmetic += f"mov{Statement.instruction_data_suffix(register_type)} {operand.operand()}, "
+            else:
+                arithmetic += f"{operand.__repr__()}"
+            arithmetic += f"%{Statement.register_name_prefix(register_type)}ax\n"
+        else:  # unary, binary or function call
+            arithmetic += f"{operand.__repr__()}\n" \
+                          f"{Statement.load_instruction(operand.data_type)} " \
+                          f"{operand.identifier}(%rip), " \
+                          f"%{Statement.register_name_prefix(register_type)}ax\n"
+
+        return arithmetic
+
 
 class NumericConstant(Expression):
 
@@ -148,18 +277,14 @@ class NumericConstant(Expression):
         self.data_type = constant_type
         self.value = value
 
-        self.identifier = '_nc'
-
         self.create_temp_var = None  # do not call this here
 
-    @property
-    def identifier(self):
-        return self.__identifier
+    def operand(self, data_type: str = None) -> str:
+        """ the constant as 'data_type' (its own by default): an immediate if integral, else a pool entry """
 
-    @identifier.setter
-    def identifier(self, new_identifier):
-        self.__identifier = new_identifier
-        self.constant_id = self.__identifier
+        data_type = data_type or self.data_type
+        value = converted(self.value, self.data_type, data_type)
+        return f"${value}" if data_type in integral_types else f"{label(value, data_type)}(%rip)"
 
     def __eq__(self, other):
         return ((self.value == other.value) and (self.data_type == other.data_type)) \
@@ -167,11 +292,11 @@ class NumericConstant(Expression):
             else self.value == other
 
     def __repr__(self):
-        return f"{self.constant_id}: {Statement.numeric_constant_type(self.data_type)} {self.value}"
+        return self.operand()
 
     def __str__(self):
         return f"{self.__class__.__name__} -> " \
-               f"{{constant_type={self.data_type}, constant_id='{self.constant_id}', value={self.value}}}"
+               f"{{constant_type={self.data_type}, value={self.value}}}"
 
 
 class IntegralConstant(NumericConstant):
@@ -197,7 +322,7 @@ class VariableUsage(Expression):
         self.create_temp_var = None  # useless
 
     def __repr__(self):
-        return f"mov{Statement.instruction_data_suffix(self.data_type)} {self.identifier}(%rip), "
+        return f"{Statement.load_instruction(self.data_type)} {self.identifier}(%rip), "
 
     def __str__(self):
         return f"{self.__class__.__name__} -> " \
@@ -214,7 +339,9 @@ class ArrayUsage(Expression):
         self.data_type = data_type
         self.size = size
 
-        if type(index) == IntegralConstant:
+        if index.shape is not None:
+            raise TypeError("whole array as an indexer")
+        elif type(index) == IntegralConstant:
             if 0 <= index.value < self.size:
                 self.index = index
             else:
@@ -227,34 +354,41 @@ class ArrayUsage(Expression):
 
         self.create_temp_var = None  # useless
 
+    def children(self) -> list:
+        return [self.index]
+
     def __repr__(self):  # maybe some cleanup?
+        index_type = Statement.register_type(self.index.data_type)
         if type(self.index) == ArrayUsage:
             return f"{self.index.__repr__()}" \
-                   f"%{Statement.register_name_prefix(self.index.data_type)}dx\n" \
+                   f"%{Statement.register_name_prefix(index_type)}dx\n" \
                    f"\n" \
                    f"leaq {self.identifier}(%rip), %rsi\n" \
                    f"xor %rdi, %rdi\n" \
-                   f"movl %{Statement.register_name_prefix(self.index.data_type)}dx, " \
-                   f"%{Statement.register_name_prefix(self.index.data_type)}di\n" \
+                   f"movl %{Statement.register_name_prefix(index_type)}dx, " \
+                   f"%{Statement.register_name_prefix(index_type)}di\n" \
                    f"xor %rdx, %rdx\n" \
-                   f"mov{Statement.instruction_data_suffix(self.data_type)} " \
+                   f"{Statement.load_instruction(self.data_type)} " \
                    f"(%rsi, %rdi, {Statement.data_type_size(self.data_type)}), "
         elif isinstance(self.index, (Unary, Binary, FunctionCall)):
             return f"{self.index.__repr__()}\n" \
                    f"leaq {self.identifier}(%rip), %rsi\n" \
                    f"xor %rdi, %rdi\n" \
-                   f"mov{Statement.instruction_data_suffix(self.index.data_type)} " \
+                   f"{Statement.load_instruction(self.index.data_type, 'z')} " \
                    f"{self.index.identifier}(%rip), " \
-                   f"%{Statement.register_name_prefix(self.index.data_type)}di\n" \
-                   f"mov{Statement.instruction_data_suffix(self.data_type)} " \
+                   f"%{Statement.register_name_prefix(index_type)}di\n" \
+                   f"{Statement.load_instruction(self.data_type)} " \
                    f"(%rsi, %rdi, {Statement.data_type_size(self.data_type)}), "
+        elif isinstance(self.index, IntegralConstant):
+            return f"{Statement.load_instruction(self.data_type)} " \
+                   f"{self.identifier}+{self.index.value * Statement.data_type_size(self.data_type)}(%rip), "
         else:
             return f"leaq {self.identifier}(%rip), %rsi\n" \
                    f"xor %rdi, %rdi\n" \
-                   f"mov{Statement.instruction_data_suffix(self.index.data_type)} " \
+                   f"{Statement.load_instruction(self.index.data_type, 'z')} " \
                    f"{self.index.identifier}(%rip), " \
-                   f"%{Statement.register_name_prefix(self.index.data_type)}di\n" \
-                   f"mov{Statement.instruction_data_suffix(self.data_type)} " \
+                   f"%{Statement.register_name_prefix(index_type)}di\n" \
+                   f"{Statement.load_instruction(self.data_type)} " \
                    f"(%rsi, %rdi, {Statement.data_type_size(self.data_type)}), "
 
     def __str__(self):
@@ -262,19 +396,82 @@ class ArrayUsage(Expression):
                f"{{data_type={self.data_type}, identifier='{self.identifier}', index={self.index}}}"
 
 
+class Conversion(Expression):
+    """ ~ integral variable or array element converted to the fractional type of the operations reading it, once
+        per statement (see 'parser/planning.py'); they all read its temporary ~ """
+
+    def __init__(self, expression: VariableUsage or ArrayUsage, data_type: str, position):
+        super().__init__(position)
+
+        self.expression = expression
+        self.data_type = data_type
+
+    def code(self) -> str:
+        """ the conversion, the statement starts with it """
+
+        address, operand = Binary.memory(self.expression, self.expression.data_type)
+        return f"{address}" \
+               f"{from_memory(self.expression.data_type, self.data_type, operand)}" \
+               f"mov{suffixes[self.data_type]} %xmm0, {self.identifier}(%rip)\n"
+
+    def __repr__(self):
+        return f"{Statement.load_instruction(self.data_type)} {self.identifier}(%rip), "
+
+    def __str__(self):
+        return f"{self.__class__.__name__} -> " \
+               f"{{data_type={self.data_type}, expression={self.expression}}}"
+
+
+class WholeArrayUsage(Expression):
+    """ 'a[]', all elements of an array at once """
+
+    def __init__(self, identifier: str, data_type: str, size: int, position):
+        super().__init__(position)
+
+        self.identifier = identifier
+
+        if data_type not in fractional_types:  # sse2 has no packed integral division (nor 32-bit multiplication)
+            raise TypeError(f"whole-array operations take float or double arrays, not {data_type} ones")
+        self.data_type = data_type
+        self.shape = self.size = size
+
+        self.create_temp_var = None  # useless
+
+    def __str__(self):
+        return f"{self.__class__.__name__} -> " \
+               f"{{data_type={self.data_type}, identifier='{self.identifier}', size={self.shape}}}"
+
+
 class FunctionCall(Expression):
 
-    def __init__(self, function: str, argument: Expression, position, p):
+    results: dict = None  # function -> temporary variables this call computes, empty if fused
+
+    def __init__(self, function: str, arguments: [Expression], position, p):
         super().__init__(position)
 
         self.identifier = self.function = function
-        self.argument = argument
+        self.arguments = arguments
 
-        if self.function in trigonometric_functions.keys():
+        if self.function in intrinsics.keys():
             self.data_type = 'double'
         else:  # !?
             raise NameError("unknown function name?")
 
+        if len(arguments) != intrinsics[function].arguments:
+            raise TypeError(f"'{function}' takes {intrinsics[function].arguments} "
+                            f"argument{'s' if intrinsics[function].arguments > 1 else ''}, not {len(arguments)}")
+        elif any(argument.shape is not None for argument in arguments):
+            raise TypeError(f"'{function}' of a whole array")
+
+    @property
+    def argument(self):
+        """ the first argument, the only one but of 'min' and 'max' """
+        return self.arguments[0]
+
+    @argument.setter
+    def argument(self, new_argument):
+        self.arguments[0] = new_argument
+
     @property
     def identifier(self):
         return self.__identifier
@@ -292,36 +489,138 @@ class FunctionCall(Expression):
         self.__data_type = new_data_type
         self.return_type = self.__data_type
 
-    def __repr__(self):
-        function = ''
-        if not isinstance(self.argument, (Unary, Binary, FunctionCall, NumericConstant)):  # var or array usage
-            function += f"{self.argument.__repr__()}" \
-                        f"%{Statement.register_name_prefix(self.argument.data_type)}ax\n"
-        elif isinstance(self.argument, NumericConstant):
-            function += f"mov{Statement.instruction_data_suffix(self.argument.data_type)} {self.argument.identifier}" \
-                        f"(%rip), %{Statement.register_name_prefix(self.argument.data_type)}ax"
-        else:  # unary, binary or function call
-            function += f"{self.argument.__repr__()}\n" \
-                        f"mov{Statement.instruction_data_suffix(self.argument.data_type)} " \
-                        f"{self.argument.identifier}(%rip), " \
-                        f"%{Statement.register_name_prefix(self.argument.data_type)}ax\n"
-        function += f"\n" \
-                    f"pushq %rax\n" \
-                    f"f{'' if self.argument.data_type in fractional_types else 'i'}ldl (%rsp)\n" \
-                    f"f{self.function}\n" \
-                    f"fstp{Statement.instruction_data_suffix(self.data_type, fpu=True)} (%rsp)\n" \
-                    f"popq %rax\n"
+    def children(self) -> list:
+        return list(self.arguments)
+
+    @staticmethod
+    def fuse(expressions: [Expression]) -> None:
+        """ calls of pure functions with equal arguments are computed once, by the first one; with fast-math 'sin'
+            and 'cos' of the same argument are too (as 'sincos' on x87, see 'parser/trigonometry.py' for sse) """
+
+        calls = {}
+
+        def visit(expression: Expression):
+            for child in expression.children():
+                visit(child)
+            if (type(expression) != FunctionCall) or not intrinsics[expression.function].pure:
+                return
+            elif expression.function in trigonometric_functions:
+                if code_generation.fast_math == 'x87':
+                    calls.setdefault(('sincos', str(expression.argument)), []).append(expression)
+                elif code_generation.fast_math:  # 'fsin'/'fcos' compute every call
+                    calls.setdefault((expression.function, str(expression.argument)), []).append(expression)
+            else:
+                calls.setdefault((expression.function, *map(str, expression.arguments)), []).append(expression)
+
+        for expression in expressions:
+            visit(expression)
+
+        for group in calls.values():
+            for call in group:
+                call.results = {}
+            for call in group:
+                group[0].results.setdefault(call.function, []).append(call.identifier)
+
+    def routine_call(self) -> str:
+        """ fast-math routine call, storing every result it computes """
+
+        results = {self.function: [self.identifier]} if self.results is None else self.results
+        if not results:
+            return ''  # fused into a call with an equal argument
+
+        mode = code_generation.fast_math
+        if isinstance(self.argument, NumericConstant):  # converted at compile time
+            function = f"movsd {self.argument.operand('double')}, %xmm0\n" if mode == 'sse' else \
+                       f"fldl {self.argument.operand('double')}\n"
+        else:
+            function = self.loaded(self.argument, '%xmm0' if mode == 'sse' else None)
+
+        function += f"call {routine(results.keys(), mode)}\n"
+        if mode == 'sse':  # one function, see 'fuse'
+            for identifiers in results.values():
+                function += ''.join(f"movsd %xmm0, {identifier}(%rip)\n" for identifier in identifiers)
+        else:  # elif mode == 'x87':
+            for name in ('cos', 'sin'):  # cos on top, like 'fsincos' leaves it
+                identifiers = results.get(name, [])
+                function += ''.join(f"fst{'p' if i == len(identifiers) - 1 else ''}l {identifier}(%rip)\n"
+                                    for i, identifier in enumerate(identifiers))
+        return function + f"\n" \
+                          f"xor %rax, %rax" \
+                          f"\n"
+
+    @staticmethod
+    def loaded(argument: Expression, register: str = None) -> str:
+        """ loads 'argument' through %rax, then converts it to a 'double' into 'register' or pushes it onto the FPU
+            stack (without one) """
+
+        if register is not None:
+            return Expression.load(argument) + {
+                'short':  f"movswl %ax, %eax\ncvtsi2sdl %eax, {register}\n",
+                'int':    f"cvtsi2sdl %eax, {register}\n",
+                'float':  f"movd %eax, {register}\ncvtss2sd {register}, {register}\n",
+                'double': f"movq %rax, {register}\n"
+            }[Statement.register_type(argument.data_type)]
+
+        load = {'short': 'filds', 'int': 'fildl', 'float': 'flds', 'double': 'fldl'}[
+            Statement.register_type(argument.data_type)]
+        return Expression.load(argument) + \
+            f"pushq %rax\n" \
+            f"{load} (%rsp)\n" \
+            f"popq %rax\n"
+
+    @staticmethod
+    def fetched(argument: Expression, register: str = None) -> str:
+        """ 'argument' as a 'double' into 'register' or onto the FPU stack, straight from memory if it has a memory
+            operand (the temporaries of computed ones, see 'prerequisites') """
+
+        memory = Binary.memory(argument, 'double')
+        if memory is None:  # an index read through another array
+            return FunctionCall.loaded(argument, register)
+
+        address, operand = memory
+        data_type = 'double' if isinstance(argument, NumericConstant) else argument.data_type
+        if register is None:
+            return f"{address}{'filds' if data_type == 'short' else Binary.fpu_instruction('fld', data_type)} " \
+                   f"{operand}\n"
+        elif data_type in integral_types:
+            return address + from_memory(data_type, 'double', operand, register)
+        return f"{address}{'movsd' if data_type == 'double' else 'cvtss2sd'} {operand}, {register}\n"
+
+    def lowered(self) -> str:
+        """ the call lowered as the intrinsic says, for the fast-math mode's registers, storing every result """
+
+        results = [self.identifier] if self.results is None else self.results.get(self.function, [])
+        if not results:
+            return ''  # fused into a call with equal arguments
+
+        mode = backend(code_generation.fast_math)
+        function = ''.join(Binary.prerequisites(argument) for argument in self.arguments)
+        if mode == 'sse':
+            # ones read through %rax first, computing their indexes may take sse registers
+            ordered = sorted(enumerate(self.arguments), key=lambda pair: Binary.memory(pair[1], 'double') is not None)
+            function += ''.join(self.fetched(argument, f"%xmm{i}") for i, argument in ordered)
+        else:  # elif mode == 'x87':
+            function += ''.join(self.fetched(argument) for argument in reversed(self.arguments))  # first on top
+
+        function += intrinsics[self.function].lowerings[mode]
+        if mode == 'sse':
+            function += ''.join(f"movsd %xmm0, {identifier}(%rip)\n" for identifier in results)
+        else:  # elif mode == 'x87':
+            function += ''.join(f"fst{'p' if i == len(results) - 1 else ''}l {identifier}(%rip)\n"
+                                for i, identifier in enumerate(results))
         return function + f"\n" \
-                          f"mov{Statement.instruction_data_suffix(self.data_type)} " \
-                          f"%{Statement.register_name_prefix(self.data_type)}ax, " \
-                          f"{self.identifier}(%rip)\n" \
-                          f"\n" \
                           f"xor %rax, %rax" \
                           f"\n"
 
+    @located()
+    def __repr__(self):
+        if (self.function in trigonometric_functions) and code_generation.fast_math:
+            return self.routine_call()
+        return self.lowered()
+
     def __str__(self):
         return f"{self.__class__.__name__} -> " \
-               f"{{function={self.function}, argument={self.argument}}}"
+               f"{{function={self.function}, arguments=[{', '.join(map(str, self.arguments))}]}}"
 
 
 class Unary(Expression):
@@ -334,6 +633,10 @@ class Unary(Expression):
         self.expression = expression
 
         self.data_type = expression.data_type
+        self.shape = expression.shape
+
+    def children(self) -> list:
+        return [self.expression]
 
     def __str__(self):
         return f"{self.__class__.__name__} -> " \
@@ -345,31 +648,20 @@ class Minus(Unary):
     def __init__(self, expression: Expression, position):
         super().__init__(expression, position)
 
+    @located()
     def __repr__(self):
-        expression = ''
-        if not isinstance(self.expression, (Unary, Binary, FunctionCall)):  # const, var or array usage
-            if isinstance(self.expression, NumericConstant):
-                expression += f"mov{Statement.instruction_data_suffix(self.expression.data_type)} " \
-                              f"{self.expression.identifier}(%rip), "
-            else:
-                expression += f"{self.expression.__repr__()}"
-            expression += f"%{Statement.register_name_prefix(self.expression.data_type)}ax\n"
-        else:  # unary, binary or function call
-            expression += f"{self.expression.__repr__()}\n" \
-                          f"mov{Statement.instruction_data_suffix(self.expression.data_type)} " \
-                          f"{self.expression.identifier}(%rip), " \
-                          f"%{Statement.register_name_prefix(self.expression.data_type)}ax\n"
+        expression = self.load(self.expression)
         if self.expression.data_type in fractional_types:
             expression += f"\n" \
                           f"pushq %rax\n" \
-                          f"fldl (%rsp)\n" \
+                          f"fld{Statement.instruction_data_suffix(self.expression.data_type, fpu=True)} (%rsp)\n" \
                           f"fchs\n" \
                           f"fstp{Statement.instruction_data_suffix(self.data_type, fpu=True)} (%rsp)\n" \
                           f"popq %rax\n"
         else:  # elif self.expression.data_type in integral_types:
             expression += f"\n" \
-                          f"neg{Statement.instruction_data_suffix(self.expression.data_type)} " \
-                          f"%{Statement.register_name_prefix(self.expression.data_type)}ax\n"
+                          f"neg{Statement.instruction_data_suffix(Statement.register_type(self.data_type))} " \
+                          f"%{Statement.register_name_prefix(Statement.register_type(self.data_type))}ax\n"
         return expression + f"\n" \
                             f"mov{Statement.instruction_data_suffix(self.expression.data_type)} " \
                             f"%{Statement.register_name_prefix(self.expression.data_type)}ax, " \
@@ -389,13 +681,225 @@ class Binary(Expression):
 
     operation: dict
 
+    instruction: str  # integral one, the x87 one is 'f' + it without the 'i'
+
     def __init__(self, left: Expression, right: Expression, position):
         super().__init__(position)
 
         self.left = left
         self.right = right
 
-        self.data_type = Statement.data_type_conversion(left.data_type, right.data_type)
+        self.shape = self.common_shape([left, right])
+        if self.shape is None:
+            self.data_type = Statement.data_type_conversion(left.data_type, right.data_type)
+        else:  # of the whole arrays, scalars are converted to it
+            self.data_type = (left if left.shape is not None else right).data_type
+
+    def children(self) -> list:
+        return [self.left, self.right]
+
+    def operand(self, operand: Expression) -> str:
+        """ loads 'operand' into %rax, converts it to the operation's data type and pushes it; the FPU converts it
+            on the stack with '--no-conversion-planning', and with '--narrow-shorts', where the 16-bit loads of the
+            other operand keep what the first one left above them ('short' operands of others are sign-extended) """
+
+        arithmetic = self.load(operand)
+
+        if code_generation.conversion_planning and code_generation.widened_shorts:
+            return arithmetic + \
+                in_register(operand.data_type, self.data_type) + \
+                f"pushq %rax" \
+                f"\n"
+
+        arithmetic += widened(Statement.register_type(operand.data_type), self.data_type) + \
+            f"pushq %rax" \
+            f"\n"
+        if not ((self.data_type == 'short') and (operand.data_type == 'int')) and \
+           not ((self.data_type == 'int') and (operand.data_type == 'short')) and \
+                (self.data_type != operand.data_type):
+            if self.data_type in fractional_types:
+                if operand.data_type in fractional_types:
+                    arithmetic += f"fld{Statement.instruction_data_suffix(operand.data_type, fpu=True)} " \
+                                  f"(%rsp)\n"
+                else:  # elif operand.data_type in integral_types:
+                    arithmetic += f"fildl (%rsp)\n"
+                arithmetic += f"fstp{Statement.instruction_data_suffix(self.data_type, fpu=True)} " \
+                              f"(%rsp)\n"
+            elif self.data_type in integral_types:
+                arithmetic += f"fld{Statement.instruction_data_suffix(operand.data_type, fpu=True)} " \
+                              f"(%rsp)\n" \
+                              f"fistpl (%rsp)\n"
+            else:
+                arithmetic += f"\n"
+
+        return arithmetic
+
+    @staticmethod
+    def memory(operand: Expression, data_type: str) -> (str, str) or None:
+        """ code computing the address (into %rsi and %rdi) and the memory operand holding 'operand',
+            None if there is none; results of unary, binary operations and function calls are their temporaries,
+            constants are immediates or pool entries of 'data_type' """
+
+        if isinstance(operand, NumericConstant):
+            return '', operand.operand(data_type)
+        elif type(operand) != ArrayUsage:
+            return '', f"{operand.identifier}(%rip)"
+        elif isinstance(operand.index, IntegralConstant):
+            return '', f"{operand.identifier}+{operand.index.value * Statement.data_type_size(operand.data_type)}(%rip)"
+
+        index = Binary.memory(operand.index, operand.index.data_type)
+        if (index is None) or index[0]:  # index needs an address itself
+            return None
+        return f"leaq {operand.identifier}(%rip), %rsi\n" \
+               f"{'movzwl' if operand.index.data_type == 'short' else 'movl'} {index[1]}, %edi\n", \
+               f"(%rsi, %rdi, {Statement.data_type_size(operand.data_type)})"
+
+    @staticmethod
+    def prerequisites(operand: Expression) -> str:
+        """ code computing the temporaries 'operand' reads """
+
+        if isinstance(operand, (Unary, Binary, FunctionCall)):
+            return f"{operand.__repr__()}\n"
+        elif type(operand) == ArrayUsage:
+            return Binary.prerequisites(operand.index)
+        return ''
+
+    def selectable(self) -> bool:
+        """ both operands have memory forms the instruction takes as they are """
+
+        for operand in (self.left, self.right):
+            if self.memory(operand, self.data_type) is None:
+                return False
+            elif isinstance(operand, NumericConstant):
+                continue  # converted at compile time
+            elif (self.data_type in integral_types) and (operand.data_type != self.data_type):
+                return False  # 'short' and 'int' mixed
+            elif (self.data_type in fractional_types) and (operand.data_type == 'short'):
+                return False  # x87 has no 16-bit integer arithmetic
+            elif (self.data_type == 'float') and (operand.data_type in integral_types):
+                return False  # 'fiadd' would skip rounding the integer to float first
+        return True
+
+    @staticmethod
+    def fpu_instruction(instruction: str, data_type: str) -> str:
+        """ x87 form of 'instruction' ('fld', 'fadd', ...) with a memory operand of 'data_type' """
+
+        if data_type in integral_types:
+            return f"fi{instruction[1:]}l"
+        return f"{instruction}{Statement.instruction_data_suffix(data_type, fpu=True)}"
+
+    def selected(self, prerequisites: bool = True) -> str:
+        """ operation on operands in memory, like 'movl _a(%rip), %eax; addl _b(%rip), %eax', without computing
+            the temporaries of the operands unless 'prerequisites' """
+
+        (left_address, left), (right_address, right) = \
+            self.memory(self.left, self.data_type), self.memory(self.right, self.data_type)
+        left_type, right_type = (self.data_type if isinstance(operand, NumericConstant) else operand.data_type
+                                 for operand in (self.left, self.right))
+
+        arithmetic = self.prerequisites(self.left) + self.prerequisites(self.right) if prerequisites else ''
+
+        if self.data_type in fractional_types:
+            return arithmetic + \
+                f"{left_address}" \
+                f"{self.fpu_instruction('fld', left_type)} {left}\n" \
+                f"{right_address}" \
+                f"{self.fpu_instruction('f' + self.instruction.lstrip('i'), right_type)} {right}\n" \
+                f"fstp{Statement.instruction_data_suffix(self.data_type, fpu=True)} {self.identifier}(%rip)\n"
+
+        register_type = Statement.register_type(self.data_type)
+        suffix, prefix = Statement.instruction_data_suffix(register_type), Statement.register_name_prefix(register_type)
+        left_load, right_load = (f"mov{suffix}" if isinstance(operand, NumericConstant) else
+                                 Statement.load_instruction(operand.data_type) for operand in (self.left, self.right))
+
+        arithmetic += f"{left_address}" \
+                      f"{left_load} {left}, %{prefix}ax\n" \
+                      f"{right_address}"
+        cleanup = ''
+        constant = isinstance(self.right, NumericConstant)
+        if (constant and (type(self) == Div)) or (not constant and (register_type != self.data_type)):
+            # 'idiv' takes no immediate, 32-bit instructions no 16-bit memory operand
+            arithmetic += f"{right_load} {right}, %{prefix}cx\n"
+            right, cleanup = f"%{prefix}cx", f"xor %rcx, %rcx\n"
+        if type(self) == Div:
+            arithmetic += f"{'cwd' if register_type == 'short' else 'cdq'}\n" \
+                          f"idiv{suffix} {right}\n"
+            cleanup += f"xor %rdx, %rdx\n"
+        else:
+            arithmetic += f"{self.instruction}{suffix} {right}, %{prefix}ax\n"
+
+        return arithmetic + f"mov{Statement.instruction_data_suffix(self.data_type)} " \
+                            f"%{Statement.register_name_prefix(self.data_type)}ax, {self.identifier}(%rip)\n" \
+                            f"\n{cleanup}xor %rax, %rax\n"
+
+    def contraction(self) -> (Expression, Unary or None, Expression, bool, bool) or None:
+        """ multiplication this addition or subtraction adds (or subtracts), for '--fma': it, the negation in
+            between (if any), the addend and whether the product and the addend are negated; None if there is none
+            or if the product and the operands have no memory forms """
+
+        if not code_generation.fma or (self.shape is not None) or (self.data_type not in fractional_types) or \
+                not self.selectable():
+            return None
+
+        # (product, addend, product negated, addend negated), 'a * b + c', 'c + (a * b)', 'a * b - c', 'c - (a * b)'
+        subtraction = type(self) == Sub
+        candidates = [(self.left, self.right, False, subtraction), (self.right, self.left, subtraction, False)]
+        for product, addend, negative, subtracted in candidates:
+            negation = product if type(product) == Minus else None
+            if negation is not None:
+                product, negative = product.expression, not negative
+            if (type(product) == Mul) and (product.shape is None) and (product.data_type == self.data_type) and \
+                    product.selectable():
+                return product, negation, addend, negative, subtracted
+        return None
+
+    def loaded(self, operand: Expression, register: str) -> str:
+        """ 'operand' converted to the operation's type into 'register', vex encoded """
+
+        address, memory = self.memory(operand, self.data_type)
+        data_type = self.data_type if isinstance(operand, NumericConstant) else operand.data_type
+        suffix = suffixes[self.data_type]
+        if data_type == self.data_type:
+            return f"{address}vmov{suffix} {memory}, {register}\n"
+        elif data_type in integral_types:  # 'int' ones of 'double' operations, others are not selectable
+            return f"{address}vcvtsi2{suffix}l {memory}, {register}, {register}\n"
+        return f"{address}vcvtss2sd {memory}, {register}, {register}\n"
+
+    def contracted(self, product: Expression, negation: Unary or None, addend: Expression, negative: bool,
+                   subtracted: bool) -> str:
+        """ the multiplication and this operation as one fused multiply-add, guarded by the cpu having it; without
+            it, the code of the two (and of the negation) as they are, their operands' temporaries computed once """
+
+        suffix, fpu_suffix = suffixes[self.data_type], Statement.instruction_data_suffix(self.data_type, fpu=True)
+
+        fused = self.loaded(product.left, '%xmm0') + \
+            self.loaded(product.right, '%xmm1') + \
+            self.loaded(addend, '%xmm2') + \
+            f"{contraction.instructions[(negative, subtracted)]}{suffix} %xmm2, %xmm1, %xmm0\n" \
+            f"vmov{suffix} %xmm0, {self.identifier}(%rip)\n"
+
+        unfused = product.selected(prerequisites=False)
+        if negation is not None:
+            unfused += f"fld{fpu_suffix} {product.identifier}(%rip)\n" \
+                       f"fchs\n" \
+                       f"fstp{fpu_suffix} {negation.identifier}(%rip)\n"
+        unfused += self.selected(prerequisites=False)
+
+        return self.prerequisites(product.left) + self.prerequisites(product.right) + self.prerequisites(addend) + \
+            contraction.guarded(self.identifier, fused, unfused)
+
+    def reduced(self, operand: Expression, lowering: str) -> str:
+        """ strength reduced operation with a constant, 'lowering' works on 'operand' in %eax """
+
+        return f"{self.load(operand)}" \
+               f"{widened(Statement.register_type(operand.data_type), self.data_type)}" \
+               f"\n" \
+               f"{lowering}" \
+               f"\n" \
+               f"mov{Statement.instruction_data_suffix(self.data_type)} " \
+               f"%{Statement.register_name_prefix(self.data_type)}ax, " \
+               f"{self.identifier}(%rip)\n" \
+               f"\nxor %rdx, %rdx\nxor %rax, %rax\n"
 
     def __str__(self):
         return f"{self.__class__.__name__} -> " \
@@ -404,115 +908,22 @@ class Binary(Expression):
 
 class Add(Binary):
 
+    instruction = 'add'
+
     def __init__(self, left: Expression, right: Expression, position):
         super().__init__(left, right, position)
 
+    @located()
     def __repr__(self):
+        if (contracted := self.contraction()) is not None:
+            return self.contracted(*contracted)
+        if code_generation.instruction_selection and self.selectable():
+            return self.selected()
+
         arithmetic = ''
 
-        # generating code for left operand
-        if not isinstance(self.left, (Unary, Binary, FunctionCall)):  # const, var or array usage
-            if isinstance(self.left, NumericConstant):
-                arithmetic += f"mov{Statement.instruction_data_suffix(self.left.data_type)} " \
-                              f"{self.left.identifier}(%rip), "
-            else:
-                arithmetic += f"{self.left.__repr__()}"
-            arithmetic += f"%{Statement.register_name_prefix(self.left.data_type)}ax\n"
-            arithmetic += f"pushq %rax" \
-                          f"\n"
-            if not ((self.data_type == 'short') and (self.left.data_type == 'int')) and \
-               not ((self.data_type == 'int') and (self.left.data_type == 'short')) and \
-                    (self.data_type != self.left.data_type):
-                if self.data_type in fractional_types:
-                    if self.left.data_type in fractional_types:
-                        arithmetic += f"fld{Statement.instruction_data_suffix(self.left.data_type, fpu=True)} " \
-                                      f"(%rsp)\n"
-                    else:  # elif self.left.data_type in integral_types:
-                        arithmetic += f"fildl (%rsp)\n"
-                    arithmetic += f"fstp{Statement.instruction_data_suffix(self.data_type, fpu=True)} " \
-                                  f"(%rsp)\n"
-                elif self.data_type in integral_types:
-                    arithmetic += f"fld{Statement.instruction_data_suffix(self.left.data_type, fpu=True)} " \
-                                  f"(%rsp)\n" \
-                                  f"fistpl (%rsp)\n"
-                else:
-                    arithmetic += f"\n"
-        else:  # unary, binary or function call
-            arithmetic += f"{self.left.__repr__()}\n" \
-                          f"mov{Statement.instruction_data_suffix(self.left.data_type)} " \
-                          f"{self.left.identifier}(%rip), " \
-                          f"%{Statement.register_name_prefix(self.left.data_type)}ax\n"
-            arithmetic += f"pushq %rax" \
-                          f"\n"
-            if not ((self.data_type == 'short') and (self.left.data_type == 'int')) and \
-               not ((self.data_type == 'int') and (self.left.data_type == 'short')) and \
-                    (self.data_type != self.left.data_type):
-                if self.data_type in fractional_types:
-                    if self.left.data_type in fractional_types:
-                        arithmetic += f"fld{Statement.instruction_data_suffix(self.left.data_type, fpu=True)} " \
-                                      f"(%rsp)\n"
-                    else:  # elif self.left.data_type in integral_types:
-                        arithmetic += f"fildl (%rsp)\n"
-                    arithmetic += f"fstp{Statement.instruction_data_suffix(self.data_type, fpu=True)} " \
-                                  f"(%rsp)\n"
-                elif self.data_type in integral_types:
-                    arithmetic += f"fld{Statement.instruction_data_suffix(self.left.data_type, fpu=True)} " \
-                                  f"(%rsp)\n" \
-                                  f"fistpl (%rsp)\n"
-                else:
-                    arithmetic += f"\n"
-
-        # generating code for right operand
-        if not isinstance(self.right, (Unary, Binary, FunctionCall)):  # const, var or array usage
-            if isinstance(self.right, NumericConstant):
-                arithmetic += f"mov{Statement.instruction_data_suffix(self.right.data_type)} " \
-                              f"{self.right.identifier}(%rip), "
-            else:
-                arithmetic += f"{self.right.__repr__()}"
-            arithmetic += f"%{Statement.register_name_prefix(self.right.data_type)}ax\n"
-            arithmetic += f"pushq %rax" \
-                          f"\n"
-            if not ((self.data_type == 'short') and (self.right.data_type == 'int')) and \
-               not ((self.data_type == 'int') and (self.right.data_type == 'short')) and \
-                    (self.data_type != self.right.data_type):
-                if self.data_type in fractional_types:
-                    if self.right.data_type in fractional_types:
-                        arithmetic += f"fld{Statement.instruction_data_suffix(self.right.data_type, fpu=True)} " \
-                                      f"(%rsp)\n"
-                    else:  # elif self.left.data_type in integral_types:
-                        arithmetic += f"fildl (%rsp)\n"
-                    arithmetic += f"fstp{Statement.instruction_data_suffix(self.data_type, fpu=True)} " \
-                                  f"(%rsp)\n"
-                elif self.data_type in integral_types:
-                    arithmetic += f"fld{Statement.instruction_data_suffix(self.right.data_type, fpu=True)} " \
-                                  f"(%rsp)\n" \
-                                  f"fistpl (%rsp)\n"
-                else:
-                    arithmetic += f"\n"
-        else:  # unary, binary or function call
-            arithmetic += f"{self.right.__repr__()}\n" \
-                          f"mov{Statement.instruction_data_suffix(self.right.data_type)} " \
-                          f"{self.right.identifier}(%rip), " \
-                          f"%{Statement.register_name_prefix(self.right.data_type)}ax\n"
-            arithmetic += f"pushq %rax" \
-                          f"\n"
-            if not ((self.data_type == 'short') and (self.right.data_type == 'int')) and \
-               not ((self.data_type == 'int') and (self.right.data_type == 'short')) and \
-                    (self.data_type != self.right.data_type):
-                if self.data_type in fractional_types:
-                    if self.right.data_type in fractional_types:
-                        arithmetic += f"fld{Statement.instruction_data_suffix(self.right.data_type, fpu=True)} " \
-                                      f"(%rsp)\n"
-                    else:  # elif self.left.data_type in integral_types:
-                        arithmetic += f"fildl (%rsp)\n"
-                    arithmetic += f"fstp{Statement.instruction_data_suffix(self.data_type, fpu=True)} " \
-                                  f"(%rsp)\n"
-                elif self.data_type in integral_types:
-                    arithmetic += f"fld{Statement.instruction_data_suffix(self.right.data_type, fpu=True)} " \
-                                  f"(%rsp)\n" \
-                                  f"fistpl (%rsp)\n"
-                else:
-                    arithmetic += f"\n"
+        arithmetic += self.operand(self.left)  # generating code for left operand
+        arithmetic += self.operand(self.right)  # generating code for right operand
 
         arithmetic += f"\npopq %rdx\npopq %rax\n" \
                       f"\n"
@@ -529,9 +940,10 @@ class Add(Binary):
                           f"popq %rax\n" \
                           f"\n"
         else:  # elif self.data_type in integral_types:
-            arithmetic += f"add{Statement.instruction_data_suffix(self.data_type)} " \
-                          f"%{Statement.register_name_prefix(self.data_type)}dx, " \
-                          f"%{Statement.register_name_prefix(self.data_type)}ax\n" \
+            register_type = Statement.register_type(self.data_type)
+            arithmetic += f"add{Statement.instruction_data_suffix(register_type)} " \
+                          f"%{Statement.register_name_prefix(register_type)}dx, " \
+                          f"%{Statement.register_name_prefix(register_type)}ax\n" \
                           f"\n"
 
         return arithmetic + f"mov{Statement.instruction_data_suffix(self.data_type)} " \
@@ -542,115 +954,22 @@ class Add(Binary):
 
 class Sub(Binary):
 
+    instruction = 'sub'
+
     def __init__(self, left: Expression, right: Expression, position):
         super().__init__(left, right, position)
 
+    @located()
     def __repr__(self):
+        if (contracted := self.contraction()) is not None:
+            return self.contracted(*contracted)
+        if code_generation.instruction_selection and self.selectable():
+            return self.selected()
+
         arithmetic = ''
 
-        # generating code for left operand
-        if not isinstance(self.left, (Unary, Binary, FunctionCall)):  # const, var or array usage
-            if isinstance(self.left, NumericConstant):
-                arithmetic += f"mov{Statement.instruction_data_suffix(self.left.data_type)} " \
-                              f"{self.left.identifier}(%rip), "
-            else:
-                arithmetic += f"{self.left.__repr__()}"
-            arithmetic += f"%{Statement.register_name_prefix(self.left.data_type)}ax\n"
-            arithmetic += f"pushq %rax" \
-                          f"\n"
-            if not ((self.data_type == 'short') and (self.left.data_type == 'int')) and \
-               not ((self.data_type == 'int') and (self.left.data_type == 'short')) and \
-                    (self.data_type != self.left.data_type):
-                if self.data_type in fractional_types:
-                    if self.left.data_type in fractional_types:
-                        arithmetic += f"fld{Statement.instruction_data_suffix(self.left.data_type, fpu=True)} " \
-                                      f"(%rsp)\n"
-                    else:  # elif self.left.data_type in integral_types:
-                        arithmetic += f"fildl (%rsp)\n"
-                    arithmetic += f"fstp{Statement.instruction_data_suffix(self.data_type, fpu=True)} " \
-                                  f"(%rsp)\n"
-                elif self.data_type in integral_types:
-                    arithmetic += f"fld{Statement.instruction_data_suffix(self.left.data_type, fpu=True)} " \
-                                  f"(%rsp)\n" \
-                                  f"fistpl (%rsp)\n"
-                else:
-                    arithmetic += f"\n"
-        else:  # unary, binary or function call
-            arithmetic += f"{self.left.__repr__()}\n" \
-                          f"mov{Statement.instruction_data_suffix(self.left.data_type)} " \
-                          f"{self.left.identifier}(%rip), " \
-                          f"%{Statement.register_name_prefix(self.left.data_type)}ax\n"
-            arithmetic += f"pushq %rax" \
-                          f"\n"
-            if not ((self.data_type == 'short') and (self.left.data_type == 'int')) and \
-               not ((self.data_type == 'int') and (self.left.data_type == 'short')) and \
-                    (self.data_type != self.left.data_type):
-                if self.data_type in fractional_types:
-                    if self.left.data_type in fractional_types:
-                        arithmetic += f"fld{Statement.instruction_data_suffix(self.left.data_type, fpu=True)} " \
-                                      f"(%rsp)\n"
-                    else:  # elif self.left.data_type in integral_types:
-                        arithmetic += f"fildl (%rsp)\n"
-                    arithmetic += f"fstp{Statement.instruction_data_suffix(self.data_type, fpu=True)} " \
-                                  f"(%rsp)\n"
-                elif self.data_type in integral_types:
-                    arithmetic += f"fld{Statement.instruction_data_suffix(self.left.data_type, fpu=True)} " \
-                                  f"(%rsp)\n" \
-                                  f"fistpl (%rsp)\n"
-                else:
-                    arithmetic += f"\n"
-
-        # generating code for right operand
-        if not isinstance(self.right, (Unary, Binary, FunctionCall)):  # const, var or array usage
-            if isinstance(self.right, NumericConstant):
-                arithmetic += f"mov{Statement.instruction_data_suffix(self.right.data_type)} " \
-                              f"{self.right.identifier}(%rip), "
-            else:
-                arithmetic += f"{self.right.__repr__()}"
-            arithmetic += f"%{Statement.register_name_prefix(self.right.data_type)}ax\n"
-            arithmetic += f"pushq %rax" \
-                          f"\n"
-            if not ((self.data_type == 'short') and (self.right.data_type == 'int')) and \
-               not ((self.data_type == 'int') and (self.right.data_type == 'short')) and \
-                    (self.data_type != self.right.data_type):
-                if self.data_type in fractional_types:
-                    if self.right.data_type in fractional_types:
-                        arithmetic += f"fld{Statement.instruction_data_suffix(self.right.data_type, fpu=True)} " \
-                                      f"(%rsp)\n"
-                    else:  # elif self.left.data_type in integral_types:
-                        arithmetic += f"fildl (%rsp)\n"
-                    arithmetic += f"fstp{Statement.instruction_data_suffix(self.data_type, fpu=True)} " \
-                                  f"(%rsp)\n"
-                elif self.data_type in integral_types:
-                    arithmetic += f"fld{Statement.instruction_data_suffix(self.right.data_type, fpu=True)} " \
-                                  f"(%rsp)\n" \
-                                  f"fistpl (%rsp)\n"
-                else:
-                    arithmetic += f"\n"
-        else:  # unary, binary or function call
-            arithmetic += f"{self.right.__repr__()}\n" \
-                          f"mov{Statement.instruction_data_suffix(self.right.data_type)} " \
-                          f"{self.right.identifier}(%rip), " \
-                          f"%{Statement.register_name_prefix(self.right.data_type)}ax\n"
-            arithmetic += f"pushq %rax" \
-                          f"\n"
-            if not ((self.data_type == 'short') and (self.right.data_type == 'int')) and \
-               not ((self.data_type == 'int') and (self.right.data_type == 'short')) and \
-                    (self.data_type != self.right.data_type):
-                if self.data_type in fractional_types:
-                    if self.right.data_type in fractional_types:
-                        arithmetic += f"fld{Statement.instruction_data_suffix(self.right.data_type, fpu=True)} " \
-                                      f"(%rsp)\n"
-                    else:  # elif self.left.data_type in integral_types:
-                        arithmetic += f"fildl (%rsp)\n"
-                    arithmetic += f"fstp{Statement.instruction_data_suffix(self.data_type, fpu=True)} " \
-                                  f"(%rsp)\n"
-                elif self.data_type in integral_types:
-                    arithmetic += f"fld{Statement.instruction_data_suffix(self.right.data_type, fpu=True)} " \
-                                  f"(%rsp)\n" \
-                                  f"fistpl (%rsp)\n"
-                else:
-                    arithmetic += f"\n"
+        arithmetic += self.operand(self.left)  # generating code for left operand
+        arithmetic += self.operand(self.right)  # generating code for right operand
 
         arithmetic += f"\npopq %rdx\npopq %rax\n" \
                       f"\n"
@@ -667,9 +986,10 @@ class Sub(Binary):
                           f"popq %rax\n" \
                           f"\n"
         else:  # elif self.data_type in integral_types:
-            arithmetic += f"sub{Statement.instruction_data_suffix(self.data_type)} " \
-                          f"%{Statement.register_name_prefix(self.data_type)}dx, " \
-                          f"%{Statement.register_name_prefix(self.data_type)}ax\n" \
+            register_type = Statement.register_type(self.data_type)
+            arithmetic += f"sub{Statement.instruction_data_suffix(register_type)} " \
+                          f"%{Statement.register_name_prefix(register_type)}dx, " \
+                          f"%{Statement.register_name_prefix(register_type)}ax\n" \
                           f"\n"
 
         return arithmetic + f"mov{Statement.instruction_data_suffix(self.data_type)} " \
@@ -680,115 +1000,26 @@ class Sub(Binary):
 
 class Mul(Binary):
 
+    instruction = 'imul'
+
     def __init__(self, left: Expression, right: Expression, position):
         super().__init__(left, right, position)
 
+    @located()
     def __repr__(self):
+        if code_generation.strength_reduction and (self.data_type in integral_types):
+            if isinstance(self.right, IntegralConstant):
+                return self.reduced(self.left, multiplication(self.data_type, self.right.value))
+            elif isinstance(self.left, IntegralConstant):
+                return self.reduced(self.right, multiplication(self.data_type, self.left.value))
+
+        if code_generation.instruction_selection and self.selectable():
+            return self.selected()
+
         arithmetic = ''
 
-        # generating code for left operand
-        if not isinstance(self.left, (Unary, Binary, FunctionCall)):  # const, var or array usage
-            if isinstance(self.left, NumericConstant):
-                arithmetic += f"mov{Statement.instruction_data_suffix(self.left.data_type)} " \
-                              f"{self.left.identifier}(%rip), "
-            else:
-                arithmetic += f"{self.left.__repr__()}"
-            arithmetic += f"%{Statement.register_name_prefix(self.left.data_type)}ax\n"
-            arithmetic += f"pushq %rax" \
-                          f"\n"
-            if not ((self.data_type == 'short') and (self.left.data_type == 'int')) and \
-               not ((self.data_type == 'int') and (self.left.data_type == 'short')) and \
-                    (self.data_type != self.left.data_type):
-                if self.data_type in fractional_types:
-                    if self.left.data_type in fractional_types:
-                        arithmetic += f"fld{Statement.instruction_data_suffix(self.left.data_type, fpu=True)} " \
-                                      f"(%rsp)\n"
-                    else:  # elif self.left.data_type in integral_types:
-                        arithmetic += f"fildl (%rsp)\n"
-                    arithmetic += f"fstp{Statement.instruction_data_suffix(self.data_type, fpu=True)} " \
-                                  f"(%rsp)\n"
-                elif self.data_type in integral_types:
-                    arithmetic += f"fld{Statement.instruction_data_suffix(self.left.data_type, fpu=True)} " \
-                                  f"(%rsp)\n" \
-                                  f"fistpl (%rsp)\n"
-                else:
-                    arithmetic += f"\n"
-        else:  # unary, binary or function call
-            arithmetic += f"{self.left.__repr__()}\n" \
-                          f"mov{Statement.instruction_data_suffix(self.left.data_type)} " \
-                          f"{self.left.identifier}(%rip), " \
-                          f"%{Statement.register_name_prefix(self.left.data_type)}ax\n"
-            arithmetic += f"pushq %rax" \
-                          f"\n"
-            if not ((self.data_type == 'short') and (self.left.data_type == 'int')) and \
-               not ((self.data_type == 'int') and (self.left.data_type == 'short')) and \
-                    (self.data_type != self.left.data_type):
-                if self.data_type in fractional_types:
-                    if self.left.data_type in fractional_types:
-                        arithmetic += f"fld{Statement.instruction_data_suffix(self.left.data_type, fpu=True)} " \
-                                      f"(%rsp)\n"
-                    else:  # elif self.left.data_type in integral_types:
-                        arithmetic += f"fildl (%rsp)\n"
-                    arithmetic += f"fstp{Statement.instruction_data_suffix(self.data_type, fpu=True)} " \
-                                  f"(%rsp)\n"
-                elif self.data_type in integral_types:
-                    arithmetic += f"fld{Statement.instruction_data_suffix(self.left.data_type, fpu=True)} " \
-                                  f"(%rsp)\n" \
-                                  f"fistpl (%rsp)\n"
-                else:
-                    arithmetic += f"\n"
-
-        # generating code for right operand
-        if not isinstance(self.right, (Unary, Binary, FunctionCall)):  # const, var or array usage
-            if isinstance(self.right, NumericConstant):
-                arithmetic += f"mov{Statement.instruction_data_suffix(self.right.data_type)} " \
-                              f"{self.right.identifier}(%rip), "
-            else:
-                arithmetic += f"{self.right.__repr__()}"
-            arithmetic += f"%{Statement.register_name_prefix(self.right.data_type)}ax\n"
-            arithmetic += f"pushq %rax" \
-                          f"\n"
-            if not ((self.data_type == 'short') and (self.right.data_type == 'int')) and \
-               not ((self.data_type == 'int') and (self.right.data_type == 'short')) and \
-                    (self.data_type != self.right.data_type):
-                if self.data_type in fractional_types:
-                    if self.right.data_type in fractional_types:
-                        arithmetic += f"fld{Statement.instruction_data_suffix(self.right.data_type, fpu=True)} " \
-                                      f"(%rsp)\n"
-                    else:  # elif self.left.data_type in integral_types:
-                        arithmetic += f"fildl (%rsp)\n"
-                    arithmetic += f"fstp{Statement.instruction_data_suffix(self.data_type, fpu=True)} " \
-                                  f"(%rsp)\n"
-                elif self.data_type in integral_types:
-                    arithmetic += f"fld{Statement.instruction_data_suffix(self.right.data_type, fpu=True)} " \
-                                  f"(%rsp)\n" \
-                                  f"fistpl (%rsp)\n"
-                else:
-                    arithmetic += f"\n"
-        else:  # unary, binary or function call
-            arithmetic += f"{self.right.__repr__()}\n" \
-                          f"mov{Statement.instruction_data_suffix(self.right.data_type)} " \
-                          f"{self.right.identifier}(%rip), " \
-                          f"%{Statement.register_name_prefix(self.right.data_type)}ax\n"
-            arithmetic += f"pushq %rax" \
-                          f"\n"
-            if not ((self.data_type == 'short') and (self.right.data_type == 'int')) and \
-               not ((self.data_type == 'int') and (self.right.data_type == 'short')) and \
-                    (self.data_type != self.right.data_type):
-                if self.data_type in fractional_types:
-                    if self.right.data_type in fractional_types:
-                        arithmetic += f"fld{Statement.instruction_data_suffix(self.right.data_type, fpu=True)} " \
-                                      f"(%rsp)\n"
-                    else:  # elif self.left.data_type in integral_types:
-                        arithmetic += f"fildl (%rsp)\n"
-                    arithmetic += f"fstp{Statement.instruction_data_suffix(self.data_type, fpu=True)} " \
-                                  f"(%rsp)\n"
-                elif self.data_type in integral_types:
-                    arithmetic += f"fld{Statement.instruction_data_suffix(self.right.data_type, fpu=True)} " \
-                                  f"(%rsp)\n" \
-                                  f"fistpl (%rsp)\n"
-                else:
-                    arithmetic += f"\n"
+        arithmetic += self.operand(self.left)  # generating code for left operand
+        arithmetic += self.operand(self.right)  # generating code for right operand
 
         arithmetic += f"\npopq %rdx\npopq %rax\n" \
                       f"\n"
@@ -805,8 +1036,9 @@ class Mul(Binary):
                           f"popq %rax\n" \
                           f"\n"
         else:  # elif self.data_type in integral_types:
-            arithmetic += f"imul{Statement.instruction_data_suffix(self.data_type)} " \
-                          f"%{Statement.register_name_prefix(self.data_type)}dx\n" \
+            register_type = Statement.register_type(self.data_type)
+            arithmetic += f"imul{Statement.instruction_data_suffix(register_type)} " \
+                          f"%{Statement.register_name_prefix(register_type)}dx\n" \
                           f"\n"
 
         return arithmetic + f"mov{Statement.instruction_data_suffix(self.data_type)} " \
@@ -817,115 +1049,25 @@ class Mul(Binary):
 
 class Div(Binary):
 
+    instruction = 'idiv'
+
     def __init__(self, left: Expression, right: Expression, position):
         super().__init__(left, right, position)
 
+    @located()
     def __repr__(self):
+        if code_generation.strength_reduction and (self.data_type in integral_types) and \
+                isinstance(self.right, IntegralConstant) and \
+                (division(self.data_type, self.right.value) is not None):
+            return self.reduced(self.left, division(self.data_type, self.right.value))
+
+        if code_generation.instruction_selection and self.selectable():
+            return self.selected()
+
         arithmetic = ''
 
-        # generating code for left operand
-        if not isinstance(self.left, (Unary, Binary, FunctionCall)):  # const, var or array usage
-            if isinstance(self.left, NumericConstant):
-                arithmetic += f"mov{Statement.instruction_data_suffix(self.left.data_type)} " \
-                              f"{self.left.identifier}(%rip), "
-            else:
-                arithmetic += f"{self.left.__repr__()}"
-            arithmetic += f"%{Statement.register_name_prefix(self.left.data_type)}ax\n"
-            arithmetic += f"pushq %rax" \
-                          f"\n"
-            if not ((self.data_type == 'short') and (self.left.data_type == 'int')) and \
-               not ((self.data_type == 'int') and (self.left.data_type == 'short')) and \
-                    (self.data_type != self.left.data_type):
-                if self.data_type in fractional_types:
-                    if self.left.data_type in fractional_types:
-                        arithmetic += f"fld{Statement.instruction_data_suffix(self.left.data_type, fpu=True)} " \
-                                      f"(%rsp)\n"
-                    else:  # elif self.left.data_type in integral_types:
-                        arithmetic += f"fildl (%rsp)\n"
-                    arithmetic += f"fstp{Statement.instruction_data_suffix(self.data_type, fpu=True)} " \
-                                  f"(%rsp)\n"
-                elif self.data_type in integral_types:
-                    arithmetic += f"fld{Statement.instruction_data_suffix(self.left.data_type, fpu=True)} " \
-                                  f"(%rsp)\n" \
-                                  f"fistpl (%rsp)\n"
-                else:
-                    arithmetic += f"\n"
-        else:  # unary, binary or function call
-            arithmetic += f"{self.left.__repr__()}\n" \
-                          f"mov{Statement.instruction_data_suffix(self.left.data_type)} " \
-                          f"{self.left.identifier}(%rip), " \
-                          f"%{Statement.register_name_prefix(self.left.data_type)}ax\n"
-            arithmetic += f"pushq %rax" \
-                          f"\n"
-            if not ((self.data_type == 'short') and (self.left.data_type == 'int')) and \
-               not ((self.data_type == 'int') and (self.left.data_type == 'short')) and \
-                    (self.data_type != self.left.data_type):
-                if self.data_type in fractional_types:
-                    if self.left.data_type in fractional_types:
-                        arithmetic += f"fld{Statement.instruction_data_suffix(self.left.data_type, fpu=True)} " \
-                                      f"(%rsp)\n"
-                    else:  # elif self.left.data_type in integral_types:
-                        arithmetic += f"fildl (%rsp)\n"
-                    arithmetic += f"fstp{Statement.instruction_data_suffix(self.data_type, fpu=True)} " \
-                                  f"(%rsp)\n"
-                elif self.data_type in integral_types:
-                    arithmetic += f"fld{Statement.instruction_data_suffix(self.left.data_type, fpu=True)} " \
-                                  f"(%rsp)\n" \
-                                  f"fistpl (%rsp)\n"
-                else:
-                    arithmetic += f"\n"
-
-        # generating code for right operand
-        if not isinstance(self.right, (Unary, Binary, FunctionCall)):  # const, var or array usage
-            if isinstance(self.right, NumericConstant):
-                arithmetic += f"mov{Statement.instruction_data_suffix(self.right.data_type)} " \
-                              f"{self.right.identifier}(%rip), "
-            else:
-                arithmetic += f"{self.right.__repr__()}"
-            arithmetic += f"%{Statement.register_name_prefix(self.right.data_type)}ax\n"
-            arithmetic += f"pushq %rax" \
-                          f"\n"
-            if not ((self.data_type == 'short') and (self.right.data_type == 'int')) and \
-               not ((self.data_type == 'int') and (self.right.data_type == 'short')) and \
-                    (self.data_type != self.right.data_type):
-                if self.data_type in fractional_types:
-                    if self.right.data_type in fractional_types:
-                        arithmetic += f"fld{Statement.instruction_data_suffix(self.right.data_type, fpu=True)} " \
-                                      f"(%rsp)\n"
-                    else:  # elif self.left.data_type in integral_types:
-                        arithmetic += f"fildl (%rsp)\n"
-                    arithmetic += f"fstp{Statement.instruction_data_suffix(self.data_type, fpu=True)} " \
-                                  f"(%rsp)\n"
-                elif self.data_type in integral_types:
-                    arithmetic += f"fld{Statement.instruction_data_suffix(self.right.data_type, fpu=True)} " \
-                                  f"(%rsp)\n" \
-                                  f"fistpl (%rsp)\n"
-                else:
-                    arithmetic += f"\n"
-        else:  # unary, binary or function call
-            arithmetic += f"{self.right.__repr__()}\n" \
-                          f"mov{Statement.instruction_data_suffix(self.right.data_type)} " \
-                          f"{self.right.identifier}(%rip), " \
-                          f"%{Statement.register_name_prefix(self.right.data_type)}ax\n"
-            arithmetic += f"pushq %rax" \
-                          f"\n"
-            if not ((self.data_type == 'short') and (self.right.data_type == 'int')) and \
-               not ((self.data_type == 'int') and (self.right.data_type == 'short')) and \
-                    (self.data_type != self.right.data_type):
-                if self.data_type in fractional_types:
-                    if self.right.data_type in fractional_types:
-                        arithmetic += f"fld{Statement.instruction_data_suffix(self.right.data_type, fpu=True)} " \
-                                      f"(%rsp)\n"
-                    else:  # elif self.left.data_type in integral_types:
-                        arithmetic += f"fildl (%rsp)\n"
-                    arithmetic += f"fstp{Statement.instruction_data_suffix(self.data_type, fpu=True)} " \
-                                  f"(%rsp)\n"
-                elif self.data_type in integral_types:
-                    arithmetic += f"fld{Statement.instruction_data_suffix(self.right.data_type, fpu=True)} " \
-                                  f"(%rsp)\n" \
-                                  f"fistpl (%rsp)\n"
-                else:
-                    arithmetic += f"\n"
+        arithmetic += self.operand(self.left)  # generating code for left operand
+        arithmetic += self.operand(self.right)  # generating code for right operand
 
         arithmetic += f"\npopq %rcx\npopq %rax\n" \
                       f"\n"
@@ -942,12 +1084,13 @@ class Div(Binary):
                           f"popq %rax\n" \
                           f"\n"
         else:  # elif self.data_type in integral_types:
-            if self.data_type == 'short':
+            register_type = Statement.register_type(self.data_type)
+            if register_type == 'short':
                 arithmetic += f"cwd\n"
-            else:  # elif self.data_type == 'int':
+            else:  # elif register_type == 'int':
                 arithmetic += f"cdq\n"
-            arithmetic += f"idiv{Statement.instruction_data_suffix(self.data_type)} " \
-                          f"%{Statement.register_name_prefix(self.data_type)}cx\n" \
+            arithmetic += f"idiv{Statement.instruction_data_suffix(register_type)} " \
+                          f"%{Statement.register_name_prefix(register_type)}cx\n" \
                           f"\n"
 
         return arithmetic + f"mov{Statement.instruction_data_suffix(self.data_type)} " \
@@ -964,56 +1107,277 @@ Binary.operation = {
 }
 
 
+class VectorLoop:
+    """ ~ loop over the elements of a whole-array expression, packed as far as the vector registers fill ~ """
+
+    bases = ['rsi', 'rdi', 'r9', 'r10', 'r11']  # array addresses hoisted out of the loop ('r8' is the profiler's)
+
+    registers_available = 15  # %xmm15/%ymm15 is the accumulator of reductions
+
+    def __init__(self, expression: Expression, data_type: str, size: int, symbols_table):
+        self.expression = expression
+
+        self.data_type = data_type
+        self.size = size
+
+        if self.registers(expression) > self.registers_available:
+            raise ValueError(f"whole-array expression needs more than {self.registers_available} vector registers")
+
+        # scalar subexpression, temporary it is broadcast into before the loop; matched by identity rather than
+        # keyed by id() so that unpickled trees ('parser/parallel.py') keep working
+        self.slots = []
+        for scalar in self.scalars(expression):
+            if not any(scalar is seen for seen, _ in self.slots):  # 32 bytes, as wide as an avx2 register
+                slot = symbols_table.add_temporary_array(data_type, 32 // simd.sizes[data_type])
+                self.slots.append((scalar, slot.identifier))
+
+    @staticmethod
+    def leaf(expression: Expression) -> bool:
+        return (expression.shape is None) or (type(expression) == WholeArrayUsage)
+
+    @staticmethod
+    def registers(expression: Expression) -> int:
+        """ vector registers 'expression' takes, its value ends up in the first one """
+
+        if VectorLoop.leaf(expression):
+            return 1
+        elif isinstance(expression, Minus):
+            return max(VectorLoop.registers(expression.expression), 2)  # and the sign mask
+        return max(VectorLoop.registers(expression.left),
+                   1 if VectorLoop.leaf(expression.right) else VectorLoop.registers(expression.right) + 1)
+
+    @staticmethod
+    def scalars(expression: Expression) -> [Expression]:
+        """ largest scalar subexpressions, in the order their code is generated """
+
+        if expression.shape is None:
+            return [expression]
+        return [scalar for child in expression.children() for scalar in VectorLoop.scalars(child)]
+
+    @staticmethod
+    def arrays(expression: Expression) -> [str]:
+        if type(expression) == WholeArrayUsage:
+            return [expression.identifier]
+        elif expression.shape is None:
+            return []
+        return [array for child in expression.children() for array in VectorLoop.arrays(child)]
+
+    def broadcast(self, scalar: Expression, slot: str) -> str:
+        """ 'scalar' converted to the element type into every lane of 'slot' (legacy sse, no avx transitions) """
+
+        move = 'movapd' if self.data_type == 'double' else 'movaps'
+        if isinstance(scalar, NumericConstant):
+            code = f"{'movsd' if self.data_type == 'double' else 'movss'} {scalar.operand(self.data_type)}, %xmm0\n"
+        else:
+            code = Expression.load(scalar) + simd.conversion(scalar.data_type, self.data_type)
+        return code + simd.splat(self.data_type) + \
+            f"{move} %xmm0, {slot}(%rip)\n" \
+            f"{move} %xmm0, {slot}+16(%rip)\n" + \
+            ('' if isinstance(scalar, NumericConstant) else f"xor %rax, %rax\n")
+
+    def prologue(self, arrays: [str]) -> str:
+        """ scalars broadcast, array addresses into the base registers """
+
+        return ''.join(self.broadcast(scalar, slot) for scalar, slot in self.slots) + \
+            ''.join(f"leaq {array}(%rip), %{base}\n" for array, base in zip(arrays, self.bases))
+
+    def operand(self, leaf: Expression, arrays: [str]) -> (str, str):
+        """ code computing the address (into %rdx, past the base registers) and the memory operand of 'leaf' """
+
+        if leaf.shape is None:
+            return '', f"{next(slot for scalar, slot in self.slots if scalar is leaf)}(%rip)"
+        elif arrays.index(leaf.identifier) < len(self.bases):
+            return '', f"(%{self.bases[arrays.index(leaf.identifier)]}, %rcx)"
+        return f"leaq {leaf.identifier}(%rip), %rdx\n", "(%rdx, %rcx)"
+
+    def element(self, expression: Expression, n: int, packed: bool, arrays: [str]) -> str:
+        """ code leaving the element of 'expression' at %rcx (as many as the register holds, if 'packed')
+            in vector register 'n' """
+
+        mode = code_generation.simd
+        destination = simd.register(n, packed, mode)
+
+        if self.leaf(expression):
+            address, source = self.operand(expression, arrays)
+            return address + simd.move(self.data_type, packed, mode, source, destination)
+        elif isinstance(expression, Minus):
+            return self.element(expression.expression, n, packed, arrays) + \
+                simd.negation(self.data_type, mode, destination, simd.register(n + 1, packed, mode))
+
+        code = self.element(expression.left, n, packed, arrays)
+        if self.leaf(expression.right):
+            address, source = self.operand(expression.right, arrays)
+            code += address
+        else:
+            code += self.element(expression.right, n + 1, packed, arrays)
+            source = simd.register(n + 1, packed, mode)
+        return code + simd.arithmetic(expression.instruction.lstrip('i'), self.data_type, packed, mode,
+                                      source, destination)
+
+    def loop(self, body, arrays: [str], between: str = '') -> str:
+        """ 'body(packed)' over every element: packed while whole vectors fit, then one by one """
+
+        mode = code_generation.simd
+        width, size = simd.widths[mode], simd.sizes[self.data_type]
+        total = self.size * size
+        vectors = total // width * width
+
+        code = f"xor %rcx, %rcx\n"
+        if vectors:
+            code += f"1:\n" \
+                    f"{body(True)}" \
+                    f"addq ${width}, %rcx\n" \
+                    f"cmpq ${vectors}, %rcx\n" \
+                    f"jb 1b\n"
+        code += between
+        if vectors < total:
+            code += f"2:\n" \
+                    f"{body(False)}" \
+                    f"addq ${size}, %rcx\n" \
+                    f"cmpq ${total}, %rcx\n" \
+                    f"jb 2b\n"
+        return code
+
+    def epilogue(self, arrays: [str]) -> str:
+        return ("vzeroupper\n" if code_generation.simd == 'avx2' else '') + \
+            ("xor %rdx, %rdx\n" if len(arrays) > len(self.bases) else '') + \
+            f"xor %rcx, %rcx\n"
+
+    def assignment(self, destination: str) -> str:
+        """ the expression stored into every element of 'destination' """
+
+        mode = code_generation.simd
+        arrays = list(dict.fromkeys([destination] + self.arrays(self.expression)))
+        address, target = self.operand(WholeArrayUsage(destination, self.data_type, self.size, None), arrays)
+
+        def store(packed: bool) -> str:
+            return self.element(self.expression, 0, packed, arrays) + address + \
+                simd.move(self.data_type, packed, mode, simd.register(0, packed, mode), target)
+
+        return self.prologue(arrays) + self.loop(store, arrays) + self.epilogue(arrays)
+
+    def reduction(self, function: str, result: str) -> str:
+        """ 'sum' or 'max' of the elements into 'result', lanes folded as 'simd.fold' does """
+
+        mode = code_generation.simd
+        arrays = list(dict.fromkeys(self.arrays(self.expression)))
+        operation = Reduction.operations[function]
+
+        def accumulate(packed: bool) -> str:
+            return self.element(self.expression, 0, packed, arrays) + \
+                simd.arithmetic(operation, self.data_type, packed, mode,
+                                simd.register(0, packed, mode), simd.register(15, packed, mode))
+
+        return self.prologue(arrays) + \
+            simd.accumulator(operation, self.data_type, mode, f"{label(-math.inf, self.data_type)}(%rip)") + \
+            self.loop(accumulate, arrays, simd.fold(operation, self.data_type, mode)) + \
+            simd.move(self.data_type, False, mode, '%xmm15', f"{result}(%rip)") + \
+            self.epilogue(arrays)
+
+
+class Reduction(FunctionCall):
+    """ 'sum' or 'max' of a whole-array expression """
+
+    operations = {  # function -> vector instruction
+        'sum': 'add',
+        'max': 'max'  # 'maxpd' semantics: the accumulated value unless the element is greater (or NaN)
+    }
+
+    def __init__(self, function: str, arguments: [Expression], position, p):
+        Expression.__init__(self, position)
+
+        self.identifier = self.function = function
+        self.arguments = arguments
+
+        if (len(arguments) != 1) or (self.argument.shape is None):
+            raise TypeError(f"'{function}' takes a whole array{' (or two scalars)' if function in intrinsics else ''}")
+        self.data_type = self.argument.data_type
+
+        self.loop = None
+
+    def create_temp_var(self, symbols_table):
+        super().create_temp_var(symbols_table)
+        self.loop = VectorLoop(self.argument, self.data_type, self.argument.shape, symbols_table)
+        return self
+
+    @located()
+    def __repr__(self):
+        return self.loop.reduction(self.function, self.identifier) + f"\n"
+
+
 class AssignmentStatement(Statement):
 
-    def __init__(self, destination: VariableUsage or ArrayUsage, value: Expression, position, p):
+    def __init__(self, destination: VariableUsage or ArrayUsage or WholeArrayUsage, value: Expression, position, p):
         super().__init__(position)
 
         self.value = value
         self.destination = destination
 
+        self.loop = None  # of whole-array assignments
+        self.conversions = []  # planned ones, their code comes first
+        if type(destination) == WholeArrayUsage:
+            if value.shape not in (None, destination.shape):
+                raise ValueError(f"whole array of size {value.shape} assigned to one of size {destination.shape}")
+            elif (value.shape is not None) and (value.data_type != destination.data_type):
+                raise TypeError(f"whole {value.data_type} array assigned to a {destination.data_type} one")
+            self.loop = VectorLoop(value, destination.data_type, destination.shape, p.parser.symbols_table)
+        elif value.shape is not None:
+            raise TypeError(f"whole array assigned to a single "
+                            f"{'element' if type(destination) == ArrayUsage else 'variable'}")
+
         data_types_priority = integral_types + fractional_types
         if data_types_priority.index(destination.data_type) < data_types_priority.index(value.data_type):
-            print(
-                NEWLINE +
-                colorize('yellow', f"warning: type conversion may result in loss of data or precision! "
-                                   f"({self.value.data_type} assigned to {self.destination.data_type}), here:\n"
-                                   f"{p.lexer.lexdata.split(NEWLINE)[p.lineno(2) - 1]}\n"
-                                   f"{' ' * (p.lexpos(2) - p.lexer.lexdata.rfind(NEWLINE, 0, p.lexpos(2)) - 1) + '^'}"
-                         )
-                + NEWLINE +
-                colorize('violet', f"hint: in assignment statement, at "
-                                   f"{position[0]}:{position[1] - p.lexer.lexdata.rfind(NEWLINE, 0, position[1])}")
-            )
+            p.parser.diagnostics.warning(f"type conversion may result in loss of data or precision! "
+                                         f"({self.value.data_type} assigned to {self.destination.data_type})",
+                                         Span(*position), ('hint', "in assignment statement"))
 
+    @located(lambda statement: statement.destination.position)
     def __repr__(self):
 
-        destination, conversion, value = "", None, ''
+        FunctionCall.fuse([self.value, self.destination])
+
+        if self.loop is not None:
+            return self.loop.assignment(self.destination.identifier)
 
+        destination, conversion, value = "", None, ''.join(f"{planned.code()}\n" for planned in self.conversions)
+
+        value_type = self.value.data_type
         if type(self.value) in (VariableUsage, ArrayUsage):
-            value += self.value.__repr__()+f"%{self.register_name_prefix(self.value.data_type)}ax\n"
-        elif isinstance(self.value, NumericConstant):
-            value += f"mov{self.instruction_data_suffix(self.value.data_type)} " \
-                     f"{self.value.identifier}(%rip), %{self.register_name_prefix(self.value.data_type)}ax\n"
+            value += self.value.__repr__()+f"%{self.register_name_prefix(self.register_type(value_type))}ax\n"
+        elif isinstance(self.value, NumericConstant):  # converted at compile time
+            memory = Binary.memory(self.destination, self.destination.data_type)
+            if (self.destination.data_type in integral_types) and (memory is not None):
+                return f"{Binary.prerequisites(self.destination)}" \
+                       f"{memory[0]}" \
+                       f"mov{self.instruction_data_suffix(self.destination.data_type)} " \
+                       f"{self.value.operand(self.destination.data_type)}, {memory[1]}\n"
+            value_type = self.destination.data_type
+            value += f"mov{self.instruction_data_suffix(self.register_type(value_type))} " \
+                     f"{self.value.operand(value_type)}, " \
+                     f"%{self.register_name_prefix(self.register_type(value_type))}ax\n"
         else:  # elif isinstance(self.value, (Unary, Binary, FunctionCall))
             value += f"{self.value.__repr__()}\n" \
-                     f"mov{self.instruction_data_suffix(self.value.data_type)} " \
-                     f"{self.value.identifier}(%rip), %{self.register_name_prefix(self.value.data_type)}ax\n"
+                     f"{self.load_instruction(value_type)} " \
+                     f"{self.value.identifier}(%rip), %{self.register_name_prefix(self.register_type(value_type))}ax\n"
 
-        conversion = NEWLINE
-        if not ((self.destination.data_type == 'short') and (self.value.data_type == 'int')) and \
-           not ((self.destination.data_type == 'int') and (self.value.data_type == 'short')) and \
-           (self.destination.data_type != self.value.data_type):
+        conversion = NEWLINE + widened(self.register_type(value_type), self.destination.data_type)
+        if code_generation.conversion_planning:
+            conversion += f"{in_register(value_type, self.destination.data_type)}" \
+                          f"pushq %rax\n" \
+                          f"\n"
+        elif not ((self.destination.data_type == 'short') and (value_type == 'int')) and \
+           not ((self.destination.data_type == 'int') and (value_type == 'short')) and \
+           (self.destination.data_type != value_type):
 
             conversion += f"pushq %rax\n"
             if self.destination.data_type in fractional_types:
-                if self.value.data_type in fractional_types:
-                    conversion += f"fld{self.instruction_data_suffix(self.value.data_type, fpu=True)} (%rsp)\n"
-                else:  # elif self.value.data_type in integral_types:
+                if value_type in fractional_types:
+                    conversion += f"fld{self.instruction_data_suffix(value_type, fpu=True)} (%rsp)\n"
+                else:  # elif value_type in integral_types:
                     conversion += f"fildl (%rsp)\n"
                 conversion += f"fstp{self.instruction_data_suffix(self.destination.data_type, fpu=True)} (%rsp)\n"
             else:  # elif self.destination.data_type in integral_types:
-                conversion += f"fld{self.instruction_data_suffix(self.value.data_type, fpu=True)} (%rsp)\n" \
+                conversion += f"fld{self.instruction_data_suffix(value_type, fpu=True)} (%rsp)\n" \
                               f"fistpl (%rsp)\n"
             conversion += f"\n"
         else:
@@ -1029,25 +1393,36 @@ class AssignmentStatement(Statement):
                            f"\n" \
                            f"xor %rax, %rax" \
                            f"\n"
+        elif isinstance(self.destination.index, IntegralConstant):
+            destination += f"popq %rax\n" \
+                           f"\n" \
+                           f"mov{self.instruction_data_suffix(self.destination.data_type)} " \
+                           f"%{self.register_name_prefix(self.destination.data_type)}ax, " \
+                           f"{self.destination.identifier}+" \
+                           f"{self.destination.index.value * self.data_type_size(self.destination.data_type)}(%rip)\n" \
+                           f"\n" \
+                           f"xor %rax, %rax" \
+                           f"\n"
         else:  # elif type(self.destination) == ArrayUsage
+            index_type = self.destination.index.data_type
             if type(self.destination.index) == ArrayUsage:
                 destination += f"{self.destination.index.__repr__()}" \
-                               f"%{self.register_name_prefix(self.destination.index.data_type)}di\n" \
+                               f"%{self.register_name_prefix(self.register_type(index_type))}di\n" \
                                f"\n" \
                                f"leaq {self.destination.identifier}(%rip), %rsi\n"
             elif not isinstance(self.destination.index, (Unary, Binary, FunctionCall)):
                 destination += f"leaq {self.destination.identifier}(%rip), %rsi\n" \
                                f"xor %rdi, %rdi\n" \
-                               f"mov{self.instruction_data_suffix(self.destination.index.data_type)} " \
+                               f"{self.load_instruction(index_type, 'z')} " \
                                f"{self.destination.index.identifier}(%rip), " \
-                               f"%{self.register_name_prefix(self.destination.index.data_type)}di\n"
+                               f"%{self.register_name_prefix(self.register_type(index_type))}di\n"
             else:  # isinstance(self.index, (Unary, Binary, FunctionCall)):
                 destination += f"{self.destination.index.__repr__()}" \
                                f"\n" \
                                f"leaq {self.destination.identifier}(%rip), %rsi\n" \
-                               f"mov{self.instruction_data_suffix(self.destination.index.data_type)} " \
+                               f"{self.load_instruction(index_type, 'z')} " \
                                f"{self.destination.index.identifier}(%rip), " \
-                               f"%rdi" \
+                               f"%{self.register_name_prefix(self.register_type(index_type))}di" \
                                f"\n"
             destination += f"popq %rax\n" \
                            f"\n" \
@@ -1060,6 +1435,16 @@ class AssignmentStatement(Statement):
 
         return value + conversion + destination
 
+    def location(self, code: str) -> dict:
+        """ line, column and text of the statement in 'code' """
+
+        line, start = self.destination.position
+        return {
+            'line': line,
+            'column': start - code.rfind(NEWLINE, 0, start),
+            'source': ' '.join(code[start:code.find(';', self.position[1]) + 1].split())
+        }
+
     def __str__(self):
         return f"{self.__class__.__name__} -> " \
                f"{{destination={self.destination}, value={self.value}}}"
@@ -1069,7 +1454,6 @@ class AssignmentStatement(Statement):
 class SymbolsTable:
     """ ~ symbols table ~ """
 
-    numeric_constant_id: int = -1
     temporary_variable_id: int = -1
 
     declarations: [Declaration] = \
@@ -1099,11 +1483,18 @@ class SymbolsTable:
         self.temporary_variables.append(temp_var)
         return temp_var
 
+    def add_temporary_array(self, data_type: str, size: int):
+        self.temporary_variable_id += 1
+        temp_array = ArrayDeclaration(f"_tv{self.temporary_variable_id}", size, None, data_type)
+        self.temporary_variables.append(temp_array)
+        return temp_array
+
     def add_numeric_constant(self, symbol: NumericConstant) -> NumericConstant or None:
+        """ only fractional constants need memory, integral ones are immediates (or converted where used) """
+        if symbol.data_type in integral_types:
+            return symbol
         numeric_constant = self.get_numeric_constant(symbol)
-        if not self.get_numeric_constant(symbol):
-            self.numeric_constant_id += 1
-            symbol.identifier += str(self.numeric_constant_id)
+        if not numeric_constant:
             self.numeric_constants.append(symbol)
             return self.numeric_constants[-1]
         else:
@@ -1122,24 +1513,157 @@ class SymbolsTable:
 
 class ProgramStatements:
 
-    def __init__(self, statements: [Statement], symbols_table: SymbolsTable):
+    def __init__(self, statements: [Statement], symbols_table: SymbolsTable, spool=None):
         self.statements = statements
 
         self.symbols_table = symbols_table
 
-    def __repr__(self):
-        return f"\n.bss // declared variables\n" \
-               f"\n{NEWLINE.join(statement.__repr__() for statement in self.symbols_table.declarations)}\n" \
-               f"\n.data // constants\n" \
-               f"\n{NEWLINE.join(statement.__repr__() for statement in self.symbols_table.numeric_constants)}\n" \
+        self.spool = spool  # of streamed code ('parser/streaming.py'), 'statements' is empty then
+
+    @staticmethod
+    def instrumented(counter: int, code: str) -> str:
+        """ 'code' of a statement between time stamp reads, adding its cycles and a hit to its counter
+            in '__cmmm_profile' """
+
+        return f"// profile counter {counter}\n" \
+               f"lfence\n" \
+               f"rdtsc\n" \
+               f"shlq $32, %rdx\n" \
+               f"orq %rdx, %rax\n" \
+               f"movq %rax, %r8\n" \
+               f"xor %rdx, %rdx\n" \
+               f"xor %rax, %rax\n" \
+               f"\n{code}\n" \
+               f"rdtscp\n" \
+               f"lfence\n" \
+               f"shlq $32, %rdx\n" \
+               f"orq %rdx, %rax\n" \
+               f"subq %r8, %rax\n" \
+               f"addq %rax, __cmmm_profile+{16 * counter}(%rip)\n" \
+               f"incq __cmmm_profile+{16 * counter + 8}(%rip)\n" \
+               f"xor %rcx, %rcx\n" \
+               f"xor %rdx, %rdx\n" \
+               f"xor %rax, %rax\n"
+
+    def profile_map(self, code: str) -> [dict]:
+        """ counter index -> where its statement is in 'code' (counters are 16 bytes: cycles, then hits) """
+
+        if self.spool is not None:
+            return self.spool.locations
+        return [{'counter': counter, **statement.location(code)} for counter, statement in enumerate(self.statements)]
+
+    def written(self) -> {str}:
+        """ symbols the program stores to: destinations of statements and every temporary """
+
+        destinations = self.spool.destinations if self.spool is not None else \
+            {statement.destination.identifier for statement in self.statements}
+        return destinations | {temporary.identifier for temporary in self.symbols_table.temporary_variables}
+
+    def stored(self) -> [Declaration]:
+        """ symbols with storage in this unit: declared ones but 'extern', then temporaries """
+
+        return [declaration for declaration in self.symbols_table.declarations if declaration.linkage != 'extern'] + \
+            self.symbols_table.temporary_variables
+
+    def private(self) -> {str}:
+        """ symbols of a unit no other unit refers to: all of them but 'export' variables, none of whole programs """
+
+        if code_generation.entry is None:
+            return set()
+        return {declaration.identifier for declaration in self.stored() if declaration.linkage != 'export'} | \
+            {'__cmmm_profile', contraction.flag}
+
+    def layout(self, codes: [str] = None, ordered: bool = True):
+        """ '.bss' laid out for the statements whose code is 'codes' (in symbol table order unless 'ordered'),
+            streamed code has its first uses in the spool """
+
+        declarations = self.stored()
+        if self.spool is not None:
+            return arranged(declarations, self.spool.symbols({d.identifier for d in declarations}), self.written())
+        return (layout if ordered else baseline)(declarations, codes, self.written())
+
+    def sections(self, referenced: str, laid_out, count: int) -> (str, str):
+        """ what comes before and after the code of 'count' statements, 'referenced' names the pool constants
+            and routines it uses (the code itself will do) """
+
+        private = self.private()
+
+        def local(identifier: str) -> str:
+            return f".local {identifier}\n" if identifier in private else ''
+
+        profile = f"\n{local('__cmmm_profile')}.comm __cmmm_profile, {16 * max(count, 1)}, 16\n" \
+            if code_generation.instrument else ''
+        flag = f"\n{local(contraction.flag)}.comm {contraction.flag}, 1\n" if code_generation.fma else ''
+
+        if laid_out is not None:
+            storage, temporaries = f"\n{assembly(laid_out, private)}\n", ''
+        else:
+            declared, temporary = (
+                [f"{local(symbol.identifier)}{symbol!r}" for symbol in symbols] for symbols in (
+                    [declaration for declaration in self.symbols_table.declarations if declaration.linkage != 'extern'],
+                    self.symbols_table.temporary_variables
+                )
+            )
+            storage = f"\n.bss // declared variables\n" \
+                      f"\n{NEWLINE.join(declared)}\n"
+            temporaries = f"\n// temporary variables" \
+                          f"\n{NEWLINE.join(temporary)}\n"
+
+        externs = [declaration.identifier for declaration in self.symbols_table.declarations
+                   if declaration.linkage == 'extern']
+        externs = f"\n// defined by other units\n{NEWLINE.join(f'.extern {extern}' for extern in externs)}\n" \
+            if externs else ''
+        entry = f"_{code_generation.entry or 'example'}"
+
+        return f"{storage}" \
+               f"{externs}" \
+               f"{profile}" \
+               f"{flag}" \
+               f"\n.section .rodata // constants, deduplicated by bit pattern\n" \
+               f"\n.balign 16\n" \
+               f"{NEWLINE.join(constant_pool(referenced))}\n" \
                f"\n.text // assembly instructions\n" \
-               f"\n.globl _example\n" \
-               f"\n_example:\n" \
+               f"{NEWLINE + lines.file(code_generation.debug) if code_generation.debug else ''}" \
+               f"\n.globl {entry}\n" \
+               f"\n{entry}:\n" \
                f"\nxor %rax, %rax\n" \
-               f"\n{NEWLINE.join(statement.__repr__() for statement in self.statements)}\n" \
+               f"{NEWLINE + contraction.detection(entry) if code_generation.fma else ''}" \
+               f"\n", \
+               f"\n" \
                f"\nxor %rax, %rax /* exit code 0, no runtime errors */\n" \
                f"\nretq\n" \
-               f"\n// temporary variables" \
-               f"\n{NEWLINE.join(statement.__repr__() for statement in self.symbols_table.temporary_variables)}\n" \
+               f"{trigonometric_routines(referenced)}" \
+               f"{temporaries}" \
                f"\n.end" \
                f"\n"
+
+    def write(self, output) -> None:
+        """ the assembly into the file 'output', streamed code copied from the spool """
+
+        if self.spool is None:
+            output.write(repr(self))
+            return
+
+        self.spool.release()
+        before, after = self.sections(self.spool.referenced(), self.layout() if code_generation.layout else None,
+                                      self.spool.count)
+        output.write(before)
+        self.spool.copy(output)
+        output.write(after)
+
+    def __repr__(self):
+        if self.spool is not None:
+            output = io.StringIO()
+            self.write(output)
+            return output.getvalue()
+
+        codes = parallel.codes(self.statements, asdict(code_generation), code_generation.jobs)
+        if code_generation.propagation and not code_generation.instrument:  # no stores before the counters
+            codes = forwarding(codes)
+        if code_generation.instrument:
+            statements = NEWLINE.join(self.instrumented(counter, code) for counter, code in enumerate(codes))
+        else:
+            statements = NEWLINE.join(codes)
+
+        before, after = self.sections(statements, self.layout(codes) if code_generation.layout else None, len(codes))
+        return f"{before}{statements}{after}"
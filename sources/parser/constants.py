@@ -0,0 +1,59 @@
+# numeric constants: integral ones are immediates, fractional ones (and integral ones in fractional contexts)
+# live in a read-only pool, one entry per bit pattern, converted at compile time the way the code would at run time
+
+import math
+import re
+
+from struct import (pack, unpack)
+
+from .lowering import (integral_bits, signed)
+
+pool_types = {  # data type -> label letter, struct format, bytes, directive
+    'double': ('d', 'd', 8, '.quad'),
+    'float':  ('f', 'f', 4, '.long')
+}
+
+pool_label = re.compile(r'__nc([df])([0-9a-f]+)')
+
+
+def converted(value: int or float, data_type: str, target_type: str) -> int or float:
+    """ 'value' of 'data_type' as 'target_type': 'fistpl' rounding (half to even, 0x80000000 if out of range),
+        then wrapped into 16 bits for 'short'; float rounding to nearest even """
+
+    if target_type in integral_bits:
+        if data_type not in integral_bits:
+            value = round(value) if math.isfinite(value) and (-2 ** 31 <= round(value) < 2 ** 31) else -2 ** 31
+        return signed(int(value), integral_bits[target_type])
+    elif target_type == 'float':
+        try:
+            return unpack('<f', pack('<f', value))[0]
+        except OverflowError:
+            return math.copysign(math.inf, value)
+    return float(value)
+
+
+def bits(value: float, data_type: str) -> int:
+    _, form, size, _ = pool_types[data_type]
+    return int.from_bytes(pack(f"<{form}", value), 'little')
+
+
+def label(value: float, data_type: str) -> str:
+    letter, _, size, _ = pool_types[data_type]
+    return f"__nc{letter}{bits(value, data_type):0{2 * size}x}"
+
+
+def entry(value: float, data_type: str) -> str:
+    _, _, size, directive = pool_types[data_type]
+    return f"{label(value, data_type)}: {directive} {bits(value, data_type):#0{2 * size + 2}x} // {value!r}"
+
+
+def constant_pool(assembly: str) -> [str]:
+    """ entries of the pool constants 'assembly' refers to, doubles first so each one stays aligned """
+
+    entries = []
+    for data_type in ('double', 'float'):
+        letter, form, size, _ = pool_types[data_type]
+        for pattern in sorted({p for l, p in pool_label.findall(assembly) if l == letter}):
+            value = unpack(f"<{form}", int(pattern, 16).to_bytes(size, 'little'))[0]
+            entries.append(entry(value, data_type))
+    return entries
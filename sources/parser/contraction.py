@@ -0,0 +1,63 @@
+# fma contraction ('--fma'): a 'float' or 'double' multiplication feeding an addition or a subtraction (on either side,
+# negated or not: 'a * b + c', 'c - (a * b)', '-(a * b) - c'; binary operators group left to right without precedence,
+# 'c - a * b' is '(c - a) * b') is computed by one fused multiply-add, 'vfmadd', 'vfmsub', 'vfnmadd' or 'vfnmsub', on
+# sse registers, without the product's temporary and its round trip through memory. a fused multiply-add rounds once,
+# a * b + c exactly and then to the type of the operation, where the multiplication and the addition round twice (the
+# product to its type when stored to its temporary, then the sum), so results can differ in the last bit, like with c
+# compilers contracting ('-ffp-contract=fast'); where a rounded product would cancel with the addend
+# ((a * b) - (a * b)), the fused one keeps the rounding error of the other.
+#
+# fma is no part of x86-64, so every contraction is guarded: the entry point checks cpuid (fma, avx, osxsave) and
+# that the os saves the ymm state (xgetbv) on its first call and keeps the answer in '__cmmm_fma'; without fma the
+# unfused x87 code runs, the same as without '--fma'
+
+flag = '__cmmm_fma'  # 0 before the check, 1 without fma, 2 with it
+
+instructions = {  # (product negated, addend negated) -> 213 form, %xmm0 = %xmm1 * %xmm0 + the last operand
+    (False, False): 'vfmadd213',
+    (False, True): 'vfmsub213',
+    (True, False): 'vfnmadd213',
+    (True, True): 'vfnmsub213'
+}
+
+cpuid_bits = 1 << 12 | 1 << 27 | 1 << 28  # leaf 1, ecx: fma, osxsave, avx
+xcr0_bits = 1 << 1 | 1 << 2  # sse and avx state
+
+
+def detection(entry: str) -> str:
+    """ code of the entry point 'entry' finding out whether the cpu does fma, on the first call """
+
+    return f"// fma contraction, whether the cpu has fma (see 'parser/contraction.py')\n" \
+           f"cmpb $0, {flag}(%rip)\n" \
+           f"jne {entry}.fma_checked\n" \
+           f"pushq %rbx\n" \
+           f"movb $1, {flag}(%rip)\n" \
+           f"movl $1, %eax\n" \
+           f"cpuid\n" \
+           f"andl ${cpuid_bits:#x}, %ecx\n" \
+           f"cmpl ${cpuid_bits:#x}, %ecx\n" \
+           f"jne {entry}.fma_unsupported\n" \
+           f"xor %ecx, %ecx\n" \
+           f"xgetbv\n" \
+           f"andl ${xcr0_bits}, %eax\n" \
+           f"cmpl ${xcr0_bits}, %eax\n" \
+           f"jne {entry}.fma_unsupported\n" \
+           f"movb $2, {flag}(%rip)\n" \
+           f"{entry}.fma_unsupported:\n" \
+           f"popq %rbx\n" \
+           f"xor %rcx, %rcx\n" \
+           f"xor %rdx, %rdx\n" \
+           f"xor %rax, %rax\n" \
+           f"{entry}.fma_checked:\n"
+
+
+def guarded(label: str, fused: str, unfused: str) -> str:
+    """ 'fused' code if the cpu does fma, 'unfused' if not; 'label' names the two ways """
+
+    return f"cmpb $2, {flag}(%rip)\n" \
+           f"jne {label}.unfused\n" \
+           f"{fused}" \
+           f"jmp {label}.contracted\n" \
+           f"{label}.unfused:\n" \
+           f"{unfused}" \
+           f"{label}.contracted:\n"
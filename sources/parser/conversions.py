@@ -0,0 +1,35 @@
+# conversions between integral and fractional values (and between 'float' and 'double') with scalar sse2
+# instructions, in registers instead of a round trip through the stack and the FPU ('pushq', 'fild'/'fld',
+# 'fstp'/'fistp', 'popq'). the results are the same bits: both round to nearest even (the default control word and
+# mxcsr), both give the 'integer indefinite' 0x80000000 for NaN and out of range values. the legacy encoding is
+# right in both '--simd' modes, avx2 loops end with 'vzeroupper'
+
+suffixes = {'float': 'ss', 'double': 'sd'}
+
+register_conversions = {  # (from, to) -> %rax converted in place, through %xmm0
+    ('int', 'float'):     "cvtsi2ssl %eax, %xmm0\nmovd %xmm0, %eax\n",
+    ('int', 'double'):    "cvtsi2sdl %eax, %xmm0\nmovq %xmm0, %rax\n",
+    ('float', 'int'):     "movd %eax, %xmm0\ncvtss2si %xmm0, %eax\n",
+    ('float', 'double'):  "movd %eax, %xmm0\ncvtss2sd %xmm0, %xmm0\nmovq %xmm0, %rax\n",
+    ('double', 'int'):    "movq %rax, %xmm0\ncvtsd2si %xmm0, %eax\n",
+    ('double', 'float'):  "movq %rax, %xmm0\ncvtsd2ss %xmm0, %xmm0\nmovd %xmm0, %eax\n"
+}
+
+
+def in_register(data_type: str, target_type: str) -> str:
+    """ %rax holding a 'data_type' value converted to 'target_type' in place; 'short' values are converted from
+        all of %eax, like 'fildl' reads them, and to all of it (the store truncates) """
+
+    data_type, target_type = ('int' if kind == 'short' else kind for kind in (data_type, target_type))
+    return register_conversions.get((data_type, target_type), '')
+
+
+def from_memory(data_type: str, target_type: str, operand: str, register: str = '%xmm0') -> str:
+    """ integral 'data_type' 'operand' converted to fractional 'target_type' into 'register', 'short' ones
+        sign-extended through %eax, which is zeroed again """
+
+    if data_type == 'short':
+        return f"movswl {operand}, %eax\n" \
+               f"cvtsi2{suffixes[target_type]}l %eax, {register}\n" \
+               f"xor %rax, %rax\n"
+    return f"cvtsi2{suffixes[target_type]}l {operand}, {register}\n"
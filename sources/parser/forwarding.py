@@ -0,0 +1,41 @@
+# store-to-load forwarding between statements: every statement ends storing its value from %rax and zeroing %rax,
+# a statement starting by loading the same memory back gets the value from %rax instead (truncated and extended, as
+# the load would), which takes the load and its wait on the store off the start of the statement
+
+import re
+
+from .lines import leading
+
+stored = re.compile(r'mov([wlq]) %[re]?ax, (\S+\(%rip\))\n\nxor %rax, %rax\n$')
+reloads = {  # suffix -> loads from memory ('{}' for it) and what they did, done to the value still in %rax
+    'w': {"movw {}, %ax\n": "movzwl %ax, %eax\n", "movswl {}, %eax\n": "movswl %ax, %eax\n"},
+    'l': {"movl {}, %eax\n": "movl %eax, %eax\n"},
+    'q': {"movq {}, %rax\n": ''}
+}
+
+
+def forwarded(previous: str, code: str) -> (str, str):
+    """ 'previous' and 'code' of consecutive statements, the store ending the first one forwarded to a load of
+        the same memory starting the second one (after its '.loc', with line info) """
+
+    store = stored.search(previous)
+    if store is None:
+        return previous, code
+
+    located = leading.match(code)
+    loc = located.group() if located is not None else ''
+    suffix, memory = store.groups()
+    for load, reload in reloads[suffix].items():
+        load = loc + load.format(memory)
+        if code.startswith(load):
+            return previous[:-len("\nxor %rax, %rax\n")], f"{loc}\n{reload}{code[len(load):]}"
+    return previous, code
+
+
+def forwarding(codes: [str]) -> [str]:
+    """ 'forwarded' over every pair of consecutive statements """
+
+    codes = list(codes)
+    for i in range(1, len(codes)):
+        codes[i - 1], codes[i] = forwarded(codes[i - 1], codes[i])
+    return codes
@@ -0,0 +1,129 @@
+# intrinsic functions: what the parser, the passes over statements, code generation and the interpreters know about
+# each one, in one place. all of them take and return 'double' values, arguments are converted like the ones of
+# 'sin' and 'cos' always were.
+#
+# lowerings get the first argument in %st(0) and the second in %st(1) ('x87', the default and '--fast-math x87'),
+# or in %xmm0 and %xmm1 ('sse', '--fast-math sse'), and leave the result in %st(0) or %xmm0; %rax, %xmm1-%xmm4 and
+# the 8 bytes below %rsp may be clobbered. 'sin' and 'cos' have none but 'fsin'/'fcos', the fast-math modes call
+# the routines of 'parser/trigonometry.py' instead.
+#
+# pure intrinsics read nothing but their arguments: calls with equal arguments in a statement are computed once.
+# exact ones give the bits 'evaluate' does (NaN aside, whose sign the hardware picks), calls of constants are folded
+# at compile time; 'fsin' is off by a few ulps, so those are not
+
+import math
+
+from dataclasses import dataclass
+
+from .constants import label
+
+
+@dataclass(frozen=True)
+class Intrinsic:
+    """ ~ intrinsic function ~ """
+
+    name: str
+    arguments: int  # 'double' each
+    evaluate: callable  # reference semantics, of python floats
+    lowerings: dict  # 'x87' or 'sse' -> code
+    costs: dict  # 'x87' or 'sse' -> latency and reciprocal throughput of the lowering, as 'analysis' estimates them
+    pure: bool = True
+    exact: bool = True
+
+    def folded(self, values: [float]) -> float or None:
+        """ result of a call of constant 'values', None if it cannot be folded """
+
+        if not (self.pure and self.exact):
+            return None
+        result = self.evaluate(*values)
+        return None if math.isnan(result) else result
+
+
+def trigonometric(function):
+
+    def evaluate(value: float) -> float:
+        try:
+            return function(value)
+        except ValueError:  # infinities
+            return math.nan
+
+    return evaluate
+
+
+def floor(value: float) -> float:
+    if not math.isfinite(value):
+        return value
+    return math.copysign(float(math.floor(value)), value)  # -0.0 stays
+
+
+absolute_mask = "pcmpeqd %xmm2, %xmm2\n" \
+                "psrlq $1, %xmm2\n"  # 0x7fffffffffffffff, without a constant in memory
+
+
+def controlled(instruction: str, field: int, value: int) -> str:
+    """ x87 'instruction' with 'field' of the control word set to 'value', the control word saved below %rsp """
+
+    return f"fnstcw -8(%rsp)\n" \
+           f"movzwl -8(%rsp), %eax\n" \
+           f"andl ${0xffff & ~field:#06x}, %eax\n" \
+           f"orl ${value:#06x}, %eax\n" \
+           f"movw %ax, -6(%rsp)\n" \
+           f"fldcw -6(%rsp)\n" \
+           f"{instruction}\n" \
+           f"fldcw -8(%rsp)\n"
+
+
+precision_control, double_precision = 0x0300, 0x0200  # 'fsqrt' rounds once, to 53 bits, instead of to 64 first
+rounding_control, round_down = 0x0c00, 0x0400
+
+# sse2 (no 'roundsd' before sse4.1): |x| >= 2**52, infinities and NaN are integral already, anything else is
+# truncated through %rax, one less if that went up, and gets the sign of x back ('floor(-0.5)' is '-1.0',
+# 'floor(-0.0)' is '-0.0')
+sse_floor = f"movapd %xmm0, %xmm1\n" \
+            f"{absolute_mask}" \
+            f"andpd %xmm2, %xmm1\n" \
+            f"ucomisd {label(2.0 ** 52, 'double')}(%rip), %xmm1\n" \
+            f"jae 1f\n" \
+            f"jp 1f\n" \
+            f"cvttsd2si %xmm0, %rax\n" \
+            f"cvtsi2sdq %rax, %xmm1\n" \
+            f"movapd %xmm0, %xmm3\n" \
+            f"cmpltsd %xmm1, %xmm3\n" \
+            f"movsd {label(1.0, 'double')}(%rip), %xmm4\n" \
+            f"andpd %xmm4, %xmm3\n" \
+            f"subsd %xmm3, %xmm1\n" \
+            f"andnpd %xmm0, %xmm2\n" \
+            f"orpd %xmm2, %xmm1\n" \
+            f"movapd %xmm1, %xmm0\n" \
+            f"1:\n"
+
+intrinsics = {intrinsic.name: intrinsic for intrinsic in (
+    Intrinsic('sin', 1, trigonometric(math.sin), {'x87': "fsin\n"}, {'x87': (90, 90)}, exact=False),
+    Intrinsic('cos', 1, trigonometric(math.cos), {'x87': "fcos\n"}, {'x87': (90, 90)}, exact=False),
+    Intrinsic('sqrt', 1, lambda x: math.sqrt(x) if x >= 0 else math.nan, {  # correctly rounded
+        'x87': controlled('fsqrt', precision_control, double_precision),
+        'sse': "sqrtsd %xmm0, %xmm0\n"
+    }, {'x87': (56, 22), 'sse': (16, 6)}),
+    Intrinsic('fabs', 1, math.fabs, {
+        'x87': "fabs\n",
+        'sse': f"{absolute_mask}andpd %xmm2, %xmm0\n"
+    }, {'x87': (1, 1), 'sse': (3, 1.33)}),
+    # 'x < y ? x : y' and 'x > y ? x : y', like 'minsd'/'maxsd': y if either one is NaN, or if they are equal
+    Intrinsic('min', 2, lambda x, y: x if x < y else y, {
+        'x87': "fxch\nfucomi %st(1), %st\nfcmovnbe %st(1), %st\nfstp %st(1)\n",
+        'sse': "minsd %xmm1, %xmm0\n"
+    }, {'x87': (10, 4.5), 'sse': (4, 0.5)}),
+    Intrinsic('max', 2, lambda x, y: x if x > y else y, {
+        'x87': "fucomi %st(1), %st\nfcmovbe %st(1), %st\nfstp %st(1)\n",
+        'sse': "maxsd %xmm1, %xmm0\n"
+    }, {'x87': (10, 4), 'sse': (4, 0.5)}),
+    Intrinsic('floor', 1, floor, {
+        'x87': controlled('frndint', rounding_control, round_down),
+        'sse': sse_floor
+    }, {'x87': (54, 20), 'sse': (41, 8.4)}),
+)}
+
+
+def backend(fast_math: str) -> str:
+    """ lowerings used with '--fast-math' 'fast_math' """
+    return 'sse' if fast_math == 'sse' else 'x87'
@@ -0,0 +1,128 @@
+# layout of '.bss': every symbol (declared variables and arrays, temporaries) gets its natural alignment, arrays
+# 16, 32 or 64 bytes as they grow (packed loops need 16/32, from 64 bytes on they start a cache line). symbols no
+# statement stores to come first, so their lines are never dirtied, then the written ones; in both, symbols are
+# placed in the order statements first refer to them, those of one statement next to each other (largest
+# alignment first, which keeps the padding down)
+
+import re
+
+from dataclasses import *
+
+line_size = 64  # bytes of a cache line
+
+reference = re.compile(r'(?<![\w.$])_\w+')  # symbol names in generated code
+
+
+@dataclass
+class Placement:
+    """ ~ where a symbol is in '.bss' ~ """
+
+    identifier: str
+    offset: int
+    size: int
+    alignment: int
+    written: bool
+
+    def lines(self) -> range:
+        return range(self.offset // line_size, (self.offset + self.size - 1) // line_size + 1)
+
+
+@dataclass
+class Layout:
+    """ ~ '.bss' laid out, with the symbols every statement refers to ~ """
+
+    placements: [Placement]
+    accesses: [[str]]  # statement -> symbols its code refers to
+
+    size: int = 0
+    padding: int = 0
+
+    def __post_init__(self):
+        self.by_identifier = {placement.identifier: placement for placement in self.placements}
+
+    def lines_touched(self) -> [int]:
+        """ cache lines the symbols of every statement span (arrays as a whole) """
+        return [len({line for identifier in symbols for line in self.by_identifier[identifier].lines()})
+                for symbols in self.accesses]
+
+
+def accesses(codes: [str], identifiers: {str}) -> [[str]]:
+    """ symbols of 'identifiers' the code of every statement refers to, in order of first reference """
+    return [list(dict.fromkeys(name for name in reference.findall(code) if name in identifiers)) for code in codes]
+
+
+def placed(declarations: list, order: [str], written: {str}, symbols: [[str]]) -> Layout:
+    """ 'declarations' (anything with 'identifier', 'bytes()' and 'alignment()') packed in 'order' """
+
+    by_identifier = {declaration.identifier: declaration for declaration in declarations}
+
+    placements, offset, padding = [], 0, 0
+    for identifier in order:
+        declaration = by_identifier[identifier]
+        aligned = -(-offset // declaration.alignment()) * declaration.alignment()
+        padding += aligned - offset
+        placements.append(Placement(identifier, aligned, declaration.bytes(), declaration.alignment(),
+                                    identifier in written))
+        offset = aligned + declaration.bytes()
+
+    return Layout(placements, symbols, offset, padding)
+
+
+def layout(declarations: list, codes: [str], written: {str}) -> Layout:
+    """ 'declarations' laid out for the statements whose code is 'codes', 'written' are stored to """
+    return arranged(declarations, accesses(codes, {declaration.identifier for declaration in declarations}), written)
+
+
+def arranged(declarations: list, symbols: [[str]], written: {str}) -> Layout:
+    """ 'declarations' laid out for statements referring to 'symbols' (only the ones every statement refers to
+        first are needed, streamed code keeps no more) """
+
+    by_identifier = {declaration.identifier: declaration for declaration in declarations}
+
+    order = {False: [], True: []}  # written -> identifiers
+    seen = set()
+    for group in symbols + [list(by_identifier)]:  # unreferenced ones last
+        group = sorted((identifier for identifier in group if identifier not in seen),
+                       key=lambda identifier: -by_identifier[identifier].alignment())
+        seen.update(group)
+        for identifier in group:
+            order[identifier in written].append(identifier)
+
+    return placed(declarations, order[False] + order[True], written, symbols)
+
+
+def baseline(declarations: list, codes: [str], written: {str}) -> Layout:
+    """ symbol table order, what the '.comm' directives ask for """
+    return placed(declarations, [d.identifier for d in declarations], written,
+                  accesses(codes, {d.identifier for d in declarations}))
+
+
+def assembly(laid_out: Layout, private: {str} = frozenset()) -> str:
+    """ '.bss' section with every symbol at its place, global unless 'private' """
+
+    lines = [f".bss // {len(laid_out.placements)} symbols, {laid_out.size} bytes "
+             f"({laid_out.padding} of padding), see 'parser/layout.py'",
+             f".balign {line_size}"]
+    for i, placement in enumerate(laid_out.placements):
+        if (i == 0) or (placement.written != laid_out.placements[i - 1].written):
+            lines.append(f"// {'stored to' if placement.written else 'only read'} by the program")
+        visibility = '' if placement.identifier in private else f".globl {placement.identifier}\n"
+        lines.append(f"{visibility}"
+                     f".balign {placement.alignment}\n"
+                     f"{placement.identifier}: .zero {placement.size}")
+    return '\n'.join(lines)
+
+
+def report(laid_out: Layout, unordered: Layout) -> str:
+    """ padding and cache lines touched by the statements, against the symbol table order """
+
+    lines = [f"{'':>14} {'bytes':>7} {'padding':>7} {'lines':>6} {'touched':>8}",
+             f"{'laid out':>14} {laid_out.size:>7} {laid_out.padding:>7} "
+             f"{-(-laid_out.size // line_size):>6} {sum(laid_out.lines_touched()):>8}",
+             f"{'table order':>14} {unordered.size:>7} {unordered.padding:>7} "
+             f"{-(-unordered.size // line_size):>6} {sum(unordered.lines_touched()):>8}",
+             '',
+             f"{'offset':>7} {'size':>6} {'align':>5}  symbol"]
+    lines += [f"{placement.offset:>7} {placement.size:>6} {placement.alignment:>5}  {placement.identifier}"
+              f"{'' if placement.written else '  (only read)'}" for placement in laid_out.placements]
+    return '\n'.join(lines)
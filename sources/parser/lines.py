@@ -0,0 +1,69 @@
+# line info of the generated code ('main.py -g'): '.file' names the source, and the code of every statement and of
+# every operation in it starts with a '.loc' of its line and column (where the statement starts, the operator, the
+# function name), which the assembler turns into a dwarf line table, so 'perf annotate' and 'objdump -dl' show the
+# part of the source an instruction is of. the code of an operation holds the code of the operations it takes as
+# operands, so the '.loc' of the enclosing one comes again after each of those; loads of variables and constants
+# belong to the operation reading them. without '-g' nothing changes, with it only '.file' and '.loc' lines are added
+
+import re
+
+from bisect import bisect_right
+from functools import wraps
+
+NEWLINE = '\n'
+
+
+class Lines:
+    """ ~ where every line of a source starts ~ """
+
+    def __init__(self, code: str):
+        self.starts = [0] + [match.end() for match in re.finditer(NEWLINE, code)]
+
+    def loc(self, offset: int) -> str:
+        """ '.loc' of the character at 'offset', lines and columns from 1 """
+
+        line = bisect_right(self.starts, offset)
+        return f".loc 1 {line} {offset - self.starts[line - 1] + 1}\n"
+
+
+source = None  # lines of the source compiled with line info, None without
+enclosing = []  # '.loc' of the statement and of the operations whose code is being generated
+
+leading = re.compile(r'^(?:\.loc [^\n]*\n)+')  # of a statement's code, for 'parser/forwarding.py'
+redundant = re.compile(r'^\.loc [^\n]*\n(?=\n*\.loc )', re.MULTILINE)  # no instruction before the next one
+
+
+def configure(code: str or None) -> None:
+    global source
+    source = None if code is None else Lines(code)
+
+
+def located(position=lambda node: node.position):
+    """ '__repr__' of nodes whose code starts with the '.loc' of their 'position' (line and offset) """
+
+    def decorator(generate):
+        @wraps(generate)
+        def generated(node) -> str:
+            if source is None:
+                return generate(node)
+
+            enclosing.append(source.loc(position(node)[1]))
+            try:
+                code = generate(node)
+            finally:
+                loc = enclosing.pop()
+            if not code:  # computed by another node (fused calls)
+                return code
+            code = f"{loc}{code}"
+            if enclosing:  # back to the enclosing one, for what it does after this
+                code += f"{'' if code.endswith(NEWLINE) else NEWLINE}{enclosing[-1]}"
+            return code if enclosing else redundant.sub('', code)
+        return generated
+    return decorator
+
+
+def file(name: str) -> str:
+    """ '.file' of the source 'name' for the '.loc' lines """
+
+    escaped = name.replace('\\', '\\\\').replace('"', '\\"')
+    return f'.file 1 "{escaped}"\n'
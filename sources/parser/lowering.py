@@ -0,0 +1,117 @@
+# lowering of integral multiplication and division by constants (strength reduction)
+#
+# every sequence takes its operand in %eax (for 'short' only %ax is meaningful), leaves the result there
+# and may clobber %edx. everything is computed in 32-bit registers, because low bits of the product
+# don't depend on high bits of the operands, and 16-bit dividends are sign-extended first. a 'short'
+# operand of an 'int' operation loaded into just %ax ('--narrow-shorts') is sign-extended by 'widened'
+# first, the sequences for 'int' read all of %eax.
+
+integral_bits = {'short': 16, 'int': 32}
+
+
+def signed(value: int, bits: int) -> int:
+    return ((value + (1 << (bits - 1))) & ((1 << bits) - 1)) - (1 << (bits - 1))
+
+
+def power_of_two(value: int) -> int or None:
+    return value.bit_length() - 1 if (value > 0) and not (value & (value - 1)) else None
+
+
+def widened(operand_type: str, data_type: str) -> str:
+    """ sign extension of an 'operand_type' operand in %ax to all of %eax for a 'data_type' sequence """
+    return "movswl %ax, %eax\n" if (operand_type == 'short') and (data_type != 'short') else ''
+
+
+def division_magic(divisor: int, bits: int) -> (int, int):
+    """ multiplier (unsigned, < 2**bits) and shift for signed division by 2 <= 'divisor' < 2**(bits-1),
+        see Hacker's Delight, 10-4: quotient = (n * multiplier) >> (bits + shift), plus 1 if negative """
+
+    two = 1 << (bits - 1)
+    anc = two - 1 - two % divisor
+    p = bits - 1
+    q1, r1 = divmod(two, anc)
+    q2, r2 = divmod(two, divisor)
+    while True:
+        p += 1
+        q1, r1 = 2 * q1, 2 * r1
+        if r1 >= anc:
+            q1, r1 = q1 + 1, r1 - anc
+        q2, r2 = 2 * q2, 2 * r2
+        if r2 >= divisor:
+            q2, r2 = q2 + 1, r2 - divisor
+        delta = divisor - r2
+        if not ((q1 < delta) or (q1 == delta and r1 == 0)):
+            break
+    return q2 + 1, p - bits
+
+
+def multiplication(data_type: str, constant: int) -> str:
+    """ %eax *= 'constant' """
+
+    constant = signed(constant, integral_bits[data_type])
+    magnitude = abs(constant)
+    negation = "negl %eax\n" if constant < 0 else ""
+
+    if magnitude == 0:
+        return "xorl %eax, %eax\n"
+    elif magnitude == 1:
+        return negation
+    elif power_of_two(magnitude) is not None:
+        return f"shll ${power_of_two(magnitude)}, %eax\n" + negation
+
+    for factor in (3, 5, 9):
+        if (magnitude % factor == 0) and (power_of_two(magnitude // factor) is not None):
+            shift = power_of_two(magnitude // factor)
+            return f"leal (%rax, %rax, {factor - 1}), %eax\n" + \
+                   (f"shll ${shift}, %eax\n" if shift else "") + negation
+
+    if power_of_two(magnitude - 1) is not None:
+        return f"movl %eax, %edx\n" \
+               f"shll ${power_of_two(magnitude - 1)}, %eax\n" \
+               f"addl %edx, %eax\n" + negation
+    elif power_of_two(magnitude + 1) is not None:
+        return f"movl %eax, %edx\n" \
+               f"shll ${power_of_two(magnitude + 1)}, %eax\n" \
+               f"subl %edx, %eax\n" + negation
+
+    return f"imull ${constant}, %eax, %eax\n"
+
+
+def division(data_type: str, constant: int) -> str or None:
+    """ %eax /= 'constant', truncating toward zero; None if 'idiv' has to stay (it traps on zero) """
+
+    bits = integral_bits[data_type]
+    constant = signed(constant, bits)
+    magnitude = abs(constant)
+
+    if magnitude in (0, 1 << (bits - 1)) or constant == -1:  # traps, overflows or is rare enough
+        return None
+
+    code = "movswl %ax, %eax\n" if bits == 16 else ""
+    negation = "negl %eax\n" if constant < 0 else ""
+
+    if magnitude == 1:
+        return code
+    elif power_of_two(magnitude) is not None:
+        shift = power_of_two(magnitude)
+        # negative dividends are biased by 'magnitude - 1', so the shift rounds toward zero
+        return code + \
+            f"movl %eax, %edx\n" \
+            f"sarl $31, %edx\n" \
+            f"shrl ${32 - shift}, %edx\n" \
+            f"addl %edx, %eax\n" \
+            f"sarl ${shift}, %eax\n" + negation
+
+    multiplier, shift = division_magic(magnitude, bits)
+    if bits == 16:  # the product fits into 32 bits
+        code += f"imull ${multiplier}, %eax, %eax\n" \
+                f"sarl ${16 + shift}, %eax\n"
+    else:
+        code += f"movslq %eax, %rax\n" \
+                f"movl ${multiplier}, %edx\n" \
+                f"imulq %rdx, %rax\n" \
+                f"sarq ${32 + shift}, %rax\n"
+    return code + \
+        f"movl %eax, %edx\n" \
+        f"shrl $31, %edx\n" \
+        f"addl %edx, %eax\n" + negation
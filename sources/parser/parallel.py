@@ -0,0 +1,74 @@
+# code of statements generated by worker processes: the code of a statement depends only on its subtree (temporaries
+# and constants are resolved while parsing) and on the code generation options, so the statement list is cut into
+# contiguous chunks, every chunk is pickled without source positions and sent to a process pool as soon as it is, and
+# the codes are joined back in statement order, exactly what the serial path produces. pickling a statement costs
+# about as much as generating its code, so this pays off with several cpus only
+
+import copyreg
+import gc
+import io
+import math
+import os
+import pickle
+
+from concurrent.futures import ProcessPoolExecutor
+
+from . import lines
+
+chunks_per_job = 4  # smaller chunks even out statements of different sizes
+minimum_chunk = 64  # statements, smaller chunks aren't worth a round trip to a worker
+
+
+def reduced(node) -> tuple:
+    """ 'node' rebuilt from its attributes by the unpickler itself (no python call per node), less its position """
+    return copyreg.__newobj__, (type(node),), {name: value for name, value in vars(node).items() if name != 'position'}
+
+
+def compact(statements: list) -> bytes:
+    """ 'statements' pickled for a worker, nodes shared in the tree (whole-array loops refer to their expression)
+        stay shared; with line info ('parser/lines.py') positions are pickled too """
+
+    from . import classes  # not at the top, 'classes' imports this module
+
+    data = io.BytesIO()
+    pickler = pickle.Pickler(data, pickle.HIGHEST_PROTOCOL)
+    if lines.source is None:
+        pickler.dispatch_table = {kind: reduced for kind in vars(classes).values()
+                                  if isinstance(kind, type) and kind.__module__ == classes.__name__}
+    pickler.dump(statements)
+    return data.getvalue()
+
+
+def generate(options: dict, source: lines.Lines or None, chunk: bytes) -> [str]:
+    """ (in a worker) code of every statement of 'chunk', with the line info of 'source' """
+
+    from .classes import code_generation
+
+    code_generation.configure(**{**options, 'jobs': 1})
+    lines.source = source
+
+    gc.disable()  # the trees hold no cycles, collections while unpickling thousands of nodes would only cost time
+    try:
+        statements = pickle.loads(chunk)
+    finally:
+        gc.enable()
+    return [repr(statement) for statement in statements]
+
+
+def chunked(statements: list, jobs: int) -> [list]:
+    size = max(math.ceil(len(statements) / (jobs * chunks_per_job)), minimum_chunk)
+    return [statements[start:start + size] for start in range(0, len(statements), size)]
+
+
+def codes(statements: list, options: dict, jobs: int) -> [str]:
+    """ code of every statement, generated by 'jobs' processes (0 for one per cpu), serially if there is a chunk
+        or less """
+
+    jobs = jobs or os.cpu_count()
+    chunks = chunked(statements, jobs)
+    if (jobs <= 1) or (len(chunks) <= 1):
+        return [repr(statement) for statement in statements]
+
+    with ProcessPoolExecutor(max_workers=min(jobs, len(chunks))) as pool:
+        futures = [pool.submit(generate, options, lines.source, compact(chunk)) for chunk in chunks]
+        return [code for future in futures for code in future.result()]
@@ -2,6 +2,9 @@ from ply import yacc
 
 from lexer import *
 from .classes import *
+from .streaming import Spool
+from .propagation import Propagation
+from .planning import planned
 
 precedence = (
     ('left', 'ADD', 'SUB'),
@@ -13,11 +16,32 @@ precedence = (
 # start = "statements"
 
 
+def span(p, n: int) -> Span:
+    """ span of the token 'p[n]' """
+    return Span(p.lineno(n), p.lexpos(n), p.lexpos(n) + len(str(p[n])))
+
+
+def kept(statements: list, statement) -> list:
+    """ 'statements' and 'statement' (if any, with copies and constants propagated into it and its conversions
+        planned), which only goes to the spool when streaming """
+
+    if statement and code_generation.propagation:
+        statement = parser.propagation.statement(statement)
+    if statement and code_generation.conversion_planning:
+        statement = planned(statement, parser.symbols_table)
+
+    if statement and (parser.spool is not None):
+        parser.spool.add(statement) if not parser.diagnostics.errors else None  # no code if it won't be written
+    elif statement:
+        statements.append(statement)
+    return statements
+
+
 def p_program(p):
     """ program : statements """
 
-    if not parser.errors:
-        p[0] = ProgramStatements(p[1], parser.symbols_table)  # parsed program!
+    if not parser.diagnostics.errors:
+        p[0] = ProgramStatements(p[1], parser.symbols_table, parser.spool)  # parsed program!
 
 
 def p_statements_rec(p):
@@ -25,7 +49,7 @@ def p_statements_rec(p):
                    | statements declaration_statement
                    | statements assignment_statement """
 
-    p[1].append(p[2]) if p[2] else p[1]; p[0] = p[1]
+    p[0] = kept(p[1], p[2])
 
 
 def p_statements_end(p):
@@ -33,46 +57,42 @@ def p_statements_end(p):
                    | declaration_statement
                    | assignment_statement """
 
-    p[0] = ([p[1]] if p[1] else [])
+    p[0] = kept([], p[1])
 
 
 def p_statements_rec_error(p):
     """ statements : statements error ';' """
 
-    print(
-        colorize('blue', f"info: invalid statement, at "
-                         f"{p.lineno(2)}:{p.lexpos(2) - p.lexer.lexdata.rfind(NEWLINE, 0, p.lexpos(2))}"
-                 )
-    ); parser.errok()
+    parser.diagnostics.info("invalid statement", Span(p.lineno(2), p.lexpos(2))); parser.errok()
+    p[0] = p[1]  # the statements so far, for the ones after it
 
 
 def p_statements_end_error(p):
     """ statements : error ';' """
 
-    print(
-        colorize('blue', f"info: invalid statement, at "
-                         f"{p.lineno(1)}:{p.lexpos(1) - p.lexer.lexdata.rfind(NEWLINE, 0, p.lexpos(1))}"
-                 )
-    ); parser.errok()
+    parser.diagnostics.info("invalid statement", Span(p.lineno(1), p.lexpos(1))); parser.errok()
+    p[0] = []
 
 
 def p_assignment_statement(p):
     """ assignment_statement : variable_usage '=' arithmetic_expression ';'
-                             | array_usage '=' arithmetic_expression ';' """
+                             | array_usage '=' arithmetic_expression ';'
+                             | whole_array_usage '=' arithmetic_expression ';' """
 
-    p[0] = AssignmentStatement(p[1], p[3], (p.lineno(2), p.lexpos(2)), p)
+    try:
+        p[0] = AssignmentStatement(p[1], p[3], (p.lineno(2), p.lexpos(2)), p)
+    except (TypeError, ValueError) as e:  # shapes or types of whole arrays
+        parser.diagnostics.error(e.args[0], Span(p.lineno(2), p.lexpos(2)), ('hint', "in assignment statement"))
 
 
 def p_assignment_statement_error(p):
     """ assignment_statement : error '=' arithmetic_expression ';'
                              | variable_usage '=' error ';'
                              | array_usage '=' error ';'
+                             | whole_array_usage '=' error ';'
                              | error '=' error ';' """
 
-    print(
-        colorize('blue', "info: invalid assignment statement."
-                 )
-    )
+    parser.diagnostics.info("invalid assignment statement")
     parser.errok()
 
 
@@ -86,8 +106,13 @@ def p_arithmetic_expression_rec_una(p):
     """ arithmetic_expression : '-' arithmetic_expression %prec MINUS
                               | '+' arithmetic_expression %prec PLUS """
 
-    p[0] = Unary.operation[p[1]](p[2], (p.lineno(1), p.lexpos(1))).\
-        create_temp_var(parser.symbols_table)
+    try:
+        p[0] = Unary.operation[p[1]](p[2], (p.lineno(1), p.lexpos(1)))
+        if p[0].create_temp_var:  # not of '+' usages and constants, which are the operand itself
+            p[0] = p[0].create_temp_var(parser.symbols_table)
+    except ValueError as e:  # out of vector registers
+        parser.diagnostics.error(e.args[0], span(p, 1))
+        raise SyntaxError
 
 
 def p_arithmetic_expression_rec_bin(p):
@@ -96,43 +121,53 @@ def p_arithmetic_expression_rec_bin(p):
                               | arithmetic_expression '*' arithmetic_expression %prec MUL
                               | arithmetic_expression '/' arithmetic_expression %prec DIV """
 
-    p[0] = Binary.operation[p[2]](p[1], p[3], (p.lineno(2), p.lexpos(2))).\
-        create_temp_var(parser.symbols_table)
+    try:
+        p[0] = Binary.operation[p[2]](p[1], p[3], (p.lineno(2), p.lexpos(2))).\
+            create_temp_var(parser.symbols_table)
+    except (TypeError, ValueError) as e:  # shapes or types of whole arrays
+        parser.diagnostics.error(e.args[0], span(p, 2))
+        raise SyntaxError
 
 
 def p_arithmetic_expression_end(p):
     """ arithmetic_expression : numeric_constant
                               | function_call
                               | variable_usage
-                              | array_usage """
+                              | array_usage
+                              | whole_array_usage """
 
     p[0] = p[1]
 
 
 def p_function_call(p):
-    """ function_call : function_name '(' arithmetic_expression ')' """
+    """ function_call : function_name '(' function_arguments ')' """
 
+    call = Reduction if (p[1] in reduction_functions) and ((p[1] not in intrinsics) or (len(p[3]) == 1)) \
+        else FunctionCall
     try:
-        p[0] = FunctionCall(p[1], p[3], (p.lineno(1), p.lexpos(1)), p).\
+        p[0] = call(p[1], p[3], (p.lineno(1), p.lexpos(1)), p).\
             create_temp_var(parser.symbols_table)
-    except NameError:
-        parser.errors = True
+    except NameError:  # reported by 'p_function_name'
+        raise SyntaxError
+    except (TypeError, ValueError) as e:  # whole arrays where they do not fit
+        parser.diagnostics.error(e.args[0], span(p, 1))
         raise SyntaxError
 
 
+def p_function_arguments(p):
+    """ function_arguments : arithmetic_expression
+                           | function_arguments ',' arithmetic_expression """
+
+    p[0] = [p[1]] if len(p) == 2 else p[1] + [p[3]]
+
+
 def p_function_name(p):
     """ function_name : IDENTIFIER_TOKEN """
 
-    if p[1] not in trigonometric_functions.keys():
-        print(
-            colorize('red', f"\n"
-                            f"error: using unknown function '{p[1]}', at "
-                            f"{p.lineno(1)}:{p.lexpos(1) - p.lexer.lexdata.rfind(NEWLINE, 0, p.lexpos(1))}\n" +
-                     colorize('crimson', f"{p.lexer.lexdata.split(NEWLINE)[p.lineno(1) - 1]}\n"
-                              f"{' ' * (p.lexpos(1) - p.lexer.lexdata.rfind(NEWLINE, 0, p.lexpos(1)) - 1) + '^'}")
-                     )
-        )
-        parser.errors = True
+    known = [*intrinsics.keys(), *(name for name in reduction_functions.keys() if name not in intrinsics)]
+    if p[1] not in known:
+        parser.diagnostics.error(f"using unknown function '{p[1]}'", span(p, 1),
+                                 ('hint', f"known functions: {', '.join(known)}"))
     else:
         p[0] = p[1]
 
@@ -140,27 +175,21 @@ def p_function_name(p):
 def p_variable_usage(p):
     """ variable_usage : IDENTIFIER_TOKEN """
 
+    name, where = p[1], span(p, 1)
     p[1] = f"_{p[1]}"
     variable = parser.symbols_table.has_declaration(p[1], VariableDeclaration)
 
     if variable:
         p[0] = VariableUsage(p[1], variable.data_type, (p.lineno(1), p.lexpos(1)))
     else:
-        print(
-            colorize('red', f"\n"
-                            f"error: usage of undeclared variable '{p[1]}', at "
-                            f"{p.lineno(1)}:{p.lexpos(1) - p.lexer.lexdata.rfind(NEWLINE, 0, p.lexpos(1))}\n"
-                            f"{p.lexer.lexdata.split(NEWLINE)[p.lineno(1) - 1]}\n"
-                            f"{' ' * (p.lexpos(1) - p.lexer.lexdata.rfind(NEWLINE, 0, p.lexpos(1)) - 1) + '^'}"
-                     )
-        )
-        parser.errors = True
+        parser.diagnostics.error(f"usage of undeclared variable '{name}'", where)
         raise SyntaxError
 
 
 def p_array_usage(p):
     """ array_usage : IDENTIFIER_TOKEN '[' arithmetic_expression ']' """
 
+    name, where = p[1], span(p, 1)
     p[1] = f"_{p[1]}"
     array = parser.symbols_table.has_declaration(p[1], ArrayDeclaration)
 
@@ -168,35 +197,32 @@ def p_array_usage(p):
         try:
             p[0] = ArrayUsage(p[1], array.data_type, array.size, p[3], (p.lineno(1), p.lexpos(1)))
         except IndexError as e:
-            print(
-                colorize('red', f"\n"
-                                f"error: {e.args[0]}, at "
-                                f"{p.lineno(1)}:{p.lexpos(1) - p.lexer.lexdata.rfind(NEWLINE, 0, p.lexpos(1))}")
-                + NEWLINE +
-                colorize('blue', f"info: array '{p[1]}' must be indexed by valid positive integral value!")
-            )
-            parser.errors = True
+            parser.diagnostics.error(e.args[0], where,
+                                     ('info', f"array '{name}' must be indexed by valid positive integral value!"))
             raise SyntaxError
         except TypeError as e:
-            print(
-                colorize('red', f"\n"
-                                f"error: {e.args[0]}, at "
-                                f"{p.lineno(1)}:{p.lexpos(1) - p.lexer.lexdata.rfind(NEWLINE, 0, p.lexpos(1))}")
-                + NEWLINE +
-                colorize('blue', f"info: array '{p[1]}' must be indexed by valid integral value or variable!")
-            )
-            parser.errors = True
+            parser.diagnostics.error(e.args[0], where,
+                                     ('info', f"array '{name}' must be indexed by valid integral value or variable!"))
             raise SyntaxError
     else:
-        print(
-            colorize('red', f"\n"
-                            f"error: usage of undeclared array '{p[1]}', at "
-                            f"{p.lineno(1)}:{p.lexpos(1) - p.lexer.lexdata.rfind(NEWLINE, 0, p.lexpos(1))}\n"
-                            f"{p.lexer.lexdata.split(NEWLINE)[p.lineno(1) - 1]}\n"
-                            f"{' ' * (p.lexpos(1) - p.lexer.lexdata.rfind(NEWLINE, 0, p.lexpos(1)) - 1) + '^'}"
-                     )
-        )
-        parser.errors = True
+        parser.diagnostics.error(f"usage of undeclared array '{name}'", where)
+        raise SyntaxError
+
+
+def p_whole_array_usage(p):
+    """ whole_array_usage : IDENTIFIER_TOKEN '[' ']' """
+
+    name, where = p[1], span(p, 1)
+    array = parser.symbols_table.has_declaration(f"_{p[1]}", ArrayDeclaration)
+
+    if array:
+        try:
+            p[0] = WholeArrayUsage(array.identifier, array.data_type, array.size, (p.lineno(1), p.lexpos(1)))
+        except TypeError as e:
+            parser.diagnostics.error(e.args[0], where, ('info', f"array '{name}' is {array.data_type}"))
+            raise SyntaxError
+    else:
+        parser.diagnostics.error(f"usage of undeclared array '{name}'", where)
         raise SyntaxError
 
 
@@ -213,39 +239,34 @@ def p_numeric_decimal_constant(p):
 
 
 def p_declaration_statement(p):
-    """ declaration_statement : declaration_type declaration_list ';' """
+    """ declaration_statement : declaration_type declaration_list ';'
+                              | linkage declaration_type declaration_list ';' """
 
-    for symbol in DeclarationStatement(p[2], p[1]):
+    linkage, data_type, declaration_list = (None, p[1], p[2]) if len(p) == 4 else (p[1], p[2], p[3])
+    for symbol in DeclarationStatement(declaration_list, data_type, linkage=linkage):
         try:
             parser.symbols_table.add_declaration(symbol) if symbol else None
         except LookupError as e:
-            print(
-                colorize('red', f"\n"
-                                f"error: symbol '{e.args[0].identifier}' {e.args[1]}") +
-                colorize('red', NEWLINE +
-                         f"{p.lexer.lexdata.split(NEWLINE)[e.args[3].position[0] - 1]}\n"
-                         f"{' '*(e.args[3].position[1]-p.lexer.lexdata.rfind(NEWLINE,0,e.args[3].position[1])-1)+'^'}")
-                + NEWLINE +
-                colorize('blue',
-                         f"info: '{e.args[2].identifier}' was defined at "
-                         f"{e.args[2].position[0]}:"
-                         f"{e.args[2].position[1] - p.lexer.lexdata.rfind(NEWLINE, 0, e.args[2].position[1])}\n"
-
-                         )
-            )
-            parser.errors = True
+            parser.diagnostics.error(f"symbol '{e.args[0].identifier[1:]}' {e.args[1]}",
+                                     Span(*e.args[3].position, e.args[3].position[1] + len(e.args[3].identifier) - 1),
+                                     ('info', f"'{e.args[2].identifier[1:]}' was defined", Span(*e.args[2].position)))
 
 
 def p_declaration_statement_error(p):
-    """ declaration_statement : declaration_type error ';' """
+    """ declaration_statement : declaration_type error ';'
+                              | linkage declaration_type error ';' """
 
-    print(
-        colorize('blue', "info: invalid declaration statement."
-                 )
-    )
+    parser.diagnostics.info("invalid declaration statement")
     parser.errok()
 
 
+def p_linkage(p):
+    """ linkage : EXTERN_KEYWORD
+                | EXPORT_KEYWORD """
+
+    p[0] = p[1]  # 'extern' or 'export'
+
+
 def p_declaration_type(p):
     """ declaration_type : FLOAT_TYPE
                          | DOUBLE_TYPE
@@ -271,14 +292,8 @@ def p_declaration_list_array_declaration_rec(p):
             ArrayDeclaration(identifier=p[3], size=p[5], position=(p.lineno(3), p.lexpos(3)))
         ); p[0] = p[1]
     except AssertionError as e:
-        print(
-            colorize('red', f"\n"
-                            f"error: {e.args[1]}")
-            + NEWLINE +
-            colorize('blue', f"info: array '{e.args[0]}' declared with size of {e.args[2]}, at "
-                             f"{e.args[3][0]}:{e.args[3][1] - p.lexer.lexdata.rfind(NEWLINE, 0, e.args[3][1])}")
-        )
-        parser.errors = True
+        parser.diagnostics.error(e.args[1], Span(*e.args[3], e.args[3][1] + len(e.args[0])),
+                                 ('info', f"array '{e.args[0]}' declared with size of {e.args[2]}"))
         p[0] = p[1]
 
 
@@ -298,14 +313,8 @@ def p_declaration_list_array_declaration_end(p):
             ArrayDeclaration(identifier=p[1], size=p[3], position=(p.lineno(1), p.lexpos(1)))
         ]
     except AssertionError as e:
-        print(
-            colorize('red', f"\n"
-                            f"error: {e.args[1]}")
-            + NEWLINE +
-            colorize('blue', f"info: array '{e.args[0]}' declared with size of {e.args[2]}, at "
-                             f"{e.args[3][0]}:{e.args[3][1] - p.lexer.lexdata.rfind(NEWLINE, 0, e.args[3][1])}")
-        )
-        parser.errors = True
+        parser.diagnostics.error(e.args[1], Span(*e.args[3], e.args[3][1] + len(e.args[0])),
+                                 ('info', f"array '{e.args[0]}' declared with size of {e.args[2]}"))
         p[0] = []
 
 
@@ -313,11 +322,7 @@ def p_empty_statement(p):
     """ empty_statement : epsilon ';' """
     # do nothing
 
-    print(
-        colorize('yellow', f"\n"
-                           f"warning: empty statement, at "
-                           f"{p.lineno(1)}:{p.lexpos(1) - p.lexer.lexdata.rfind(NEWLINE, 0, p.lexpos(1))}")
-    )
+    parser.diagnostics.warning("empty statement", Span(p.lineno(2), p.lexpos(2)))
 
 
 def p_epsilon(p):
@@ -327,28 +332,11 @@ def p_epsilon(p):
 
 def p_error(p):
     if p:
-        print(
-            colorize('red', NEWLINE +
-                     f"error: unexpected token: '{p.value}', at "
-                     f"{p.lineno}:{p.lexpos - p.lexer.lexdata.rfind(NEWLINE, 0, p.lexpos)}, here:"),
-            colorize('crimson', NEWLINE +
-                     f"{p.lexer.lexdata.split(NEWLINE)[p.lineno-1]}\n"
-                     f"{' '*(p.lexpos-p.lexer.lexdata.rfind(NEWLINE, 0, p.lexpos)-1) + '^'}")
-            + NEWLINE +
-            colorize('violet',
-                     f"hint: expected tokens: "
-                     f"{', '.join(t for t in set(map(get_token_type, parser.action[parser.state].keys())) if t)}")
-        )
-        parser.errors = True
-    else:
-        print(
-            colorize('red', "\n"
-                            "error: unexpected EOF!")
-            + NEWLINE +
-            colorize('blue', "info: missed semicolon?")
-        )
-        parser.errors = True
-        exit(1)
+        parser.diagnostics.error(f"unexpected token: '{p.value}'",
+                                 Span(p.lineno, p.lexpos, p.lexpos + len(str(p.value))),
+                                 ('hint', f"expected tokens: {', '.join(expected_tokens.get(parser.state, ()))}"))
+    else:  # the parser gives up at the end of input
+        parser.diagnostics.error("unexpected EOF!", None, ('info', "missed semicolon?"))
 
 
 parser = yacc.yacc(
@@ -360,6 +348,15 @@ parser = yacc.yacc(
     tabmodule="parsetab"
 )
 
+expected_tokens = {  # parser state -> kinds of tokens it can shift or reduce on, for error hints
+    state: tuple(kind for kind in dict.fromkeys(map(get_token_type, actions.keys())) if kind)
+    for state, actions in parser.action.items()
+}
+
 parser.symbols_table = SymbolsTable()
 
-parser.errors = False
+parser.spool = None  # 'parser/streaming.py', statements are kept in the program otherwise
+
+parser.propagation = Propagation()
+
+parser.diagnostics = lexer.diagnostics
@@ -6,9 +6,9 @@ _tabversion = '3.10'
 
 _lr_method = 'LALR'
 
-_lr_signature = "programleftADDSUBleftMULDIVrightPLUSrightMINUSDECIMAL_CONSTANT DOUBLE_TYPE FLOAT_TYPE IDENTIFIER_TOKEN INTEGRAL_CONSTANT INT_TYPE SHORT_TYPE program : statements  statements : statements empty_statement\n                   | statements declaration_statement\n                   | statements assignment_statement  statements : empty_statement\n                   | declaration_statement\n                   | assignment_statement  statements : statements error ';'  statements : error ';'  assignment_statement : variable_usage '=' arithmetic_expression ';'\n                             | array_usage '=' arithmetic_expression ';'  assignment_statement : error '=' arithmetic_expression ';'\n                             | variable_usage '=' error ';'\n                             | array_usage '=' error ';'\n                             | error '=' error ';'  arithmetic_expression : '(' arithmetic_expression ')'  arithmetic_expression : '-' arithmetic_expression %prec MINUS\n                              | '+' arithmetic_expression %prec PLUS  arithmetic_expression : arithmetic_expression '+' arithmetic_expression %prec ADD\n                              | arithmetic_expression '-' arithmetic_expression %prec SUB\n                              | arithmetic_expression '*' arithmetic_expression %prec MUL\n                              | arithmetic_expression '/' arithmetic_expression %prec DIV  arithmetic_expression : numeric_constant\n                              | function_call\n                              | variable_usage\n                              | array_usage  function_call : function_name '(' arithmetic_expression ')'  function_name : IDENTIFIER_TOKEN  variable_usage : IDENTIFIER_TOKEN  array_usage : IDENTIFIER_TOKEN '[' arithmetic_expression ']'  numeric_constant : INTEGRAL_CONSTANT  numeric_constant : DECIMAL_CONSTANT  declaration_statement : declaration_type declaration_list ';'  declaration_statement : declaration_type error ';'  declaration_type : FLOAT_TYPE\n                         | DOUBLE_TYPE\n                         | SHORT_TYPE\n                         | INT_TYPE  declaration_list : declaration_list ',' IDENTIFIER_TOKEN  declaration_list : declaration_list ',' IDENTIFIER_TOKEN '[' INTEGRAL_CONSTANT ']'  declaration_list : IDENTIFIER_TOKEN  declaration_list : IDENTIFIER_TOKEN '[' INTEGRAL_CONSTANT ']'  empty_statement : epsilon ';'  epsilon : "
+_lr_signature = "programleftADDSUBleftMULDIVrightPLUSrightMINUSDECIMAL_CONSTANT DOUBLE_TYPE EXPORT_KEYWORD EXTERN_KEYWORD FLOAT_TYPE IDENTIFIER_TOKEN INTEGRAL_CONSTANT INT_TYPE SHORT_TYPE program : statements  statements : statements empty_statement\n                   | statements declaration_statement\n                   | statements assignment_statement  statements : empty_statement\n                   | declaration_statement\n                   | assignment_statement  statements : statements error ';'  statements : error ';'  assignment_statement : variable_usage '=' arithmetic_expression ';'\n                             | array_usage '=' arithmetic_expression ';'\n                             | whole_array_usage '=' arithmetic_expression ';'  assignment_statement : error '=' arithmetic_expression ';'\n                             | variable_usage '=' error ';'\n                             | array_usage '=' error ';'\n                             | whole_array_usage '=' error ';'\n                             | error '=' error ';'  arithmetic_expression : '(' arithmetic_expression ')'  arithmetic_expression : '-' arithmetic_expression %prec MINUS\n                              | '+' arithmetic_expression %prec PLUS  arithmetic_expression : arithmetic_expression '+' arithmetic_expression %prec ADD\n                              | arithmetic_expression '-' arithmetic_expression %prec SUB\n                              | arithmetic_expression '*' arithmetic_expression %prec MUL\n                              | arithmetic_expression '/' arithmetic_expression %prec DIV  arithmetic_expression : numeric_constant\n                              | function_call\n                              | variable_usage\n                              | array_usage\n                              | whole_array_usage  function_call : function_name '(' function_arguments ')'  function_arguments : arithmetic_expression\n                           | function_arguments ',' arithmetic_expression  function_name : IDENTIFIER_TOKEN  variable_usage : IDENTIFIER_TOKEN  array_usage : IDENTIFIER_TOKEN '[' arithmetic_expression ']'  whole_array_usage : IDENTIFIER_TOKEN '[' ']'  numeric_constant : INTEGRAL_CONSTANT  numeric_constant : DECIMAL_CONSTANT  declaration_statement : declaration_type declaration_list ';'\n                              | linkage declaration_type declaration_list ';'  declaration_statement : declaration_type error ';'\n                              | linkage declaration_type error ';'  linkage : EXTERN_KEYWORD\n                | EXPORT_KEYWORD  declaration_type : FLOAT_TYPE\n                         | DOUBLE_TYPE\n                         | SHORT_TYPE\n                         | INT_TYPE  declaration_list : declaration_list ',' IDENTIFIER_TOKEN  declaration_list : declaration_list ',' IDENTIFIER_TOKEN '[' INTEGRAL_CONSTANT ']'  declaration_list : IDENTIFIER_TOKEN  declaration_list : IDENTIFIER_TOKEN '[' INTEGRAL_CONSTANT ']'  empty_statement : epsilon ';'  epsilon : "
     
-_lr_action_items = {'error':([0,2,3,4,5,8,11,12,13,14,16,17,18,20,21,22,26,27,29,43,45,52,53,64,65,66,67,],[6,19,-5,-6,-7,24,-35,-36,-37,-38,-2,-3,-4,-9,30,-43,48,50,-8,-33,-34,-15,-12,-10,-13,-11,-14,]),';':([0,2,3,4,5,6,7,16,17,18,19,20,22,23,24,25,29,30,31,35,36,37,38,39,40,42,43,45,47,48,49,50,52,53,59,60,62,64,65,66,67,68,69,70,71,72,73,76,77,79,],[-44,-44,-5,-6,-7,20,22,-2,-3,-4,29,-9,-43,43,45,-41,-8,52,53,-23,-24,-25,-26,-31,-32,-29,-33,-34,64,65,66,67,-15,-12,-17,-18,-39,-10,-13,-11,-14,-30,-19,-20,-21,-22,-16,-42,-27,-40,]),'FLOAT_TYPE':([0,2,3,4,5,16,17,18,20,22,29,43,45,52,53,64,65,66,67,],[11,11,-5,-6,-7,-2,-3,-4,-9,-43,-8,-33,-34,-15,-12,-10,-13,-11,-14,]),'DOUBLE_TYPE':([0,2,3,4,5,16,17,18,20,22,29,43,45,52,53,64,65,66,67,],[12,12,-5,-6,-7,-2,-3,-4,-9,-43,-8,-33,-34,-15,-12,-10,-13,-11,-14,]),'SHORT_TYPE':([0,2,3,4,5,16,17,18,20,22,29,43,45,52,53,64,65,66,67,],[13,13,-5,-6,-7,-2,-3,-4,-9,-43,-8,-33,-34,-15,-12,-10,-13,-11,-14,]),'INT_TYPE':([0,2,3,4,5,16,17,18,20,22,29,43,45,52,53,64,65,66,67,],[14,14,-5,-6,-7,-2,-3,-4,-9,-43,-8,-33,-34,-15,-12,-10,-13,-11,-14,]),'IDENTIFIER_TOKEN':([0,2,3,4,5,8,11,12,13,14,16,17,18,20,21,22,26,27,28,29,32,33,34,43,44,45,52,53,54,55,56,57,61,64,65,66,67,],[15,15,-5,-6,-7,25,-35,-36,-37,-38,-2,-3,-4,-9,42,-43,42,42,42,-8,42,42,42,-33,62,-34,-15,-12,42,42,42,42,42,-10,-13,-11,-14,]),'$end':([1,2,3,4,5,16,17,18,20,22,29,43,45,52,53,64,65,66,67,],[0,-1,-5,-6,-7,-2,-3,-4,-9,-43,-8,-33,-34,-15,-12,-10,-13,-11,-14,]),'=':([6,9,10,15,19,68,],[21,26,27,-29,21,-30,]),'[':([15,25,42,62,],[28,46,28,75,]),'(':([21,26,27,28,32,33,34,41,42,54,55,56,57,61,],[32,32,32,32,32,32,32,61,-28,32,32,32,32,32,]),'-':([21,26,27,28,31,32,33,34,35,36,37,38,39,40,42,47,49,51,54,55,56,57,58,59,60,61,68,69,70,71,72,73,74,77,],[33,33,33,33,55,33,33,33,-23,-24,-25,-26,-31,-32,-29,55,55,55,33,33,33,33,55,-17,-18,33,-30,-19,-20,-21,-22,-16,55,-27,]),'+':([21,26,27,28,31,32,33,34,35,36,37,38,39,40,42,47,49,51,54,55,56,57,58,59,60,61,68,69,70,71,72,73,74,77,],[34,34,34,34,54,34,34,34,-23,-24,-25,-26,-31,-32,-29,54,54,54,34,34,34,34,54,-17,-18,34,-30,-19,-20,-21,-22,-16,54,-27,]),'INTEGRAL_CONSTANT':([21,26,27,28,32,33,34,46,54,55,56,57,61,75,],[39,39,39,39,39,39,39,63,39,39,39,39,39,78,]),'DECIMAL_CONSTANT':([21,26,27,28,32,33,34,54,55,56,57,61,],[40,40,40,40,40,40,40,40,40,40,40,40,]),',':([23,25,62,76,79,],[44,-41,-39,-42,-40,]),'*':([31,35,36,37,38,39,40,42,47,49,51,58,59,60,68,69,70,71,72,73,74,77,],[56,-23,-24,-25,-26,-31,-32,-29,56,56,56,56,-17,-18,-30,-19,-20,-21,-22,-16,56,-27,]),'/':([31,35,36,37,38,39,40,42,47,49,51,58,59,60,68,69,70,71,72,73,74,77,],[57,-23,-24,-25,-26,-31,-32,-29,57,57,57,57,-17,-18,-30,-19,-20,-21,-22,-16,57,-27,]),']':([35,36,37,38,39,40,42,51,59,60,63,68,69,70,71,72,73,77,78,],[-23,-24,-25,-26,-31,-32,-29,68,-17,-18,76,-30,-19,-20,-21,-22,-16,-27,79,]),')':([35,36,37,38,39,40,42,58,59,60,68,69,70,71,72,73,74,77,],[-23,-24,-25,-26,-31,-32,-29,73,-17,-18,-30,-19,-20,-21,-22,-16,77,-27,]),}
+_lr_action_items = {'error':([0,2,3,4,5,8,13,14,15,16,20,21,22,24,25,26,30,31,32,33,35,50,52,64,65,76,77,78,79,80,81,82,83,],[6,23,-5,-6,-7,28,-45,-46,-47,-48,-2,-3,-4,-9,36,-53,55,57,59,61,-8,-39,-41,-17,-13,-40,-42,-10,-14,-11,-15,-12,-16,]),';':([0,2,3,4,5,6,7,20,21,22,23,24,26,27,28,29,35,36,37,41,42,43,44,45,46,47,49,50,52,54,55,56,57,58,59,60,61,63,64,65,71,72,74,76,77,78,79,80,81,82,83,84,85,86,87,88,89,93,94,98,],[-54,-54,-5,-6,-7,24,26,-2,-3,-4,35,-9,-53,50,52,-51,-8,64,65,-25,-26,-27,-28,-29,-37,-38,-34,-39,-41,76,77,78,79,80,81,82,83,-36,-17,-13,-19,-20,-49,-40,-42,-10,-14,-11,-15,-12,-16,-35,-21,-22,-23,-24,-18,-52,-30,-50,]),'FLOAT_TYPE':([0,2,3,4,5,9,17,18,20,21,22,24,26,35,50,52,64,65,76,77,78,79,80,81,82,83,],[13,13,-5,-6,-7,13,-43,-44,-2,-3,-4,-9,-53,-8,-39,-41,-17,-13,-40,-42,-10,-14,-11,-15,-12,-16,]),'DOUBLE_TYPE':([0,2,3,4,5,9,17,18,20,21,22,24,26,35,50,52,64,65,76,77,78,79,80,81,82,83,],[14,14,-5,-6,-7,14,-43,-44,-2,-3,-4,-9,-53,-8,-39,-41,-17,-13,-40,-42,-10,-14,-11,-15,-12,-16,]),'SHORT_TYPE':([0,2,3,4,5,9,17,18,20,21,22,24,26,35,50,52,64,65,76,77,78,79,80,81,82,83,],[15,15,-5,-6,-7,15,-43,-44,-2,-3,-4,-9,-53,-8,-39,-41,-17,-13,-40,-42,-10,-14,-11,-15,-12,-16,]),'INT_TYPE':([0,2,3,4,5,9,17,18,20,21,22,24,26,35,50,52,64,65,76,77,78,79,80,81,82,83,],[16,16,-5,-6,-7,16,-43,-44,-2,-3,-4,-9,-53,-8,-39,-41,-17,-13,-40,-42,-10,-14,-11,-15,-12,-16,]),'EXTERN_KEYWORD':([0,2,3,4,5,20,21,22,24,26,35,50,52,64,65,76,77,78,79,80,81,82,83,],[17,17,-5,-6,-7,-2,-3,-4,-9,-53,-8,-39,-41,-17,-13,-40,-42,-10,-14,-11,-15,-12,-16,]),'EXPORT_KEYWORD':([0,2,3,4,5,20,21,22,24,26,35,50,52,64,65,76,77,78,79,80,81,82,83,],[18,18,-5,-6,-7,-2,-3,-4,-9,-53,-8,-39,-41,-17,-13,-40,-42,-10,-14,-11,-15,-12,-16,]),'IDENTIFIER_TOKEN':([0,2,3,4,5,8,13,14,15,16,20,21,22,24,25,26,30,31,32,33,34,35,38,39,40,50,51,52,64,65,66,67,68,69,73,76,77,78,79,80,81,82,83,95,],[19,19,-5,-6,-7,29,-45,-46,-47,-48,-2,-3,-4,-9,49,-53,29,49,49,49,49,-8,49,49,49,-39,74,-41,-17,-13,49,49,49,49,49,-40,-42,-10,-14,-11,-15,-12,-16,49,]),'$end':([1,2,3,4,5,20,21,22,24,26,35,50,52,64,65,76,77,78,79,80,81,82,83,],[0,-1,-5,-6,-7,-2,-3,-4,-9,-53,-8,-39,-41,-17,-13,-40,-42,-10,-14,-11,-15,-12,-16,]),'=':([6,10,11,12,19,23,63,84,],[25,31,32,33,-34,25,-36,-35,]),'[':([19,29,49,74,],[34,53,34,92,]),'(':([25,31,32,33,34,38,39,40,48,49,66,67,68,69,73,95,],[38,38,38,38,38,38,38,38,73,-33,38,38,38,38,38,38,]),'-':([25,31,32,33,34,37,38,39,40,41,42,43,44,45,46,47,49,56,58,60,62,63,66,67,68,69,70,71,72,73,84,85,86,87,88,89,91,94,95,97,],[39,39,39,39,39,67,39,39,39,-25,-26,-27,-28,-29,-37,-38,-34,67,67,67,67,-36,39,39,39,39,67,-19,-20,39,-35,-21,-22,-23,-24,-18,67,-30,39,67,]),'+':([25,31,32,33,34,37,38,39,40,41,42,43,44,45,46,47,49,56,58,60,62,63,66,67,68,69,70,71,72,73,84,85,86,87,88,89,91,94,95,97,],[40,40,40,40,40,66,40,40,40,-25,-26,-27,-28,-29,-37,-38,-34,66,66,66,66,-36,40,40,40,40,66,-19,-20,40,-35,-21,-22,-23,-24,-18,66,-30,40,66,]),'INTEGRAL_CONSTANT':([25,31,32,33,34,38,39,40,53,66,67,68,69,73,92,95,],[46,46,46,46,46,46,46,46,75,46,46,46,46,46,96,46,]),'DECIMAL_CONSTANT':([25,31,32,33,34,38,39,40,66,67,68,69,73,95,],[47,47,47,47,47,47,47,47,47,47,47,47,47,47,]),',':([27,29,41,42,43,44,45,46,47,49,54,63,71,72,74,84,85,86,87,88,89,90,91,93,94,97,98,],[51,-51,-25,-26,-27,-28,-29,-37,-38,-34,51,-36,-19,-20,-49,-35,-21,-22,-23,-24,-18,95,-31,-52,-30,-32,-50,]),']':([34,41,42,43,44,45,46,47,49,62,63,71,72,75,84,85,86,87,88,89,94,96,],[63,-25,-26,-27,-28,-29,-37,-38,-34,84,-36,-19,-20,93,-35,-21,-22,-23,-24,-18,-30,98,]),'*':([37,41,42,43,44,45,46,47,49,56,58,60,62,63,70,71,72,84,85,86,87,88,89,91,94,97,],[68,-25,-26,-27,-28,-29,-37,-38,-34,68,68,68,68,-36,68,-19,-20,-35,-21,-22,-23,-24,-18,68,-30,68,]),'/':([37,41,42,43,44,45,46,47,49,56,58,60,62,63,70,71,72,84,85,86,87,88,89,91,94,97,],[69,-25,-26,-27,-28,-29,-37,-38,-34,69,69,69,69,-36,69,-19,-20,-35,-21,-22,-23,-24,-18,69,-30,69,]),')':([41,42,43,44,45,46,47,49,63,70,71,72,84,85,86,87,88,89,90,91,94,97,],[-25,-26,-27,-28,-29,-37,-38,-34,-36,89,-19,-20,-35,-21,-22,-23,-24,-18,94,-31,-30,-32,]),}
 
 _lr_action = {}
 for _k, _v in _lr_action_items.items():
@@ -17,7 +17,7 @@ for _k, _v in _lr_action_items.items():
       _lr_action[_x][_k] = _y
 del _lr_action_items
 
-_lr_goto_items = {'program':([0,],[1,]),'statements':([0,],[2,]),'empty_statement':([0,2,],[3,16,]),'declaration_statement':([0,2,],[4,17,]),'assignment_statement':([0,2,],[5,18,]),'epsilon':([0,2,],[7,7,]),'declaration_type':([0,2,],[8,8,]),'variable_usage':([0,2,21,26,27,28,32,33,34,54,55,56,57,61,],[9,9,37,37,37,37,37,37,37,37,37,37,37,37,]),'array_usage':([0,2,21,26,27,28,32,33,34,54,55,56,57,61,],[10,10,38,38,38,38,38,38,38,38,38,38,38,38,]),'declaration_list':([8,],[23,]),'arithmetic_expression':([21,26,27,28,32,33,34,54,55,56,57,61,],[31,47,49,51,58,59,60,69,70,71,72,74,]),'numeric_constant':([21,26,27,28,32,33,34,54,55,56,57,61,],[35,35,35,35,35,35,35,35,35,35,35,35,]),'function_call':([21,26,27,28,32,33,34,54,55,56,57,61,],[36,36,36,36,36,36,36,36,36,36,36,36,]),'function_name':([21,26,27,28,32,33,34,54,55,56,57,61,],[41,41,41,41,41,41,41,41,41,41,41,41,]),}
+_lr_goto_items = {'program':([0,],[1,]),'statements':([0,],[2,]),'empty_statement':([0,2,],[3,20,]),'declaration_statement':([0,2,],[4,21,]),'assignment_statement':([0,2,],[5,22,]),'epsilon':([0,2,],[7,7,]),'declaration_type':([0,2,9,],[8,8,30,]),'linkage':([0,2,],[9,9,]),'variable_usage':([0,2,25,31,32,33,34,38,39,40,66,67,68,69,73,95,],[10,10,43,43,43,43,43,43,43,43,43,43,43,43,43,43,]),'array_usage':([0,2,25,31,32,33,34,38,39,40,66,67,68,69,73,95,],[11,11,44,44,44,44,44,44,44,44,44,44,44,44,44,44,]),'whole_array_usage':([0,2,25,31,32,33,34,38,39,40,66,67,68,69,73,95,],[12,12,45,45,45,45,45,45,45,45,45,45,45,45,45,45,]),'declaration_list':([8,30,],[27,54,]),'arithmetic_expression':([25,31,32,33,34,38,39,40,66,67,68,69,73,95,],[37,56,58,60,62,70,71,72,85,86,87,88,91,97,]),'numeric_constant':([25,31,32,33,34,38,39,40,66,67,68,69,73,95,],[41,41,41,41,41,41,41,41,41,41,41,41,41,41,]),'function_call':([25,31,32,33,34,38,39,40,66,67,68,69,73,95,],[42,42,42,42,42,42,42,42,42,42,42,42,42,42,]),'function_name':([25,31,32,33,34,38,39,40,66,67,68,69,73,95,],[48,48,48,48,48,48,48,48,48,48,48,48,48,48,]),'function_arguments':([73,],[90,]),}
 
 _lr_goto = {}
 for _k, _v in _lr_goto_items.items():
@@ -27,48 +27,58 @@ for _k, _v in _lr_goto_items.items():
 del _lr_goto_items
 _lr_productions = [
   ("S' -> program","S'",1,None,None,None),
-  ('program -> statements','program',1,'p_program','parser.py',17),
-  ('statements -> statements empty_statement','statements',2,'p_statements_rec','parser.py',24),
-  ('statements -> statements declaration_statement','statements',2,'p_statements_rec','parser.py',25),
-  ('statements -> statements assignment_statement','statements',2,'p_statements_rec','parser.py',26),
-  ('statements -> empty_statement','statements',1,'p_statements_end','parser.py',32),
-  ('statements -> declaration_statement','statements',1,'p_statements_end','parser.py',33),
-  ('statements -> assignment_statement','statements',1,'p_statements_end','parser.py',34),
-  ('statements -> statements error ;','statements',3,'p_statements_rec_error','parser.py',40),
-  ('statements -> error ;','statements',2,'p_statements_end_error','parser.py',50),
-  ('assignment_statement -> variable_usage = arithmetic_expression ;','assignment_statement',4,'p_assignment_statement','parser.py',60),
-  ('assignment_statement -> array_usage = arithmetic_expression ;','assignment_statement',4,'p_assignment_statement','parser.py',61),
-  ('assignment_statement -> error = arithmetic_expression ;','assignment_statement',4,'p_assignment_statement_error','parser.py',67),
-  ('assignment_statement -> variable_usage = error ;','assignment_statement',4,'p_assignment_statement_error','parser.py',68),
-  ('assignment_statement -> array_usage = error ;','assignment_statement',4,'p_assignment_statement_error','parser.py',69),
-  ('assignment_statement -> error = error ;','assignment_statement',4,'p_assignment_statement_error','parser.py',70),
-  ('arithmetic_expression -> ( arithmetic_expression )','arithmetic_expression',3,'p_arithmetic_expression_rec_par','parser.py',80),
-  ('arithmetic_expression -> - arithmetic_expression','arithmetic_expression',2,'p_arithmetic_expression_rec_una','parser.py',86),
-  ('arithmetic_expression -> + arithmetic_expression','arithmetic_expression',2,'p_arithmetic_expression_rec_una','parser.py',87),
-  ('arithmetic_expression -> arithmetic_expression + arithmetic_expression','arithmetic_expression',3,'p_arithmetic_expression_rec_bin','parser.py',94),
-  ('arithmetic_expression -> arithmetic_expression - arithmetic_expression','arithmetic_expression',3,'p_arithmetic_expression_rec_bin','parser.py',95),
-  ('arithmetic_expression -> arithmetic_expression * arithmetic_expression','arithmetic_expression',3,'p_arithmetic_expression_rec_bin','parser.py',96),
-  ('arithmetic_expression -> arithmetic_expression / arithmetic_expression','arithmetic_expression',3,'p_arithmetic_expression_rec_bin','parser.py',97),
-  ('arithmetic_expression -> numeric_constant','arithmetic_expression',1,'p_arithmetic_expression_end','parser.py',104),
-  ('arithmetic_expression -> function_call','arithmetic_expression',1,'p_arithmetic_expression_end','parser.py',105),
-  ('arithmetic_expression -> variable_usage','arithmetic_expression',1,'p_arithmetic_expression_end','parser.py',106),
-  ('arithmetic_expression -> array_usage','arithmetic_expression',1,'p_arithmetic_expression_end','parser.py',107),
-  ('function_call -> function_name ( arithmetic_expression )','function_call',4,'p_function_call','parser.py',113),
-  ('function_name -> IDENTIFIER_TOKEN','function_name',1,'p_function_name','parser.py',120),
-  ('variable_usage -> IDENTIFIER_TOKEN','variable_usage',1,'p_variable_usage','parser.py',127),
-  ('array_usage -> IDENTIFIER_TOKEN [ arithmetic_expression ]','array_usage',4,'p_array_usage','parser.py',147),
-  ('numeric_constant -> INTEGRAL_CONSTANT','numeric_constant',1,'p_numeric_integral_constant','parser.py',188),
-  ('numeric_constant -> DECIMAL_CONSTANT','numeric_constant',1,'p_numeric_decimal_constant','parser.py',194),
-  ('declaration_statement -> declaration_type declaration_list ;','declaration_statement',3,'p_declaration_statement','parser.py',200),
-  ('declaration_statement -> declaration_type error ;','declaration_statement',3,'p_declaration_statement_error','parser.py',220),
-  ('declaration_type -> FLOAT_TYPE','declaration_type',1,'p_declaration_type','parser.py',230),
-  ('declaration_type -> DOUBLE_TYPE','declaration_type',1,'p_declaration_type','parser.py',231),
-  ('declaration_type -> SHORT_TYPE','declaration_type',1,'p_declaration_type','parser.py',232),
-  ('declaration_type -> INT_TYPE','declaration_type',1,'p_declaration_type','parser.py',233),
-  ('declaration_list -> declaration_list , IDENTIFIER_TOKEN','declaration_list',3,'p_declaration_list_variable_declaration_rec','parser.py',239),
-  ('declaration_list -> declaration_list , IDENTIFIER_TOKEN [ INTEGRAL_CONSTANT ]','declaration_list',6,'p_declaration_list_array_declaration_rec','parser.py',247),
-  ('declaration_list -> IDENTIFIER_TOKEN','declaration_list',1,'p_declaration_list_variable_declaration_end','parser.py',266),
-  ('declaration_list -> IDENTIFIER_TOKEN [ INTEGRAL_CONSTANT ]','declaration_list',4,'p_declaration_list_array_declaration_end','parser.py',274),
-  ('empty_statement -> epsilon ;','empty_statement',2,'p_empty_statement','parser.py',293),
-  ('epsilon -> <empty>','epsilon',0,'p_epsilon','parser.py',304),
+  ('program -> statements','program',1,'p_program','parser.py',41),
+  ('statements -> statements empty_statement','statements',2,'p_statements_rec','parser.py',48),
+  ('statements -> statements declaration_statement','statements',2,'p_statements_rec','parser.py',49),
+  ('statements -> statements assignment_statement','statements',2,'p_statements_rec','parser.py',50),
+  ('statements -> empty_statement','statements',1,'p_statements_end','parser.py',56),
+  ('statements -> declaration_statement','statements',1,'p_statements_end','parser.py',57),
+  ('statements -> assignment_statement','statements',1,'p_statements_end','parser.py',58),
+  ('statements -> statements error ;','statements',3,'p_statements_rec_error','parser.py',64),
+  ('statements -> error ;','statements',2,'p_statements_end_error','parser.py',70),
+  ('assignment_statement -> variable_usage = arithmetic_expression ;','assignment_statement',4,'p_assignment_statement','parser.py',76),
+  ('assignment_statement -> array_usage = arithmetic_expression ;','assignment_statement',4,'p_assignment_statement','parser.py',77),
+  ('assignment_statement -> whole_array_usage = arithmetic_expression ;','assignment_statement',4,'p_assignment_statement','parser.py',78),
+  ('assignment_statement -> error = arithmetic_expression ;','assignment_statement',4,'p_assignment_statement_error','parser.py',87),
+  ('assignment_statement -> variable_usage = error ;','assignment_statement',4,'p_assignment_statement_error','parser.py',88),
+  ('assignment_statement -> array_usage = error ;','assignment_statement',4,'p_assignment_statement_error','parser.py',89),
+  ('assignment_statement -> whole_array_usage = error ;','assignment_statement',4,'p_assignment_statement_error','parser.py',90),
+  ('assignment_statement -> error = error ;','assignment_statement',4,'p_assignment_statement_error','parser.py',91),
+  ('arithmetic_expression -> ( arithmetic_expression )','arithmetic_expression',3,'p_arithmetic_expression_rec_par','parser.py',98),
+  ('arithmetic_expression -> - arithmetic_expression','arithmetic_expression',2,'p_arithmetic_expression_rec_una','parser.py',104),
+  ('arithmetic_expression -> + arithmetic_expression','arithmetic_expression',2,'p_arithmetic_expression_rec_una','parser.py',105),
+  ('arithmetic_expression -> arithmetic_expression + arithmetic_expression','arithmetic_expression',3,'p_arithmetic_expression_rec_bin','parser.py',116),
+  ('arithmetic_expression -> arithmetic_expression - arithmetic_expression','arithmetic_expression',3,'p_arithmetic_expression_rec_bin','parser.py',117),
+  ('arithmetic_expression -> arithmetic_expression * arithmetic_expression','arithmetic_expression',3,'p_arithmetic_expression_rec_bin','parser.py',118),
+  ('arithmetic_expression -> arithmetic_expression / arithmetic_expression','arithmetic_expression',3,'p_arithmetic_expression_rec_bin','parser.py',119),
+  ('arithmetic_expression -> numeric_constant','arithmetic_expression',1,'p_arithmetic_expression_end','parser.py',130),
+  ('arithmetic_expression -> function_call','arithmetic_expression',1,'p_arithmetic_expression_end','parser.py',131),
+  ('arithmetic_expression -> variable_usage','arithmetic_expression',1,'p_arithmetic_expression_end','parser.py',132),
+  ('arithmetic_expression -> array_usage','arithmetic_expression',1,'p_arithmetic_expression_end','parser.py',133),
+  ('arithmetic_expression -> whole_array_usage','arithmetic_expression',1,'p_arithmetic_expression_end','parser.py',134),
+  ('function_call -> function_name ( function_arguments )','function_call',4,'p_function_call','parser.py',140),
+  ('function_arguments -> arithmetic_expression','function_arguments',1,'p_function_arguments','parser.py',155),
+  ('function_arguments -> function_arguments , arithmetic_expression','function_arguments',3,'p_function_arguments','parser.py',156),
+  ('function_name -> IDENTIFIER_TOKEN','function_name',1,'p_function_name','parser.py',162),
+  ('variable_usage -> IDENTIFIER_TOKEN','variable_usage',1,'p_variable_usage','parser.py',173),
+  ('array_usage -> IDENTIFIER_TOKEN [ arithmetic_expression ]','array_usage',4,'p_array_usage','parser.py',187),
+  ('whole_array_usage -> IDENTIFIER_TOKEN [ ]','whole_array_usage',3,'p_whole_array_usage','parser.py',210),
+  ('numeric_constant -> INTEGRAL_CONSTANT','numeric_constant',1,'p_numeric_integral_constant','parser.py',227),
+  ('numeric_constant -> DECIMAL_CONSTANT','numeric_constant',1,'p_numeric_decimal_constant','parser.py',233),
+  ('declaration_statement -> declaration_type declaration_list ;','declaration_statement',3,'p_declaration_statement','parser.py',239),
+  ('declaration_statement -> linkage declaration_type declaration_list ;','declaration_statement',4,'p_declaration_statement','parser.py',240),
+  ('declaration_statement -> declaration_type error ;','declaration_statement',3,'p_declaration_statement_error','parser.py',253),
+  ('declaration_statement -> linkage declaration_type error ;','declaration_statement',4,'p_declaration_statement_error','parser.py',254),
+  ('linkage -> EXTERN_KEYWORD','linkage',1,'p_linkage','parser.py',261),
+  ('linkage -> EXPORT_KEYWORD','linkage',1,'p_linkage','parser.py',262),
+  ('declaration_type -> FLOAT_TYPE','declaration_type',1,'p_declaration_type','parser.py',268),
+  ('declaration_type -> DOUBLE_TYPE','declaration_type',1,'p_declaration_type','parser.py',269),
+  ('declaration_type -> SHORT_TYPE','declaration_type',1,'p_declaration_type','parser.py',270),
+  ('declaration_type -> INT_TYPE','declaration_type',1,'p_declaration_type','parser.py',271),
+  ('declaration_list -> declaration_list , IDENTIFIER_TOKEN','declaration_list',3,'p_declaration_list_variable_declaration_rec','parser.py',277),
+  ('declaration_list -> declaration_list , IDENTIFIER_TOKEN [ INTEGRAL_CONSTANT ]','declaration_list',6,'p_declaration_list_array_declaration_rec','parser.py',285),
+  ('declaration_list -> IDENTIFIER_TOKEN','declaration_list',1,'p_declaration_list_variable_declaration_end','parser.py',298),
+  ('declaration_list -> IDENTIFIER_TOKEN [ INTEGRAL_CONSTANT ]','declaration_list',4,'p_declaration_list_array_declaration_end','parser.py',306),
+  ('empty_statement -> epsilon ;','empty_statement',2,'p_empty_statement','parser.py',319),
+  ('epsilon -> <empty>','epsilon',0,'p_epsilon','parser.py',326),
 ]
@@ -0,0 +1,60 @@
+# conversion planning, one statement at a time as they are parsed: an integral variable (or array element) read by
+# fractional operations is converted to their type once, before the rest of the statement's code, into a temporary
+# every such operand then reads like any fractional one ('faddl __tv3(%rip)'). that also lets instruction selection
+# take operands it otherwise loads, pushes and converts one by one: 'short' ones and integral operands of 'float'
+# operations. a single 'int' operand of a 'double' operation is left alone, 'fiaddl' and such convert it for free.
+# an integral value has one fractional value of every type, so nothing but the code changes
+
+from .classes import *
+
+
+def key(usage: Expression) -> str or (str, int or str) or None:
+    """ what 'usage' reads, if it reads the same wherever it is in the statement """
+
+    if type(usage) == VariableUsage:
+        return usage.identifier
+    elif (type(usage) == ArrayUsage) and isinstance(usage.index, IntegralConstant):
+        return usage.identifier, usage.index.value
+    elif (type(usage) == ArrayUsage) and (type(usage.index) == VariableUsage):
+        return usage.identifier, usage.index.identifier
+    return None
+
+
+def operands(expression: Expression, found: dict) -> None:
+    """ integral operands of the fractional operations of 'expression', as (operation, side) under what they read
+        and the type they are converted to """
+
+    if expression.shape is not None:  # whole-array parts convert their scalars once already
+        return
+    elif isinstance(expression, Binary) and (expression.data_type in fractional_types):
+        for side in ('left', 'right'):
+            operand = getattr(expression, side)
+            if (operand.data_type == 'short') and not code_generation.widened_shorts:
+                continue  # the FPU converts whatever '--narrow-shorts' leaves above them
+            elif (operand.data_type in integral_types) and (key(operand) is not None):
+                found.setdefault((key(operand), expression.data_type), []).append((expression, side))
+
+    for child in expression.children():
+        operands(child, found)
+
+
+def planned(statement: AssignmentStatement, symbols_table) -> AssignmentStatement:
+    """ 'statement' converting every operand it can once, into a temporary of 'symbols_table' """
+
+    if statement.loop is not None:
+        return statement
+
+    found = {}
+    operands(statement.value, found)
+
+    for (_, data_type), uses in found.items():
+        operation, side = uses[0]
+        operand = getattr(operation, side)
+        if (len(uses) == 1) and (data_type == 'double') and (operand.data_type == 'int'):
+            continue
+
+        conversion = Conversion(operand, data_type, operand.position).create_temp_var(symbols_table)
+        for operation, side in uses:
+            setattr(operation, side, conversion)
+        statement.conversions.append(conversion)
+    return statement
@@ -0,0 +1,125 @@
+# copy and constant propagation over the straight-line statements, one statement at a time as they are parsed:
+# after 'b = a;' (same type) or 'b = 2;' the uses of 'b' read 'a' or the constant (converted to the type of 'b' the
+# way the store would) until either side is assigned again. elements at constant indexes count as variables of their
+# own, a store through a variable index (or to the whole array) forgets all elements of the array. calls of exact
+# intrinsics ('parser/intrinsics.py') with constant arguments are folded into their results
+
+from .classes import *
+
+
+def location(usage: Expression) -> str or (str, int) or None:
+    """ variable, or array element at a constant index, 'usage' reads """
+    if type(usage) == VariableUsage:
+        return usage.identifier
+    elif (type(usage) == ArrayUsage) and isinstance(usage.index, IntegralConstant):
+        return usage.identifier, usage.index.value
+    return None
+
+
+def constant(value: int or float, data_type: str, position) -> NumericConstant:
+    """ a constant of 'data_type', the parser's own classes for the types it makes constants of """
+
+    if data_type == 'int':
+        return IntegralConstant(value, position)
+    elif data_type == 'double':
+        return DecimalConstant(value, position)
+    return NumericConstant(value, data_type, position)
+
+
+class Propagation:
+    """ ~ what the statements so far left in memory ~ """
+
+    def __init__(self):
+        self.facts = {}  # location -> constant or usage of the same type it holds the value of
+
+    def usage(self, fact: Expression, position) -> Expression:
+        """ a new node for every use, whole-array loops tell their scalars apart by identity """
+
+        if isinstance(fact, NumericConstant):
+            return constant(fact.value, fact.data_type, position)
+        elif type(fact) == VariableUsage:
+            return VariableUsage(fact.identifier, fact.data_type, position)
+        return ArrayUsage(fact.identifier, fact.data_type, fact.size, IntegralConstant(fact.index.value, position),
+                          position)
+
+    def rewritten(self, expression: Expression, replaced: dict) -> Expression:
+        """ 'expression' with the uses of known locations replaced (in place, but for the root, which is returned);
+            'replaced' maps id() of the nodes taken out to the ones put in """
+
+        if isinstance(expression, Unary):
+            expression.expression = self.rewritten(expression.expression, replaced)
+        elif isinstance(expression, Binary):
+            expression.left = self.rewritten(expression.left, replaced)
+            expression.right = self.rewritten(expression.right, replaced)
+        elif isinstance(expression, FunctionCall):
+            expression.arguments = [self.rewritten(argument, replaced) for argument in expression.arguments]
+            if getattr(expression, 'loop', None) is not None:  # reductions
+                self.relinked(expression.loop, replaced)
+            elif all(isinstance(argument, NumericConstant) for argument in expression.arguments):
+                value = intrinsics[expression.function].folded(
+                    [converted(argument.value, argument.data_type, 'double') for argument in expression.arguments])
+                if value is not None:
+                    replaced[id(expression)] = DecimalConstant(value, expression.position)
+                    return replaced[id(expression)]
+        elif type(expression) == ArrayUsage:
+            self.indexed(expression, replaced)
+
+        fact = self.facts.get(location(expression))
+        if fact is None:
+            return expression
+        replaced[id(expression)] = self.usage(fact, expression.position)
+        return replaced[id(expression)]
+
+    def indexed(self, usage: ArrayUsage, replaced: dict) -> None:
+        """ index of 'usage' rewritten, a constant one only if it is in bounds (they are checked while parsing) """
+
+        index = self.rewritten(usage.index, replaced)
+        if isinstance(index, NumericConstant):
+            if 0 <= index.value < usage.size:
+                usage.index = IntegralConstant(index.value, index.position)
+        else:
+            usage.index = index
+
+    @staticmethod
+    def relinked(loop: VectorLoop, replaced: dict) -> None:
+        """ 'loop' over the nodes put in, its expression is a scalar itself in 'a[] = x;' """
+
+        loop.expression = replaced.get(id(loop.expression), loop.expression)
+        loop.slots = [(replaced.get(id(scalar), scalar), slot) for scalar, slot in loop.slots]
+
+    def forget(self, destination: Expression) -> None:
+        """ facts about 'destination' and the ones read from it gone """
+
+        if type(destination) == VariableUsage:
+            stale = lambda where: where == destination.identifier
+        elif location(destination) is not None:
+            stale = lambda where: where == location(destination)
+        else:  # any element
+            stale = lambda where: isinstance(where, tuple) and (where[0] == destination.identifier)
+
+        self.facts = {where: fact for where, fact in self.facts.items()
+                      if not stale(where) and not stale(location(fact))}
+
+    def statement(self, statement: AssignmentStatement) -> AssignmentStatement:
+        """ 'statement' reading known locations from where their values are, then what it stores learned """
+
+        replaced = {}
+        statement.value = self.rewritten(statement.value, replaced)
+        if type(statement.destination) == ArrayUsage:
+            self.indexed(statement.destination, replaced)
+        if statement.loop is not None:
+            self.relinked(statement.loop, replaced)
+
+        destination, value = statement.destination, statement.value
+        self.forget(destination)
+
+        where = location(destination)
+        if where is None:
+            return statement
+        elif isinstance(value, NumericConstant):
+            self.facts[where] = constant(converted(value.value, value.data_type, destination.data_type),
+                                         destination.data_type, None)
+        elif (location(value) is not None) and (location(value) != where) and \
+                (value.data_type == destination.data_type):
+            self.facts[where] = value
+        return statement
@@ -0,0 +1,127 @@
+# packed sse2 and avx2 code for whole-array statements: a main loop over as many elements as fill a vector register,
+# then a scalar loop over the rest; 'sum' and 'max' fold the lanes of their accumulator pairwise, lane i with
+# lane i + half, down to the first one (the interpreters reproduce this order)
+
+widths = {  # mode -> vector register bytes
+    'sse': 16,
+    'avx2': 32
+}
+
+suffixes = {  # data type -> packed and scalar instruction suffixes
+    'double': ('pd', 'sd'),
+    'float':  ('ps', 'ss')
+}
+
+sizes = {'double': 8, 'float': 4}
+
+
+def lanes(mode: str, data_type: str) -> int:
+    return widths[mode] // sizes[data_type]
+
+
+def register(n: int, packed: bool, mode: str) -> str:
+    return f"%{'y' if packed and (mode == 'avx2') else 'x'}mm{n}"
+
+
+def move(data_type: str, packed: bool, mode: str, source: str, destination: str) -> str:
+    """ aligned move of a vector, or of its first element """
+
+    packed_suffix, scalar_suffix = suffixes[data_type]
+    return f"{'v' if mode == 'avx2' else ''}mov{'a' + packed_suffix if packed else scalar_suffix} " \
+           f"{source}, {destination}\n"
+
+
+def arithmetic(operation: str, data_type: str, packed: bool, mode: str, source: str, destination: str) -> str:
+    """ 'destination' = 'destination' 'operation' ('add', 'max', ...) 'source', three-operand vex form for avx2 """
+
+    mnemonic = f"{operation}{suffixes[data_type][0 if packed else 1]}"
+    if mode == 'avx2':
+        return f"v{mnemonic} {source}, {destination}, {destination}\n"
+    return f"{mnemonic} {source}, {destination}\n"
+
+
+def negation(data_type: str, mode: str, destination: str, scratch: str) -> str:
+    """ flips the sign bits of all lanes of 'destination' ('0 - x' would turn -0.0 into +0.0) """
+
+    shift = 'q $63' if data_type == 'double' else 'd $31'
+    if mode == 'avx2':
+        return f"vpcmpeqd {scratch}, {scratch}, {scratch}\n" \
+               f"vpsll{shift}, {scratch}, {scratch}\n" \
+               f"vxor{suffixes[data_type][0]} {scratch}, {destination}, {destination}\n"
+    return f"pcmpeqd {scratch}, {scratch}\n" \
+           f"psll{shift}, {scratch}\n" \
+           f"xor{suffixes[data_type][0]} {scratch}, {destination}\n"
+
+
+def conversion(data_type: str, target_type: str) -> str:
+    """ %rax holding a 'data_type' value into the first element of %xmm0 as 'target_type' """
+
+    scalar_suffix = suffixes[target_type][1]
+    if data_type == 'short':
+        return f"movswl %ax, %eax\ncvtsi2{scalar_suffix}l %eax, %xmm0\n"
+    elif data_type == 'int':
+        return f"cvtsi2{scalar_suffix}l %eax, %xmm0\n"
+    elif data_type == 'float':
+        return "movd %eax, %xmm0\n" + ("cvtss2sd %xmm0, %xmm0\n" if target_type == 'double' else '')
+    else:  # elif data_type == 'double':
+        return "movq %rax, %xmm0\n" + ("cvtsd2ss %xmm0, %xmm0\n" if target_type == 'float' else '')
+
+
+def splat(data_type: str) -> str:
+    """ the first element of %xmm0 into all of its lanes """
+    return "unpcklpd %xmm0, %xmm0\n" if data_type == 'double' else "shufps $0, %xmm0, %xmm0\n"
+
+
+def accumulator(operation: str, data_type: str, mode: str, identity: str) -> str:
+    """ all lanes of %xmm15/%ymm15 set to the identity of 'operation' ('identity' is its memory operand) """
+
+    packed_suffix, scalar_suffix = suffixes[data_type]
+    if operation == 'add':
+        return f"vxor{packed_suffix} %ymm15, %ymm15, %ymm15\n" if mode == 'avx2' else \
+               f"xor{packed_suffix} %xmm15, %xmm15\n"
+    elif mode == 'avx2':
+        return f"vbroadcasts{scalar_suffix[1]} {identity}, %ymm15\n"
+    return f"mov{scalar_suffix} {identity}, %xmm15\n" + splat(data_type).replace('%xmm0', '%xmm15')
+
+
+def fold(operation: str, data_type: str, mode: str) -> str:
+    """ lanes of %xmm15/%ymm15 folded into its first one, with %xmm0 as scratch """
+
+    packed_suffix, scalar_suffix = suffixes[data_type]
+    if mode == 'avx2':
+        code = f"vextractf128 $1, %ymm15, %xmm0\n" \
+               f"v{operation}{packed_suffix} %xmm0, %xmm15, %xmm15\n"
+        if data_type == 'double':
+            return code + f"vunpckhpd %xmm15, %xmm15, %xmm0\n" \
+                          f"v{operation}sd %xmm0, %xmm15, %xmm15\n"
+        return code + f"vmovhlps %xmm15, %xmm15, %xmm0\n" \
+                      f"v{operation}ps %xmm0, %xmm15, %xmm15\n" \
+                      f"vshufps $1, %xmm15, %xmm15, %xmm0\n" \
+                      f"v{operation}ss %xmm0, %xmm15, %xmm15\n"
+    elif data_type == 'double':
+        return f"movapd %xmm15, %xmm0\n" \
+               f"unpckhpd %xmm0, %xmm0\n" \
+               f"{operation}sd %xmm0, %xmm15\n"
+    return f"movaps %xmm15, %xmm0\n" \
+           f"movhlps %xmm15, %xmm0\n" \
+           f"{operation}ps %xmm0, %xmm15\n" \
+           f"movaps %xmm15, %xmm0\n" \
+           f"shufps $1, %xmm0, %xmm0\n" \
+           f"{operation}ss %xmm0, %xmm15\n"
+
+
+def reduced(operation, identity: float, values: list, lanes: int) -> float:
+    """ what the generated loop computes: 'operation' per lane over the vector part, the lanes folded, then
+        the tail one by one """
+
+    main = len(values) // lanes * lanes
+    accumulated = [identity] * lanes
+    for start in range(0, main, lanes):
+        accumulated = [operation(a, v) for a, v in zip(accumulated, values[start:start + lanes])]
+    while len(accumulated) > 1:
+        half = len(accumulated) // 2
+        accumulated = [operation(accumulated[i], accumulated[i + half]) for i in range(half)]
+    result = accumulated[0]
+    for value in values[main:]:
+        result = operation(result, value)
+    return result
@@ -0,0 +1,84 @@
+# streaming compilation: the code of every statement goes to a spool file as soon as the parser reduces the statement,
+# which is then dropped. what the sections in front of the code need from it (symbols in the order statements first
+# refer to them, destinations, pool constants and routines called) is kept in sets that grow with the symbols, not
+# with the program; the sections are written at the end and the spooled code is copied after them
+
+import re
+import tempfile
+
+from lexer import NEWLINE
+
+from .classes import (
+    code_generation,
+    ProgramStatements
+)
+from .constants import pool_label
+from .forwarding import forwarded
+from .layout import reference
+
+call = re.compile(r'call \w+\n')
+
+
+class Spool:
+    """ ~ code of the statements parsed so far ~ """
+
+    def __init__(self, source: str = None):
+        self.file = tempfile.TemporaryFile('w+')
+        self.count = 0  # statements spooled
+        self.held = None  # code of the last one
+        self.spooled = False  # anything written
+
+        self.destinations = set()
+        self.seen = set()  # names (of symbols, and of pool constants) some statement referred to
+        self.first_uses = []  # names statements referred to first, of the statements that did
+
+        self.references = {}  # pool labels and calls, in the form the code has them
+
+        self.source = source  # for the profile map of instrumented code
+        self.locations = []
+
+    def add(self, statement) -> None:
+        """ code of 'statement' spooled, held back until the next one is there to forward its store to """
+
+        code = repr(statement)
+        if code_generation.instrument:
+            self.locations.append({'counter': self.count, **statement.location(self.source)})
+            code = ProgramStatements.instrumented(self.count, code)
+        elif code_generation.propagation and (self.held is not None):
+            self.held, code = forwarded(self.held, code)
+
+        self.release()
+        self.held = code
+        self.count += 1
+        self.destinations.add(statement.destination.identifier)
+
+    def release(self) -> None:
+        """ the code held back written out, with what is left to know about it """
+
+        if self.held is None:
+            return
+        code, self.held = self.held, None
+
+        self.file.write(f"{NEWLINE if self.spooled else ''}{code}")
+        self.spooled = True
+
+        first = [name for name in dict.fromkeys(reference.findall(code)) if name not in self.seen]
+        if first:
+            self.seen.update(first)
+            self.first_uses.append(first)
+        self.references.update(dict.fromkeys(match.group() for match in pool_label.finditer(code)))
+        self.references.update(dict.fromkeys(call.findall(code)))
+
+    def symbols(self, identifiers: {str}) -> [[str]]:
+        """ of the names statements referred to first, the ones in 'identifiers' """
+        return [group for group in ([name for name in first if name in identifiers] for first in self.first_uses)
+                if group]
+
+    def referenced(self) -> str:
+        """ pool labels and calls of the code, for 'constant_pool' and 'trigonometric_routines' to look through """
+        return ' '.join(self.references)
+
+    def copy(self, output) -> None:
+        self.file.seek(0)
+        while chunk := self.file.read(1 << 16):
+            output.write(chunk)
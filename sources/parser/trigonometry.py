@@ -0,0 +1,309 @@
+# fast-math sin and cos: out-of-line routines instead of 'fsin'/'fcos'
+#
+# the argument is reduced by the nearest multiple k of pi/2 (Cody-Waite, pi/2 split in four parts, the
+# first three with 33 significant bits so k * part is exact), then the fdlibm minimax polynomials of sin and
+# cos on [-pi/4, pi/4] are evaluated and picked by the quadrant k mod 4. arguments with |x| >= 2**19 * pi/2
+# (and infinities) fall back to 'fsin'/'fcos'/'fsincos', NaN propagates through the polynomials.
+#
+# error against the exact results, in ulps, for |x| < 2**19 * pi/2 (python3 -m harness.trigonometry measures
+# it over 20000 arguments per range, near multiples of pi/2 included):
+#   sse: below 0.75 (double precision, the reduction error is carried into the polynomials as a tail)
+#   x87: below 0.55 (extended precision, rounded once when the result is stored)
+# for comparison 'fsin' is off by up to ~300 ulps at |x| < 1e3, and by far more near multiples of pi/2.
+#
+# calling convention: sse routines take the argument in %xmm0 and return in %xmm0; x87 routines take the
+# argument in %st(0) and return in %st(0), sincos leaves the cosine in %st(0) and the sine in %st(1), like
+# 'fsincos'. %rax and %xmm0-%xmm7 are clobbered.
+#
+# sin and cos of the same argument in a statement share one call (sincos, one reduction) only on x87, where that
+# is about a quarter faster; with sse the fused routine measured slower than the two calls on some machines (483
+# against 281 ns per 16 sin and 16 cos), so sse calls one routine per function
+
+from struct import (pack, unpack)
+
+constants = {
+    'limit':   2 ** 19 * 1.57079632679489661923e+00,
+    'invpio2': 6.36619772367581382433e-01,
+    'pio2_1':  1.57079632673412561417e+00,  # first 33 bits of pi/2
+    'pio2_2':  6.07710050630396597660e-11,  # next 33 bits of pi/2
+    'pio2_3':  2.02226624871116645580e-21,  # and the next 33 bits
+    'pio2_3t': 8.47842766036889956997e-32,  # pi/2 - pio2_1 - pio2_2 - pio2_3
+    'half':    0.5,
+    'one':     1.0,
+    'S1': -1.66666666666666324348e-01,
+    'S2':  8.33333333332248946124e-03,
+    'S3': -1.98412698298579493134e-04,
+    'S4':  2.75573137070700676789e-06,
+    'S5': -2.50507602534068634195e-08,
+    'S6':  1.58969099521155010221e-10,
+    'C1':  4.16666666666666019037e-02,
+    'C2': -1.38888888888741095749e-03,
+    'C3':  2.48015872894767294178e-05,
+    'C4': -2.75573143513906633035e-07,
+    'C5':  2.08757232129817482790e-09,
+    'C6': -1.13596475577881948265e-11,
+}
+
+masks = {  # 16 bytes each, operands of 'andpd'/'xorpd'
+    'abs':  0x7FFFFFFFFFFFFFFF,
+    'sign': 0x8000000000000000,
+}
+
+
+def constant(name: str) -> str:
+    return f"__cmmm_trig_{name}(%rip)"
+
+
+def bits(value: float) -> int:
+    return unpack('<Q', pack('<d', value))[0]
+
+
+# ~ sse ~
+
+sse_reduction = f"""movapd %xmm0, %xmm1
+andpd {constant('abs')}, %xmm1
+ucomisd {constant('limit')}, %xmm1
+jae 9f
+movapd %xmm0, %xmm1
+mulsd {constant('invpio2')}, %xmm1
+cvtsd2si %xmm1, %rax
+pxor %xmm1, %xmm1
+cvtsi2sd %rax, %xmm1
+movapd %xmm1, %xmm2
+mulsd {constant('pio2_1')}, %xmm2
+subsd %xmm2, %xmm0
+movapd %xmm1, %xmm2
+mulsd {constant('pio2_2')}, %xmm2
+movapd %xmm0, %xmm3
+subsd %xmm2, %xmm3
+subsd %xmm3, %xmm0
+subsd %xmm2, %xmm0
+movapd %xmm1, %xmm2
+mulsd {constant('pio2_3')}, %xmm2
+movapd %xmm3, %xmm4
+subsd %xmm2, %xmm4
+subsd %xmm4, %xmm3
+subsd %xmm2, %xmm3
+mulsd {constant('pio2_3t')}, %xmm1
+subsd %xmm3, %xmm1
+subsd %xmm0, %xmm1
+movapd %xmm4, %xmm0
+subsd %xmm1, %xmm0
+subsd %xmm0, %xmm4
+subsd %xmm1, %xmm4
+movapd %xmm4, %xmm7
+movapd %xmm0, %xmm1
+mulsd %xmm0, %xmm1
+"""  # x - k * pi/2 as a sum r + y, with r in %xmm0, r * r in %xmm1, y in %xmm7, k in %rax; the rounding
+# errors of both subtractions that follow the exact one are kept and folded into y
+
+sse_sin = f"""movsd {constant('S6')}, %xmm2
+mulsd %xmm1, %xmm2
+addsd {constant('S5')}, %xmm2
+mulsd %xmm1, %xmm2
+addsd {constant('S4')}, %xmm2
+mulsd %xmm1, %xmm2
+addsd {constant('S3')}, %xmm2
+mulsd %xmm1, %xmm2
+addsd {constant('S2')}, %xmm2
+movapd %xmm1, %xmm3
+mulsd %xmm0, %xmm3
+mulsd %xmm3, %xmm2
+movapd %xmm7, %xmm4
+mulsd {constant('half')}, %xmm4
+subsd %xmm2, %xmm4
+mulsd %xmm1, %xmm4
+subsd %xmm7, %xmm4
+mulsd {constant('S1')}, %xmm3
+subsd %xmm3, %xmm4
+movapd %xmm0, %xmm2
+subsd %xmm4, %xmm2
+"""  # sin (r + y) in %xmm2: r - ((z * (y/2 - v * (S2 + z * (S3 + ...))) - y) - v * S1), z = r * r, v = z * r
+
+sse_cos = f"""movsd {constant('C6')}, %xmm3
+mulsd %xmm1, %xmm3
+addsd {constant('C5')}, %xmm3
+mulsd %xmm1, %xmm3
+addsd {constant('C4')}, %xmm3
+mulsd %xmm1, %xmm3
+addsd {constant('C3')}, %xmm3
+mulsd %xmm1, %xmm3
+addsd {constant('C2')}, %xmm3
+mulsd %xmm1, %xmm3
+addsd {constant('C1')}, %xmm3
+mulsd %xmm1, %xmm3
+mulsd %xmm1, %xmm3
+movapd %xmm0, %xmm4
+mulsd %xmm7, %xmm4
+subsd %xmm4, %xmm3
+movapd %xmm1, %xmm4
+mulsd {constant('half')}, %xmm4
+movsd {constant('one')}, %xmm5
+subsd %xmm4, %xmm5
+movsd {constant('one')}, %xmm6
+subsd %xmm5, %xmm6
+subsd %xmm4, %xmm6
+addsd %xmm3, %xmm6
+addsd %xmm6, %xmm5
+movapd %xmm5, %xmm3
+"""  # cos (r + y) in %xmm3: w + (((1 - w) - z/2) + (z**2 * (C1 + ...) - r * y)), w = 1 - z/2
+
+# one quadrant routine serves both functions, cos x = sin (x + pi/2)
+sse_quadrant = f"""testb $1, %al
+jnz 1f
+{sse_sin}jmp 2f
+1:
+{sse_cos}movapd %xmm3, %xmm2
+2:
+testb $2, %al
+jz 3f
+xorpd {constant('sign')}, %xmm2
+3:
+movapd %xmm2, %xmm0
+retq
+"""
+
+
+def sse_fallback(instruction: str) -> str:
+    return f"9:\n" \
+           f"movsd %xmm0, -8(%rsp)\n" \
+           f"fldl -8(%rsp)\n" \
+           f"{instruction}\n" \
+           f"fstpl -8(%rsp)\n" \
+           f"movsd -8(%rsp), %xmm0\n" \
+           f"retq\n"
+
+
+# ~ x87 ~
+
+x87_reduction = f"""fldl {constant('limit')}
+fld %st(1)
+fabs
+fucomip %st(1), %st
+fstp %st(0)
+jae 9f
+fld %st(0)
+fmull {constant('invpio2')}
+frndint
+fistl -4(%rsp)
+fld %st(0)
+fmull {constant('pio2_1')}
+fsubr %st(2), %st
+fstp %st(2)
+fld %st(0)
+fmull {constant('pio2_2')}
+fsubr %st(2), %st
+fstp %st(2)
+fld %st(0)
+fmull {constant('pio2_3')}
+fsubr %st(2), %st
+fstp %st(2)
+fmull {constant('pio2_3t')}
+fsubr %st(1), %st
+fstp %st(1)
+movl -4(%rsp), %eax
+"""  # r in %st(0), k in %eax
+
+x87_sin = f"""fld %st(0)
+fmul %st(0), %st
+fldl {constant('S6')}
+fmul %st(1), %st
+faddl {constant('S5')}
+fmul %st(1), %st
+faddl {constant('S4')}
+fmul %st(1), %st
+faddl {constant('S3')}
+fmul %st(1), %st
+faddl {constant('S2')}
+fmul %st(1), %st
+faddl {constant('S1')}
+fmulp %st, %st(1)
+fmul %st(1), %st
+faddp %st, %st(1)
+"""  # sin r replaces r: r + r * z * (S1 + z * (S2 + ...))
+
+x87_cos = f"""fmul %st(0), %st
+fldl {constant('C6')}
+fmul %st(1), %st
+faddl {constant('C5')}
+fmul %st(1), %st
+faddl {constant('C4')}
+fmul %st(1), %st
+faddl {constant('C3')}
+fmul %st(1), %st
+faddl {constant('C2')}
+fmul %st(1), %st
+faddl {constant('C1')}
+fmul %st(1), %st
+fmul %st(1), %st
+fxch
+fmull {constant('half')}
+fsubr %st(1), %st
+fstp %st(1)
+fld1
+faddp %st, %st(1)
+"""  # cos r replaces r: 1 + (z**2 * (C1 + ...) - z/2)
+
+x87_quadrant = f"""testb $1, %al
+jnz 1f
+{x87_sin}jmp 2f
+1:
+{x87_cos}2:
+testb $2, %al
+jz 3f
+fchs
+3:
+retq
+"""
+
+x87_sincos = f"""fld %st(0)
+{x87_cos}fxch
+{x87_sin}testb $1, %al
+jz 1f
+fxch
+1:
+testb $2, %al
+jz 2f
+fchs
+2:
+incq %rax
+testb $2, %al
+jz 3f
+fxch
+fchs
+fxch
+3:
+fxch
+retq
+"""  # sin r over cos r, swapped in odd quadrants, then signs of sin (k & 2) and cos ((k + 1) & 2)
+
+routines = {
+    '__cmmm_sin_sse':    sse_reduction + sse_quadrant + sse_fallback('fsin'),
+    '__cmmm_cos_sse':    sse_reduction + "incq %rax\n" + sse_quadrant + sse_fallback('fcos'),
+    '__cmmm_sin_x87':    x87_reduction + x87_quadrant + "9:\nfsin\nretq\n",
+    '__cmmm_cos_x87':    x87_reduction + "incl %eax\n" + x87_quadrant + "9:\nfcos\nretq\n",
+    '__cmmm_sincos_x87': x87_reduction + x87_sincos + "9:\nfsincos\nretq\n",
+}
+
+
+def routine(functions: {str}, fast_math: str) -> str:
+    """ name of the routine computing 'functions' ('sin', 'cos' or both) of one argument """
+
+    return f"__cmmm_{'sincos' if len(functions) > 1 else next(iter(functions))}_{fast_math}"
+
+
+def trigonometric_routines(assembly: str) -> str:
+    """ the routines called from 'assembly' and their constants, nothing if there are no calls """
+
+    called = [name for name in routines.keys() if f"call {name}\n" in assembly]
+    if not called:
+        return ''
+
+    return f"\n// fast-math trigonometric routines\n" + \
+        ''.join(f"\n{name}:\n{routines[name]}" for name in called) + \
+        f"\n.section .rodata\n" \
+        f".balign 16\n" + \
+        ''.join(f"__cmmm_trig_{name}: .quad {mask:#018x}, {mask:#018x}\n" for name, mask in masks.items()) + \
+        ''.join(f"__cmmm_trig_{name}: .quad {bits(value):#018x} // {value!r}\n"
+                for name, value in constants.items()) + \
+        f"\n.text\n"
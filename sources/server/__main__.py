@@ -0,0 +1,13 @@
+import argparse
+import sys
+
+from server import *
+
+
+if __name__ == '__main__':
+    arguments = argparse.ArgumentParser(prog='server', description="language server over stdin and stdout")
+    arguments.add_argument('--log', metavar='FILE', help="statements reparsed and latency of every change, '-' for stderr")
+    options = arguments.parse_args()
+
+    log = sys.stderr if options.log == '-' else open(options.log, 'a') if options.log else None
+    exit(Server(sys.stdin.buffer, sys.stdout.buffer, log).serve())
@@ -0,0 +1,110 @@
+# edit to diagnostics latency of the language server on a generated file ('harness/corpus.py', a statement per
+# line), against compiling the whole file again like a language server without incremental parsing would. every
+# edit is made and then undone, both timed: a character typed into a statement, a ';' deleted (two statements
+# become one), and a declaration renamed (every statement using it is reparsed)
+
+import argparse
+import io
+import json
+import random
+import statistics
+import sys
+import time
+
+from compiler import *
+from harness.corpus import generate
+
+from .server import Server
+
+kinds = ['type', 'semicolon', 'declaration']
+
+
+def edits(text: str, kind: str, count: int, seed: int) -> [(int, int, str)]:
+    """ (start, end, replacement) of 'count' edits of 'kind', each followed by the one undoing it """
+
+    generator, result = random.Random(seed), []
+    lines = text.split('\n')
+    starts = [0]
+    for line in lines:
+        starts.append(starts[-1] + len(line) + 1)
+
+    for _ in range(count):
+        if kind == 'declaration':
+            line = generator.randrange(4)  # 'short s0, s1, s2, sa[8];' and such
+            position = starts[line] + lines[line].index(' ') + 1
+            result += [(position, position, 'x'), (position, position + 1, '')]
+            continue
+
+        line = generator.randrange(5, len(lines) - 1)
+        if kind == 'type':
+            position = starts[line] + generator.randrange(len(lines[line]))
+            result += [(position, position, '+'), (position, position + 1, '')]
+        else:
+            position = starts[line] + len(lines[line]) - 1
+            result += [(position, position + 1, ''), (position, position, ';')]
+    return result
+
+
+def change(server: Server, uri: str, text: str, start: int, end: int, replacement: str) -> str:
+    """ sends the edit to 'server' like an editor would, returns the new text """
+
+    def position(offset: int) -> dict:
+        return {'line': text.count('\n', 0, offset), 'character': offset - text.rfind('\n', 0, offset) - 1}
+
+    server.handle({'method': 'textDocument/didChange', 'params': {
+        'textDocument': {'uri': uri},
+        'contentChanges': [{'range': {'start': position(start), 'end': position(end)}, 'text': replacement}]
+    }})
+    return text[:start] + replacement + text[end:]
+
+
+def benchmark(lines: int, count: int, seed: int) -> dict:
+    """ ms per edit, median and 95th percentile of every kind, and what opening and recompiling the file cost """
+
+    text, uri = generate(seed, lines), 'file:///benchmark.cmmm'
+    server = Server(io.BytesIO(), io.BytesIO())
+
+    start = time.perf_counter()
+    server.handle({'method': 'textDocument/didOpen', 'params': {'textDocument': {'uri': uri, 'text': text}}})
+    results = {'lines': text.count('\n'), 'open_ms': 1000 * (time.perf_counter() - start)}
+
+    start = time.perf_counter()
+    compile_program(text, Diagnostics())
+    results['recompile_ms'] = 1000 * (time.perf_counter() - start)
+
+    for kind in kinds:
+        timings, reparsed = [], []
+        for edit in edits(text, kind, count, seed):
+            server.output.seek(0)
+            server.output.truncate()
+            start = time.perf_counter()
+            text = change(server, uri, text, *edit)
+            timings.append(1000 * (time.perf_counter() - start))
+            reparsed.append(server.documents[uri].reparsed)
+        timings.sort()
+        results[kind] = {'median_ms': statistics.median(timings), 'p95_ms': timings[int(0.95 * (len(timings) - 1))],
+                         'statements_reparsed': statistics.median(reparsed)}
+    results['diagnostics'] = len(server.diagnostics(uri))
+    return results
+
+
+if __name__ == '__main__':
+    arguments = argparse.ArgumentParser(prog='server.benchmark', description="edit to diagnostics latency")
+    arguments.add_argument('--lines', type=int, default=100000)
+    arguments.add_argument('--edits', type=int, default=50, help="of every kind, each undone again")
+    arguments.add_argument('--seed', type=int, default=0)
+    arguments.add_argument('--json', metavar='FILE', help="'-' for stdout")
+    options = arguments.parse_args()
+
+    results = benchmark(options.lines, options.edits, options.seed)
+    print(f"{results['lines']} lines, {results['diagnostics']} diagnostics: opened in {results['open_ms']:.0f} ms, "
+          f"compiled again in {results['recompile_ms']:.0f} ms", file=sys.stderr)
+    for kind in kinds:
+        print(f"{kind}: {results[kind]['median_ms']:.1f} ms median, {results[kind]['p95_ms']:.1f} ms p95, "
+              f"{results[kind]['statements_reparsed']:.0f} statements reparsed", file=sys.stderr)
+
+    if options.json == '-':
+        json.dump(results, sys.stdout, indent=2)
+    elif options.json:
+        with open(options.json, 'w') as j:
+            json.dump(results, j, indent=2)
@@ -0,0 +1,231 @@
+# documents of the language server, kept lexed and parsed between edits. the text is cut after every ';' into
+# chunks (a statement with the blanks in front of it, the last one may have no ';'), each with its tokens, what it
+# declares and its diagnostics, all relative to where the chunk starts, so chunks after an edit stay as they are.
+# an edit re-lexes the chunks it touches, extending them over the next ones until the text is cut where it was
+# before, and reparses them on their own with the declarations of the chunks in front of them in the symbols
+# table (statements are straight-line code, nothing else crosses a ';'). chunks further down are reparsed only if
+# they refer to a symbol whose declarations changed, or if their diagnostics point into other chunks
+
+import copy
+import re
+
+from bisect import bisect_right
+from dataclasses import *
+from itertools import accumulate
+
+from ply.lex import LexToken
+
+from compiler import (
+    lexer, parser,
+    Diagnostics
+)
+from diagnostics import (
+    Diagnostic, Span
+)
+from parser import (
+    code_generation,
+    SymbolsTable, Declaration, ArrayDeclaration,
+    Propagation
+)
+
+cut = re.compile(r'[^;]*;|[^;]+\Z')
+
+
+def signature(declaration: Declaration) -> tuple:
+    """ what other chunks see of 'declaration' """
+
+    return declaration.identifier, type(declaration).__name__, declaration.data_type, \
+        getattr(declaration, 'size', None), declaration.linkage
+
+
+def moved(record: Diagnostic, offset: int, lines: int) -> Diagnostic:
+    """ 'record' with its span and the ones of its notes 'offset' characters and 'lines' lines further """
+
+    span = None if record.span is None else \
+        Span(record.span.line + lines, record.span.start + offset,
+             None if record.span.end is None else record.span.end + offset)
+    return Diagnostic(record.level, record.message, span, [moved(note, offset, lines) for note in record.notes])
+
+
+@dataclass(eq=False)
+class Chunk:
+    """ ~ text up to a ';' (and with it), lexed and parsed, lines from 0 and offsets from its start ~ """
+
+    text: str
+
+    tokens: list = field(default_factory=list)
+    lexing: [Diagnostic] = field(default_factory=list)  # illegal characters
+    diagnostics: [Diagnostic] = field(default_factory=list)  # the lexer's and the parser's
+    declared: [Declaration] = field(default_factory=list)
+    names: {str} = field(default_factory=set)  # identifiers of the tokens, as symbols ('_a')
+    foreign: bool = False  # diagnostics pointing into other chunks (earlier declarations)
+    lines: int = 0
+
+    def __post_init__(self):
+        self.lines = self.text.count('\n')
+
+        diagnostics = Diagnostics(source=self.text)
+        lexer.diagnostics = diagnostics
+        lexer.input(self.text)
+        lexer.lineno = 0
+        self.tokens = list(iter(lexer.token, None))
+        self.lexing = diagnostics.records
+        self.names = {f"_{token.value}" for token in self.tokens if token.type == 'IDENTIFIER_TOKEN'}
+
+    def parse(self, start: int, line: int, declarations: [Declaration]) -> None:
+        """ parses the chunk at offset 'start' and line 'line' of the document, after 'declarations' """
+
+        tokens = []
+        if self.tokens and (start > 0):  # after the ';' in front, errors recover like in the whole document
+            tokens.append(LexToken())
+            tokens[0].type, tokens[0].value, tokens[0].lineno, tokens[0].lexpos = ';', ';', line, start - 1
+        for token in self.tokens:
+            token = copy.copy(token)
+            token.lineno, token.lexpos = token.lineno + line, token.lexpos + start
+            tokens.append(token)
+
+        diagnostics = Diagnostics()
+        lexer.diagnostics = parser.diagnostics = diagnostics
+        parser.symbols_table = SymbolsTable(declarations=list(declarations))
+        parser.spool, parser.propagation = None, Propagation()
+
+        if tokens:  # blanks at the end of the document are no statement
+            feed = iter(tokens)
+            try:
+                parser.parse(lexer=lexer, tokenfunc=lambda: next(feed, None), tracking=True)
+            except Exception as e:  # a bug of the compiler, not of the document: the server keeps going
+                diagnostics.error(f"internal compiler error: {e!r}")
+
+        self.declared = parser.symbols_table.declarations[len(declarations):]
+        for declaration in self.declared:
+            declaration.position = (declaration.position[0] - line, declaration.position[1] - start)
+        self.diagnostics = self.lexing + [moved(record, -start, -line) for record in diagnostics.records
+                                          if (record.span is None) or (record.span.start >= start)]
+        self.foreign = any((note.span is not None) and not self.inside(note.span)
+                           for record in self.diagnostics for note in record.notes)
+
+    def inside(self, span: Span) -> bool:
+        return 0 <= span.start < len(self.text)
+
+    def spanned(self, record: Diagnostic) -> Diagnostic:
+        """ 'record', over the whole statement if it has no span ('invalid ... statement', the end of the input) """
+
+        if record.span is not None:
+            return record
+        leading = len(self.text) - len(self.text.lstrip())
+        return Diagnostic(record.level, record.message,
+                          Span(self.text.count('\n', 0, leading), leading, max(len(self.text.rstrip()), leading + 1)),
+                          record.notes)
+
+
+class Document:
+    """ ~ source kept in chunks, edited in place ~ """
+
+    def __init__(self, text: str = ''):
+        self.text = text
+        self.chunks = [Chunk(piece) for piece in cut.findall(text)]
+        self.reparsed = 0  # chunks parsed by the last edit
+        self.foreigners = set()  # chunks with diagnostics pointing into other ones
+        self.cached = None  # 'starts()'
+
+        code_generation.configure(propagation=False, conversion_planning=False)  # no diagnostics of their own
+        self.reparse(0, len(self.chunks), set())
+
+    def starts(self) -> ([int], [int]):
+        """ offset and line (from 1) where every chunk starts, and where the document ends """
+
+        if self.cached is None:
+            self.cached = list(accumulate((len(chunk.text) for chunk in self.chunks), initial=0)), \
+                list(accumulate((chunk.lines for chunk in self.chunks), initial=1))
+        return self.cached
+
+    def offset(self, line: int, character: int) -> int:
+        """ offset of 'character' of 'line' (both from 0) """
+
+        starts, lines = self.starts()
+        i = max(bisect_right(lines, line + 1, 0, len(self.chunks)) - 1, 0)
+        start = self.text.rfind('\n', 0, starts[i]) + 1
+        for _ in range(line + 1 - lines[i]):
+            start = self.text.find('\n', start) + 1
+            if start == 0:
+                return len(self.text)
+        end = self.text.find('\n', start)
+        return min(start + character, len(self.text) if end == -1 else end)
+
+    def change(self, start: int, end: int, text: str) -> None:
+        """ replaces the characters from 'start' to 'end' by 'text', reparsing what that changes """
+
+        starts, _ = self.starts()
+        if not self.chunks:
+            self.__init__(text)
+            return
+
+        first = min(bisect_right(starts, start) - 1, len(self.chunks) - 1)
+        last = max(first, min(bisect_right(starts, end - 1) - 1, len(self.chunks) - 1))
+        region = self.text[starts[first]:start] + text + self.text[end:starts[last + 1]]
+
+        pieces = cut.findall(region)
+        while (last + 1 < len(self.chunks)) and not (pieces and pieces[-1].endswith(';')):
+            last += 1  # the ';' that ended the region is gone, the next chunk is part of this statement now
+            region += self.chunks[last].text
+            pieces = cut.findall(region)
+
+        replaced = {signature(declaration) for chunk in self.chunks[first:last + 1] for declaration in chunk.declared}
+        self.foreigners.difference_update(self.chunks[first:last + 1])
+        self.text = self.text[:start] + text + self.text[end:]
+        self.chunks[first:last + 1] = [Chunk(piece) for piece in pieces]
+        self.cached = None
+        self.reparse(first, first + len(pieces), replaced)
+
+    def reparse(self, first: int, last: int, replaced: {tuple}) -> None:
+        """ parses chunks 'first' to 'last', which replace chunks that declared 'replaced', then the ones after
+            them that refer to symbols declared differently now, or that point into other chunks """
+
+        start, line, declarations = 0, 1, []
+
+        def parsed(chunk: Chunk) -> {tuple}:
+            chunk.parse(start, line, declarations)
+            (self.foreigners.add if chunk.foreign else self.foreigners.discard)(chunk)
+            self.reparsed += 1
+            return {signature(declaration) for declaration in chunk.declared}
+
+        def passed(chunk: Chunk) -> None:
+            nonlocal start, line, declarations
+            if chunk.declared:
+                declarations += [self.placed(declaration, start, line) for declaration in chunk.declared]
+            start, line = start + len(chunk.text), line + chunk.lines
+
+        for chunk in self.chunks[:first]:
+            passed(chunk)
+
+        self.reparsed = 0
+        for chunk in self.chunks[first:last]:
+            replaced ^= parsed(chunk)  # nothing is declared twice, so these never overlap
+            passed(chunk)
+
+        changed = {identifier for identifier, *_ in replaced}
+        for chunk in self.chunks[last:]:
+            if not (changed or self.foreigners):
+                break
+            elif chunk.foreign or not changed.isdisjoint(chunk.names):
+                before = {signature(declaration) for declaration in chunk.declared}
+                changed |= {identifier for identifier, *_ in before ^ parsed(chunk)}
+            passed(chunk)
+
+    @staticmethod
+    def placed(declaration: Declaration, start: int, line: int) -> Declaration:
+        placed = copy.copy(declaration)
+        placed.position = (declaration.position[0] + line, declaration.position[1] + start)
+        return placed
+
+    def located(self) -> [(Chunk, int, int)]:
+        """ chunks with diagnostics, with the offset and line where they start """
+
+        starts, lines = self.starts()
+        return [(chunk, starts[i], lines[i]) for i, chunk in enumerate(self.chunks) if chunk.diagnostics]
+
+    def diagnostics(self) -> [Diagnostic]:
+        """ diagnostics of the whole document, lines from 1 and offsets from its start like the compiler's """
+
+        return [moved(chunk.spanned(record), start, line)
+                for chunk, start, line in self.located() for record in chunk.diagnostics]
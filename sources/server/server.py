@@ -0,0 +1,177 @@
+# language server: json-rpc over stdin and stdout ('Content-Length' headers, no network), documents synced
+# incrementally and kept parsed by 'server/document.py', diagnostics published after every change. positions are
+# lines and characters from 0; sources are ascii (anything else is an illegal character), so characters are
+# counted like the utf-16 code units the protocol asks for
+
+import json
+import time
+
+from .document import (
+    Document,
+    moved
+)
+
+severities = {'error': 1, 'warning': 2, 'info': 3, 'hint': 4}
+
+capabilities = {
+    'textDocumentSync': {'openClose': True, 'change': 2}  # incremental
+}
+
+
+class Server:
+    """ ~ language server of one client ~ """
+
+    def __init__(self, input, output, log=None):
+        self.input, self.output = input, output  # binary streams
+        self.log = log  # text stream, a line per change
+
+        self.documents = {}  # uri -> Document
+        self.fragments = {}  # uri -> chunk -> its diagnostics, where it was, their json
+        self.shutdown = False
+
+    def read(self) -> dict or None:
+        """ next message, None at the end of the input """
+
+        headers = {}
+        while True:
+            line = self.input.readline()
+            if not line:
+                return None
+            line = line.decode('ascii').strip()
+            if not line:
+                break
+            name, _, value = line.partition(':')
+            headers[name.strip().lower()] = value.strip()
+        return json.loads(self.input.read(int(headers['content-length'])))
+
+    def send(self, message: dict) -> None:
+        self.write(json.dumps({'jsonrpc': '2.0', **message}))
+
+    def write(self, message: str) -> None:
+        body = message.encode()
+        self.output.write(f"Content-Length: {len(body)}\r\n\r\n".encode() + body)
+        self.output.flush()
+
+    @staticmethod
+    def range(text: str, line: int, start: int, end: int, column: int = 0) -> dict:
+        """ lsp range of the characters from 'start' to 'end' of 'text', 'start' on line 'line' (from 1), the first
+            line of 'text' 'column' characters into its line """
+
+        def character(offset: int) -> int:
+            newline = text.rfind('\n', 0, offset)
+            return offset + column if newline < 0 else offset - newline - 1
+
+        return {
+            'start': {'line': line - 1, 'character': character(start)},
+            'end': {'line': line + text.count('\n', start, end) - 1, 'character': character(end)}
+        }
+
+    def fragment(self, uri: str, chunk, start: int, line: int) -> str:
+        """ lsp diagnostics of 'chunk', at offset 'start' and line 'line' of the document, as a piece of a json
+            array. kept until the chunk is reparsed or moves to another line or column, edits that add no lines
+            encode just the chunks they reparse """
+
+        document = self.documents[uri]
+        column = start - document.text.rfind('\n', 0, start) - 1
+        cached = self.fragments[uri].get(chunk)
+        if (cached is not None) and (cached[0] is chunk.diagnostics) and (cached[1:3] == (line, column)):
+            return cached[3]
+
+        records, text, lines = [chunk.spanned(record) for record in chunk.diagnostics], chunk.text, line
+        if chunk.foreign:  # notes in other chunks: all of it where it is in the document
+            records, text, lines, column = [moved(record, start, line) for record in records], document.text, 0, 0
+
+        results = []
+        for record in records:
+            span = record.span
+            results.append({
+                'range': self.range(text, span.line + lines, span.start, span.end or span.start + 1, column),
+                'severity': severities[record.level],
+                'source': 'cmmm',
+                'message': '\n'.join([record.message] + [f"{note.level}: {note.message}" for note in record.notes
+                                                         if note.span is None]),
+                'relatedInformation': [{
+                    'location': {'uri': uri, 'range': self.range(text, note.span.line + lines, note.span.start,
+                                                                 note.span.end or note.span.start + 1, column)},
+                    'message': note.message
+                } for note in record.notes if note.span is not None]
+            })
+        encoded = json.dumps(results)[1:-1]
+        self.fragments[uri][chunk] = (chunk.diagnostics, line, column, encoded)
+        return encoded
+
+    def encoded(self, uri: str) -> str:
+        """ lsp diagnostics of the document at 'uri', a json array """
+
+        if uri not in self.documents:
+            self.fragments.pop(uri, None)
+            return '[]'
+        located = self.documents[uri].located()
+        fragments = [self.fragment(uri, chunk, start, line) for chunk, start, line in located]
+        self.fragments[uri] = {chunk: self.fragments[uri][chunk] for chunk, *_ in located}  # the chunks left
+        return f"[{', '.join(fragments)}]"
+
+    def diagnostics(self, uri: str) -> [dict]:
+        """ lsp diagnostics of the document at 'uri' """
+        return json.loads(self.encoded(uri))
+
+    def publish(self, uri: str) -> None:
+        self.write(f'{{"jsonrpc": "2.0", "method": "textDocument/publishDiagnostics", '
+                   f'"params": {{"uri": {json.dumps(uri)}, "diagnostics": {self.encoded(uri)}}}}}')
+
+    def changed(self, uri: str, changes: [dict]) -> None:
+        start = time.perf_counter()
+
+        document, reparsed = self.documents[uri], 0
+        for change in changes:
+            if 'range' not in change:  # the whole text
+                document = self.documents[uri] = Document(change['text'])
+            else:
+                begin, end = change['range']['start'], change['range']['end']
+                document.change(document.offset(begin['line'], begin['character']),
+                                document.offset(end['line'], end['character']), change['text'])
+            reparsed += document.reparsed
+        parsed = time.perf_counter()
+        self.publish(uri)
+
+        if self.log is not None:
+            self.log.write(f"{uri}: {reparsed} of {len(document.chunks)} statements reparsed in "
+                           f"{1000 * (parsed - start):.2f} ms, diagnostics published after "
+                           f"{1000 * (time.perf_counter() - start):.2f} ms\n")
+            self.log.flush()
+
+    def handle(self, message: dict) -> None:
+        method, params = message.get('method'), message.get('params') or {}
+
+        if method == 'initialize':
+            result = {'capabilities': capabilities, 'serverInfo': {'name': 'c-minus-minus-minus'}}
+        elif method == 'shutdown':
+            self.shutdown, result = True, None
+        elif method == 'textDocument/didOpen':
+            uri = params['textDocument']['uri']
+            self.documents[uri], self.fragments[uri] = Document(params['textDocument']['text']), {}
+            self.publish(uri)
+            return
+        elif method == 'textDocument/didChange':
+            self.changed(params['textDocument']['uri'], params['contentChanges'])
+            return
+        elif method == 'textDocument/didClose':
+            uri = params['textDocument']['uri']
+            self.documents.pop(uri, None)
+            self.publish(uri)
+            return
+        elif 'id' in message:
+            self.send({'id': message['id'], 'error': {'code': -32601, 'message': f"unknown method '{method}'"}})
+            return
+        else:  # notifications the server has no use for ('initialized', '$/...')
+            return
+        self.send({'id': message['id'], 'result': result})
+
+    def serve(self) -> int:
+        """ handles messages until 'exit', exit code """
+
+        while (message := self.read()) is not None:
+            if message.get('method') == 'exit':
+                return 0 if self.shutdown else 1
+            self.handle(message)
+        return 1
@@ -0,0 +1,199 @@
+# watch mode of the driver ('main.py --watch'): one warm process, with the lexer and the parser tables loaded once,
+# waits for '.cmmm' files of some directories (and the ones below them) to be written and recompiles just those.
+# linux inotify tells which files were closed after writing or renamed into place, anywhere else the directories
+# are scanned for changed modification times instead. writes come in bursts (a generator rewriting a dozen files,
+# an editor saving through a temporary file), so a burst is over only once the files have been quiet for a while,
+# and every file of it is compiled once
+
+import ctypes
+import os
+import select
+import struct
+import sys
+import time
+
+suffix = '.cmmm'
+
+# <sys/inotify.h>
+IN_CLOSE_WRITE, IN_MOVED_TO, IN_CREATE = 0x00000008, 0x00000080, 0x00000100
+IN_Q_OVERFLOW, IN_ISDIR = 0x00004000, 0x40000000
+IN_NONBLOCK, IN_CLOEXEC = os.O_NONBLOCK, 0o2000000
+
+event = struct.Struct('iIII')  # wd, mask, cookie, len, then the name (padded with '\0')
+
+
+def sources(directory: str) -> {str}:
+    """ '.cmmm' files in 'directory' and below it """
+
+    return {os.path.join(root, name) for root, _, names in os.walk(directory) for name in names
+            if name.endswith(suffix)}
+
+
+class Inotify:
+    """ ~ changed sources, told by the kernel ~ """
+
+    def __init__(self, directories: [str]):
+        try:
+            self.libc = ctypes.CDLL(None, use_errno=True)
+        except (OSError, TypeError):  # no c library to load symbols of
+            raise OSError("no inotify here")
+        if not hasattr(self.libc, 'inotify_init1'):
+            raise OSError("no inotify here")
+
+        self.fd = self.libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), os.strerror(ctypes.get_errno()))
+
+        self.directories = directories
+        self.watched = {}  # watch descriptor -> directory
+        for directory in directories:
+            for root, _, _ in os.walk(directory):
+                self.add(root)
+
+    def add(self, directory: str) -> None:
+        wd = self.libc.inotify_add_watch(self.fd, os.fsencode(directory), IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE)
+        if wd < 0:
+            raise OSError(ctypes.get_errno(), f"cannot watch '{directory}': {os.strerror(ctypes.get_errno())}")
+        self.watched[wd] = directory
+
+    def read(self, timeout: float or None) -> {str} or None:
+        """ sources written within 'timeout' seconds (forever if None), None if nothing happened """
+
+        if not select.select([self.fd], [], [], timeout)[0]:
+            return None
+
+        changed, data = set(), os.read(self.fd, 64 * 1024)
+        for offset in offsets(data):
+            wd, mask, _, length = event.unpack_from(data, offset)
+            name = os.fsdecode(data[offset + event.size:offset + event.size + length].rstrip(b'\0'))
+
+            if mask & IN_Q_OVERFLOW:  # events were lost, any source may have changed
+                changed |= {path for directory in self.directories for path in sources(directory)}
+            elif wd not in self.watched:
+                continue
+            elif mask & IN_ISDIR:
+                if mask & (IN_CREATE | IN_MOVED_TO):  # a new directory, and whatever is in it already
+                    path = os.path.join(self.watched[wd], name)
+                    for root, _, _ in os.walk(path):
+                        self.add(root)
+                    changed |= sources(path)
+            elif (mask & (IN_CLOSE_WRITE | IN_MOVED_TO)) and name.endswith(suffix):
+                changed.add(os.path.join(self.watched[wd], name))
+        return changed
+
+    def close(self) -> None:
+        os.close(self.fd)
+
+
+def offsets(data: bytes):
+    """ offsets of the events in what was read from an inotify descriptor """
+
+    offset = 0
+    while offset < len(data):
+        yield offset
+        offset += event.size + event.unpack_from(data, offset)[3]
+
+
+class Polling:
+    """ ~ changed sources, found by scanning the directories every 'interval' seconds ~ """
+
+    def __init__(self, directories: [str], interval: float = 0.25):
+        self.directories, self.interval = directories, interval
+        self.snapshot = self.scan()
+
+    def scan(self) -> dict:
+        """ path -> modification time and size of every source """
+
+        snapshot = {}
+        for directory in self.directories:
+            for path in sources(directory):
+                try:
+                    status = os.stat(path)
+                except FileNotFoundError:  # removed while walking
+                    continue
+                snapshot[path] = (status.st_mtime_ns, status.st_size)
+        return snapshot
+
+    def read(self, timeout: float or None) -> {str} or None:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            snapshot = self.scan()
+            changed = {path for path, status in snapshot.items() if self.snapshot.get(path) != status}
+            self.snapshot = snapshot
+            if changed:
+                return changed
+
+            left = self.interval if deadline is None else min(self.interval, deadline - time.monotonic())
+            if left <= 0:
+                return None
+            time.sleep(left)
+
+    def close(self) -> None:
+        pass
+
+
+def watcher(directories: [str], polling: bool = False) -> Inotify or Polling:
+    """ inotify where there is one, scanning anywhere else """
+
+    if not polling:
+        try:
+            return Inotify(directories)
+        except OSError as e:
+            if e.errno is not None:  # there is inotify, it failed (no such directory, too many watches)
+                raise
+    return Polling(directories)
+
+
+def burst(changes: Inotify or Polling, debounce: float) -> ({str}, float):
+    """ sources written in the next burst, over once nothing was written for 'debounce' seconds, and when its first
+        write was seen (time.perf_counter) """
+
+    changed = changes.read(None)
+    first = time.perf_counter()
+    while (more := changes.read(debounce)) is not None:
+        changed |= more
+    return changed, first
+
+
+def watch(directories: [str], rebuild: callable, debounce: float = 0.1, polling: bool = False,
+          log=sys.stderr) -> None:
+    """ calls 'rebuild' with the path of every source of 'directories' that is out of date (no '.s' next to it or
+        an older one) and then of every source written, until interrupted. 'rebuild' tells if it compiled """
+
+    def rebuilt(paths: [str]) -> None:
+        for path in paths:
+            start = time.perf_counter()
+            try:
+                succeeded = rebuild(path)
+            except OSError as e:  # removed or unreadable by now, the next write brings it back
+                log.write(f"{path}: {e.strerror}\n")
+                succeeded = False
+            except Exception as e:  # whatever one file does, the others are still watched
+                log.write(f"{path}: error: {e!r}\n")
+                succeeded = False
+            log.write(f"{path}: {'compiled' if succeeded else 'failed'} in "
+                      f"{1000 * (time.perf_counter() - start):.2f} ms\n")
+        log.flush()
+
+    changes = watcher(directories, polling)  # before looking at the files, so nothing written now is missed
+    try:
+        stale = []
+        for directory in directories:
+            for path in sorted(sources(directory)):
+                assembly = f"{os.path.splitext(path)[0]}.s"
+                if not os.path.exists(assembly) or os.path.getmtime(assembly) < os.path.getmtime(path):
+                    stale.append(path)
+        rebuilt(stale)
+
+        log.write(f"watching {', '.join(directories)} ({type(changes).__name__.lower()})\n")
+        log.flush()
+        while True:
+            changed, first = burst(changes, debounce)
+            changed = sorted(path for path in changed if os.path.exists(path))  # not the ones removed since
+            if changed:
+                rebuilt(changed)
+                log.write(f"{len(changed)} file{'s' if len(changed) != 1 else ''} rebuilt "
+                          f"{1000 * (time.perf_counter() - first):.2f} ms after the first write\n")
+                log.flush()
+    finally:
+        changes.close()